@@ -0,0 +1,648 @@
+"""Load test and benchmark for the House of Emigrants web app.
+
+Seeds local Postgres databases with a synthetic archive (1k, 10k and 100k
+interviews by default, see synthetic_archive.sql), replays a mixed workload
+against main.app in-process (Flask test client, one per thread) and reports
+latency percentiles and throughput per route. The translator and Gemini are
+stubbed, so it runs offline; uploaded interviews go through the real
+extraction and ingest code with a canned Gemini answer.
+
+Each database is reused until the psql/ scripts or the seed change. Results
+are compared with benchmarks/baselines/<size>.json when it exists, and the
+exit status is 1 if a route got slower than --tolerance allows.
+
+Usage (from the repository root):
+    python benchmarks/benchmark.py --sizes 1000,10000 --requests 3000
+    python benchmarks/benchmark.py --sizes 1000 --save-baseline
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import types
+from datetime import datetime
+
+import psycopg
+from psycopg import sql
+from PIL import Image
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+
+# Installed in this order into every benchmark database
+SCHEMA_FILES = [
+    "psql/init_house_of_emmigrants.sql",
+    "benchmarks/synthetic_archive.sql",
+    "psql/ingest_data_get_functions.sql",
+    "psql/ingest_interview_data.sql",
+    "psql/normalized_name_indexes.sql",
+    "psql/person_resolution.sql",
+    "psql/exploration_stats.sql",
+    "psql/keyword_index.sql",
+    "psql/gazetteer.sql",
+    "psql/translation_cache.sql",
+    "psql/search_index.sql",
+    "psql/bulk_load_staging.sql",
+    "psql/media_catalog.sql",
+    "psql/background_jobs.sql",
+    "psql/admin_listings.sql",
+    "psql/page_cache.sql",
+]
+SEED_VERSION = 1  # bump when the synthetic data changes shape
+
+DEFAULT_SIZES = "1000,10000,100000"
+DEFAULT_REQUESTS = 2000
+DEFAULT_CONCURRENCY = 4
+DEFAULT_WARMUP = 200
+DEFAULT_TOLERANCE = 0.25  # p95 may grow 25% before it counts as a regression
+MIN_REGRESSION_MS = 2.0  # ignore differences below the timer noise
+JOB_DRAIN_TIMEOUT = 60  # seconds waited for uploaded interviews to be ingested
+
+TRANSLATOR_LATENCY = 0.05  # seconds per stubbed translated string
+GEMINI_LATENCY = 0.2  # seconds per stubbed Gemini request
+MEDIA_FILES = 20  # images and texts served by the media routes
+
+SEARCH_TERMS = ["farm", "emigration ship", "church", "harvest", "railroad", "america", "winter letters"]
+EXPLORATION_SERIES = ["timeline", "drilldown", "geo", "motive", "transport", "keywords", "flows", "sex", "education"]
+STORY_SORTS = ["created", "country", "motive", "sex"]
+STORY_FILTERS = ["United States", "Canada", "Argentina", "Australia"]
+
+
+# --- Offline stubs ---
+class StubTranslator:
+    """Stands in for deep_translator.GoogleTranslator."""
+
+    def __init__(self, source="auto", target="en"):
+        self.target = target
+
+    def translate(self, text):
+        # One HTTP request per string, like the real client
+        time.sleep(TRANSLATOR_LATENCY)
+        return f"[{self.target}] {text}"
+
+
+def canned_extraction(prompt):
+    """Gemini answer for an uploaded synthetic interview."""
+    name = re.search(r"Interviewee: (.+)", prompt)
+    name = name.group(1).strip() if name else "Unknown Interviewee"
+    return {
+        "story_title": f"The journey of {name}",
+        "story_summary": f"{name} talks about leaving Sweden for America.",
+        "interview_location": "Växjö",
+        "interview_date": "1975-06-01",
+        "interviewee_name": name,
+        "interviewee_birthday": "1885-03-12",
+        "interviewee_birthplace_city_name": "Sweden city 2",
+        "interviewee_birthplace_country_name": "Sweden",
+        "interviewee_sex": "female",
+        "interviewee_marital_status": "married",
+        "interviewee_legal_status_at_migration_or_current": "legal immigrant",
+        "interviewee_immigration_events": [
+            {
+                "immigration_date": "1905-04-20",
+                "reason_immigration": "work opportunities",
+                "origin_city_name": "Sweden city 2",
+                "origin_country_name": "Sweden",
+                "destination_city_name": "United States city 3",
+                "destination_country_name": "United States",
+                "travel_type_name": "steamship",
+                "entry_port_name": "Gothenburg",
+                "arrival_port_name": "New York",
+                "return_plans": "",
+            }
+        ],
+        "interviewee_jobs": [{"occupation": "Maid", "employer": "", "job_position": "", "education_level_for_job": ""}],
+        "interviewee_education_history": [
+            {"school_name": "School 3", "education_level_achieved": "primary school", "graduation_year": "1898"}
+        ],
+        "interviewee_health_issues": [],
+        "other_people_mentioned": [
+            {"full_name": f"{name} Senior", "relationship_to_interviewee": "father", "details": ""}
+        ],
+        "interviewee_community_involvements": [],
+        "interviewee_historic_event_involvement": [],
+        "interviewee_cultural_aspects": {
+            "associated_culture_names": ["Swedish-American"],
+            "languages_spoken_or_mentioned": [{"language_name": "Swedish", "proficiency_or_context": "native"}],
+            "cultural_events_mentioned": [],
+            "cultural_practices_mentioned": [],
+        },
+        "general_keywords": ["emigration", "steamship", "family"],
+    }
+
+
+def install_gemini_stub():
+    """Registers a fake google.generativeai before the extractor imports it."""
+    genai = types.ModuleType("google.generativeai")
+
+    class GenerativeModel:
+        def __init__(self, model_name, generation_config=None):
+            self.model_name = model_name
+
+        def generate_content(self, prompt):
+            time.sleep(GEMINI_LATENCY)
+            text = json.dumps(canned_extraction(prompt))
+            return types.SimpleNamespace(parts=[text], text=text, prompt_feedback=None)
+
+    genai.configure = lambda **kwargs: None
+    genai.types = types.SimpleNamespace(GenerationConfig=lambda **kwargs: kwargs)
+    genai.GenerativeModel = GenerativeModel
+
+    try:
+        import google
+    except ImportError:
+        google = types.ModuleType("google")
+        google.__path__ = []
+        sys.modules["google"] = google
+    google.generativeai = genai
+    sys.modules["google.generativeai"] = genai
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+
+# --- Databases ---
+def schema_fingerprint():
+    digest = hashlib.sha256(f"seed:{SEED_VERSION}".encode())
+    for rel_path in SCHEMA_FILES:
+        with open(os.path.join(REPO_ROOT, rel_path), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def size_label(size):
+    return f"{size // 1000}k" if size % 1000 == 0 else str(size)
+
+
+def connect(args, dbname, **kwargs):
+    return psycopg.connect(
+        dbname=dbname, user=args.db_user, password=args.db_password, host=args.db_host, port=args.db_port, **kwargs
+    )
+
+
+def seeded_fingerprint(args, dbname):
+    try:
+        with connect(args, dbname) as conn:
+            row = conn.execute("SELECT value FROM bench_meta WHERE key = 'fingerprint'").fetchone()
+            return row[0] if row else None
+    except psycopg.Error:
+        return None
+
+
+def prepare_database(args, size):
+    """Returns a fresh copy of the seeded database for ``size``.
+
+    The seeded archive is kept as <prefix>_<size>_seed and only rebuilt when
+    the schema fingerprint changes; every run works on a copy of it, so the
+    uploads of one run never leak into the next."""
+    dbname = f"{args.db_prefix}_{size_label(size)}"
+    template = f"{dbname}_seed"
+    fingerprint = schema_fingerprint()
+
+    if args.reseed or seeded_fingerprint(args, template) != fingerprint:
+        with connect(args, "postgres", autocommit=True) as admin:
+            admin.execute(sql.SQL("DROP DATABASE IF EXISTS {} WITH (FORCE)").format(sql.Identifier(template)))
+            admin.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(template)))
+
+        started = time.perf_counter()
+        with connect(args, template, autocommit=True) as conn:
+            for rel_path in SCHEMA_FILES:
+                with open(os.path.join(REPO_ROOT, rel_path), encoding="utf-8") as f:
+                    conn.execute(f.read())
+            print(f"[{template}] schema installed, seeding {size} interviews...")
+            conn.execute("CALL seed_synthetic_archive(%s)", (size,))
+            conn.execute("ANALYZE")
+            conn.execute("CREATE TABLE bench_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute(
+                "INSERT INTO bench_meta VALUES ('fingerprint', %s), ('interviews', %s)",
+                (fingerprint, str(size)),
+            )
+        print(f"[{template}] seeded in {time.perf_counter() - started:.1f}s")
+    else:
+        print(f"[{template}] reusing seeded database")
+
+    with connect(args, "postgres", autocommit=True) as admin:
+        admin.execute(sql.SQL("DROP DATABASE IF EXISTS {} WITH (FORCE)").format(sql.Identifier(dbname)))
+        admin.execute(
+            sql.SQL("CREATE DATABASE {} TEMPLATE {}").format(sql.Identifier(dbname), sql.Identifier(template))
+        )
+    return dbname
+
+
+# --- App under test ---
+def load_app(args, workdir):
+    """Imports main.py with its files redirected to ``workdir`` and the stubs in place."""
+    install_gemini_stub()
+    sys.path.insert(0, REPO_ROOT)
+    import main
+
+    main.GoogleTranslator = StubTranslator
+    main.DB_HOST, main.DB_PORT = args.db_host, args.db_port
+    main.DB_USER, main.DB_PASS = args.db_user, args.db_password
+    main.SLOW_REQUEST_SECONDS = 0
+    main.MEDIA_FOLDER = os.path.join(workdir, "multimedia")
+    main.MEDIA_VARIANT_FOLDER = os.path.join(workdir, "media_cache", "precompressed")
+    main.IMAGE_DERIVATIVE_FOLDER = os.path.join(workdir, "media_cache", "images")
+    main.app.config["UPLOAD_TEXT_FOLDER"] = os.path.join(main.MEDIA_FOLDER, "text")
+    main.app.config["UPLOAD_IMAGE_FOLDER"] = os.path.join(main.MEDIA_FOLDER, "images")
+
+    extractor = main.get_extractor()
+    extractor.DB_HOST, extractor.DB_PORT = args.db_host, args.db_port
+    extractor.DB_USER, extractor.DB_PASS = args.db_user, args.db_password
+    extractor.extraction_cache.enabled = False
+    extractor.gemini_rate_limiter = extractor.TokenBucket(1000, 1000)
+    return main, extractor
+
+
+def use_database(main, extractor, dbname):
+    """Points the app at another database and drops every per-process cache."""
+    if main._db_pool is not None:
+        main._db_pool.close()
+        main._db_pool = None
+    main.DB_NAME = extractor.DB_NAME = dbname
+    if main._ingest_manifest is not None:  # checkpoints of the previous database
+        main._ingest_manifest.close()
+        main._ingest_manifest = None
+    if os.path.exists(extractor.INGEST_MANIFEST_PATH):
+        os.remove(extractor.INGEST_MANIFEST_PATH)
+    main._page_cache.clear()
+    main._data_version.update(value=None, checked_at=float("-inf"))
+    with main._translation_memory_lock:
+        main._translation_memory.clear()
+
+
+def create_media(main):
+    """Images and interview texts served by the media routes. Image derivatives
+    are built up front, as `flask build-image-derivatives` does after a deploy."""
+    folder = main.MEDIA_FOLDER
+    os.makedirs(os.path.join(folder, "images"), exist_ok=True)
+    os.makedirs(os.path.join(folder, "text"), exist_ok=True)
+    images, texts = [], []
+    rng = random.Random(7)
+    for i in range(MEDIA_FILES):
+        name = f"bench_photo_{i:02d}.jpg"
+        image = Image.new("RGB", (1600, 1200), (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+        path = os.path.join(folder, "images", name)
+        image.save(path, quality=85)
+        main.build_image_derivatives(path, main.media_content_hash(path, os.stat(path)))
+        images.append(name)
+        name = f"bench_interview_{i:02d}.txt"
+        with open(os.path.join(folder, "text", name), "w", encoding="utf-8") as f:
+            f.write(synthetic_interview(f"Media Interviewee {i}", rng))
+        texts.append(name)
+    return images, texts
+
+
+def synthetic_interview(name, rng):
+    words = ["farm", "ship", "family", "winter", "letters", "church", "harvest", "america", "work", "home"]
+    paragraphs = [" ".join(rng.choice(words) for _ in range(80)) + "." for _ in range(30)]
+    return f"Interviewee: {name}\n\n" + "\n\n".join(paragraphs)
+
+
+def upload_image_bytes():
+    buffer = io.BytesIO()
+    Image.new("RGB", (800, 600), (120, 90, 60)).save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+
+# --- Workload ---
+# name -> (weight, client, request builder); builders return (method, url, kwargs)
+def _home(rng, ctx):
+    return "GET", "/", {}
+
+
+def _exploration(rng, ctx):
+    return "GET", "/dataExploration", {}
+
+
+def _exploration_api(rng, ctx):
+    series = rng.choice(EXPLORATION_SERIES)
+    params = {}
+    if series in ("timeline", "geo", "motive", "transport") and rng.random() < 0.5:
+        start = rng.randrange(1850, 1920)
+        params = {"from": start, "to": start + rng.choice([5, 10, 30])}
+    return "GET", f"/api/exploration/{series}", {"query_string": params}
+
+
+def _search(rng, ctx):
+    return "GET", "/search", {"query_string": {"q": rng.choice(SEARCH_TERMS)}}
+
+
+def _about(rng, ctx):
+    return "GET", "/about", {}
+
+
+def _admin_stories(rng, ctx):
+    params = {"sort": rng.choice(STORY_SORTS), "dir": rng.choice(["asc", "desc"])}
+    if rng.random() < 0.3:
+        params["country"] = rng.choice(STORY_FILTERS)
+    if ctx.get("story_cursor") and rng.random() < 0.5:
+        params = dict(ctx["story_cursor_params"], after=ctx["story_cursor"])
+    return "GET", "/admin/stories", {"query_string": params, "remember_cursor": ("story", params)}
+
+
+def _admin_admins(rng, ctx):
+    return "GET", "/admin/admins", {}
+
+
+def _upload_tool(rng, ctx):
+    params = {} if rng.random() < 0.5 else {"q": f"interview_00{rng.randrange(10, 99)}"}
+    if ctx.get("media_cursor") and rng.random() < 0.5:
+        params = dict(ctx["media_cursor_params"], after=ctx["media_cursor"])
+    return "GET", "/uploadTool", {"query_string": params, "remember_cursor": ("media", params)}
+
+
+def _upload_text(rng, ctx):
+    ctx["uploads"] += 1
+    name = f"bench_upload_{ctx['thread']}_{ctx['uploads']}_{rng.randrange(10**9)}.txt"
+    content = synthetic_interview(f"Uploaded Person {ctx['thread']}-{ctx['uploads']}", rng).encode()
+    data = {"type": "text", "files": (io.BytesIO(content), name)}
+    return "POST", "/upload", {"data": data, "content_type": "multipart/form-data", "follow_redirects": True}
+
+
+def _upload_image(rng, ctx):
+    ctx["uploads"] += 1
+    name = f"bench_upload_{ctx['thread']}_{ctx['uploads']}_{rng.randrange(10**9)}.jpg"
+    data = {"type": "image", "files": (io.BytesIO(ctx["image_bytes"]), name)}
+    return "POST", "/upload", {"data": data, "content_type": "multipart/form-data", "follow_redirects": True}
+
+
+def _media_image(rng, ctx):
+    headers = {"Accept": "image/webp,*/*"} if rng.random() < 0.7 else {}
+    width = rng.choice([160, 320, 640, 1280])
+    return "GET", f"/multimedia/images/{rng.choice(ctx['images'])}", {"query_string": {"w": width}, "headers": headers}
+
+
+def _media_text(rng, ctx):
+    return "GET", f"/multimedia/text/{rng.choice(ctx['texts'])}", {"headers": {"Accept-Encoding": "gzip"}}
+
+
+WORKLOAD = {
+    "home (en)": (12, "en", _home),
+    "home (es)": (8, "es", _home),
+    "exploration (en)": (8, "en", _exploration),
+    "exploration (es)": (6, "es", _exploration),
+    "exploration api": (14, "en", _exploration_api),
+    "search": (8, "en", _search),
+    "about": (4, "es", _about),
+    "admin stories": (8, "admin", _admin_stories),
+    "admin admins": (3, "admin", _admin_admins),
+    "upload tool": (4, "admin", _upload_tool),
+    "upload text": (1, "admin", _upload_text),
+    "upload image": (1, "admin", _upload_image),
+    "media image": (8, "en", _media_image),
+    "media text": (5, "en", _media_text),
+}
+
+
+def make_clients(app):
+    clients = {}
+    for kind in ("en", "es", "admin"):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session["language"] = "es" if kind == "es" else "en"
+            if kind == "admin":
+                session["admin_id"] = 1
+        clients[kind] = client
+    return clients
+
+
+def run_workload(app, total_requests, concurrency, seed, shared, record=True):
+    """Sends ``total_requests`` requests from ``concurrency`` threads.
+    Returns ({route: [seconds, ...]}, {route: errors}, wall seconds)."""
+    names = list(WORKLOAD)
+    weights = [WORKLOAD[name][0] for name in names]
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+
+    def worker(index, count):
+        rng = random.Random(seed * 1000 + index)
+        clients = make_clients(app)
+        ctx = dict(shared, thread=index, uploads=0)
+        local = {name: [] for name in names}
+        local_errors = {name: 0 for name in names}
+        for name in rng.choices(names, weights, k=count):
+            _, client_kind, builder = WORKLOAD[name]
+            method, url, kwargs = builder(rng, ctx)
+            remember = kwargs.pop("remember_cursor", None)
+            started = time.perf_counter()
+            response = clients[client_kind].open(url, method=method, **kwargs)
+            body = response.get_data()
+            elapsed = time.perf_counter() - started
+            response.close()
+            if response.status_code >= 400:
+                local_errors[name] += 1
+            local[name].append(elapsed)
+            if remember is not None:
+                key, params = remember
+                cursor = re.search(rb"after=([\w-]+)", body)
+                ctx[f"{key}_cursor"] = cursor.group(1).decode() if cursor else None
+                ctx[f"{key}_cursor_params"] = {k: v for k, v in params.items() if k != "after"}
+        with lock:
+            for name in names:
+                latencies[name].extend(local[name])
+                errors[name] += local_errors[name]
+
+    per_thread = [total_requests // concurrency + (i < total_requests % concurrency) for i in range(concurrency)]
+    threads = [threading.Thread(target=worker, args=(i, n)) for i, n in enumerate(per_thread)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - started
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(latencies, errors, wall):
+    routes = {}
+    for name, values in latencies.items():
+        values = sorted(values)
+        routes[name] = {
+            "count": len(values),
+            "errors": errors[name],
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+            "throughput_rps": round(len(values) / wall, 1) if wall else 0.0,
+        }
+    return routes
+
+
+def wait_for_jobs(main, timeout):
+    """Waits for the upload jobs to finish; returns their processing times."""
+    deadline = time.monotonic() + timeout
+    with main.get_db_pool().connection() as conn:
+        while time.monotonic() < deadline:
+            pending = conn.execute(
+                "SELECT count(*) FROM background_jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+            if not pending:
+                break
+            time.sleep(0.5)
+        rows = conn.execute(
+            """
+            SELECT kind, status, count(*),
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY extract(epoch FROM finished_at - created_at)),
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY extract(epoch FROM finished_at - created_at))
+            FROM background_jobs GROUP BY kind, status ORDER BY kind, status
+            """
+        ).fetchall()
+    return {
+        f"{kind} ({status})": {
+            "count": n,
+            "p50_ms": round((p50 or 0) * 1000, 1),
+            "p95_ms": round((p95 or 0) * 1000, 1),
+        }
+        for kind, status, n, p50, p95 in rows
+    }
+
+
+# --- Reporting ---
+def print_report(result, baseline, regressions):
+    print(
+        f"\n=== {result['size']} interviews: {result['requests']} requests, "
+        f"{result['concurrency']} threads, {result['wall_seconds']}s, {result['throughput_rps']} req/s ==="
+    )
+    header = f"{'route':<20}{'n':>7}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}"
+    if baseline:
+        header += f"{'base p95':>10}"
+    print(header)
+    for name, route in result["routes"].items():
+        line = (
+            f"{name:<20}{route['count']:>7}{route['errors']:>5}{route['p50_ms']:>10.2f}"
+            f"{route['p95_ms']:>10.2f}{route['p99_ms']:>10.2f}{route['throughput_rps']:>9.1f}"
+        )
+        base = (baseline or {}).get("routes", {}).get(name)
+        if base:
+            line += f"{base['p95_ms']:>10.2f}"
+        if name in regressions:
+            line += "  << slower"
+        print(line)
+    for name, job in result["jobs"].items():
+        print(f"job {name:<30}{job['count']:>5}  p50 {job['p50_ms']:.0f} ms  p95 {job['p95_ms']:.0f} ms")
+
+
+def find_regressions(result, baseline, tolerance):
+    regressions = []
+    for name, route in result["routes"].items():
+        base = baseline.get("routes", {}).get(name)
+        if not base or not route["count"]:
+            continue
+        slower = route["p95_ms"] > base["p95_ms"] * (1 + tolerance)
+        if (slower and route["p95_ms"] - base["p95_ms"] > MIN_REGRESSION_MS) or route["errors"] > base["errors"]:
+            regressions.append(name)
+    return regressions
+
+
+def environment_info(args):
+    with connect(args, "postgres") as conn:
+        server = conn.execute("SHOW server_version").fetchone()[0]
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "postgres": server,
+    }
+
+
+def main_cli():
+    global TRANSLATOR_LATENCY, GEMINI_LATENCY
+
+    parser = argparse.ArgumentParser(description="Benchmark the web app against a synthetic archive.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Interviews per database, comma separated (default: %(default)s).")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="Timed requests per size (default: %(default)s).")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Client threads (default: %(default)s).")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP, help="Untimed requests first (default: %(default)s).")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the request mix (default: %(default)s).")
+    parser.add_argument("--translator-latency", type=float, default=TRANSLATOR_LATENCY, help="Seconds per stubbed translated string.")
+    parser.add_argument("--gemini-latency", type=float, default=GEMINI_LATENCY, help="Seconds per stubbed Gemini request.")
+    parser.add_argument("--reseed", action="store_true", help="Recreate the databases even if they are up to date.")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Store the results in {os.path.relpath(BASELINE_DIR, REPO_ROOT)}/.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed p95 growth over the baseline (default: %(default)s).")
+    parser.add_argument("--output", help="Also write the results of every size to this JSON file.")
+    parser.add_argument("--verbose", action="store_true", help="Show the app's own output while the workload runs.")
+    parser.add_argument("--db-prefix", default="hoe_bench", help="Benchmark databases are <prefix>_<size> (default: %(default)s).")
+    parser.add_argument("--db-host", default=os.getenv("PGHOST", "localhost"))
+    parser.add_argument("--db-port", default=os.getenv("PGPORT", "5432"))
+    parser.add_argument("--db-user", default=os.getenv("PGUSER", "postgres"))
+    parser.add_argument("--db-password", default=os.getenv("PGPASSWORD", "666"))
+    args = parser.parse_args()
+    TRANSLATOR_LATENCY, GEMINI_LATENCY = args.translator_latency, args.gemini_latency
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    output = os.path.abspath(args.output) if args.output else None
+
+    workdir = tempfile.mkdtemp(prefix="hoe-bench-")
+    os.chdir(workdir)  # CSV extractions and other relative paths of the app
+    main, extractor = load_app(args, workdir)
+    images, texts = create_media(main)
+    shared = {"images": images, "texts": texts, "image_bytes": upload_image_bytes()}
+    environment = environment_info(args)
+
+    results, failed = [], False
+    for size in sizes:
+        dbname = prepare_database(args, size)
+        use_database(main, extractor, dbname)
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with quiet:
+            run_workload(main.app, args.warmup, args.concurrency, args.seed + 1, shared)
+            latencies, errors, wall = run_workload(main.app, args.requests, args.concurrency, args.seed, shared)
+            jobs = wait_for_jobs(main, JOB_DRAIN_TIMEOUT)
+
+        result = {
+            "size": size,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "wall_seconds": round(wall, 2),
+            "throughput_rps": round(args.requests / wall, 1),
+            "routes": summarize(latencies, errors, wall),
+            "jobs": jobs,
+            "stubs": {"translator_latency": TRANSLATOR_LATENCY, "gemini_latency": GEMINI_LATENCY},
+            "environment": environment,
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        results.append(result)
+
+        baseline_path = os.path.join(BASELINE_DIR, f"{size_label(size)}.json")
+        baseline = None
+        if os.path.exists(baseline_path) and not args.save_baseline:
+            with open(baseline_path, encoding="utf-8") as f:
+                baseline = json.load(f)
+        regressions = find_regressions(result, baseline, args.tolerance) if baseline else []
+        print_report(result, baseline, regressions)
+        if regressions:
+            failed = True
+            print(f"Regressions against {os.path.relpath(baseline_path, REPO_ROOT)}: {', '.join(regressions)}")
+
+        if args.save_baseline:
+            os.makedirs(BASELINE_DIR, exist_ok=True)
+            with open(baseline_path, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2)
+                f.write("\n")
+            print(f"Baseline saved to {os.path.relpath(baseline_path, REPO_ROOT)}")
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
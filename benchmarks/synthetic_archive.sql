@@ -0,0 +1,209 @@
+-- Synthetic archive used by benchmarks/benchmark.py. Never run it against the
+-- real database: seed_synthetic_archive() expects empty tables.
+-- Installed right after init_house_of_emmigrants.sql so that the triggers of
+-- the later scripts (search, page cache, admin listings) see the admin tables.
+
+-- Tables of the admin panel (main.py); created by hand in production
+CREATE TABLE IF NOT EXISTS admins (
+  id_admin   SERIAL    PRIMARY KEY,
+  email      TEXT      NOT NULL UNIQUE,
+  password   TEXT      NOT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS emigrant_stories (
+  id                  SERIAL    PRIMARY KEY,
+  title               TEXT      NOT NULL,
+  summary             TEXT,
+  main_first          TEXT,
+  main_last           TEXT,
+  sex                 TEXT,
+  marital_status      TEXT,
+  education_level     TEXT,
+  destination_city    TEXT,
+  destination_country TEXT,
+  motive              TEXT,
+  travel_duration     TEXT,
+  return_plans        TEXT,
+  created_at          TIMESTAMP NOT NULL DEFAULT now()
+);
+
+
+-- Fills the archive with p_interviews interviews plus proportional people,
+-- immigrations, jobs, education, keywords, stories and admins. setseed()
+-- makes every run with the same size produce the same rows.
+CREATE OR REPLACE PROCEDURE seed_synthetic_archive(p_interviews INT)
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_first TEXT[] := ARRAY['Anna', 'Karl', 'Johan', 'Maria', 'Erik', 'Kristina', 'Lars', 'Ingrid',
+                            'Per', 'Elin', 'Nils', 'Brita', 'Olof', 'Sigrid', 'Gustaf', 'Hilda'];
+    v_last TEXT[] := ARRAY['Andersson', 'Johansson', 'Karlsson', 'Nilsson', 'Eriksson', 'Larsson',
+                           'Olsson', 'Persson', 'Svensson', 'Gustafsson', 'Pettersson', 'Lindqvist'];
+    v_words TEXT[] := ARRAY['farm', 'emigration', 'family', 'ship', 'harvest', 'church', 'letters',
+                            'homestead', 'railroad', 'winter', 'hunger', 'land', 'work', 'village',
+                            'mother', 'father', 'brothers', 'school', 'language', 'america', 'ticket',
+                            'voyage', 'storm', 'arrival', 'city', 'factory', 'mine', 'forest', 'lake',
+                            'wedding', 'children', 'prairie', 'snow', 'debt', 'hope', 'return',
+                            'community', 'lutheran', 'newspaper', 'union', 'strike', 'war', 'army',
+                            'passport', 'relatives', 'savings', 'cattle', 'wheat', 'lumber', 'sawmill',
+                            'fishing', 'boarding house', 'homesickness', 'christmas', 'midsummer',
+                            'songs', 'photographs', 'grandchildren', 'citizenship', 'memories'];
+    v_motives TEXT[] := ARRAY['economic hardship', 'family reunification', 'religious freedom',
+                              'land ownership', 'work opportunities', 'adventure',
+                              'avoiding military service', 'education'];
+    v_occupations TEXT[] := ARRAY['Farmer', 'Maid', 'Carpenter', 'Miner', 'Seamstress', 'Teacher',
+                                  'Railroad worker', 'Lumberjack', 'Blacksmith', 'Nurse', 'Fisherman'];
+    v_countries TEXT[] := ARRAY['Sweden', 'United States', 'Canada', 'Argentina', 'Brazil', 'Australia',
+                                'Norway', 'Denmark', 'Germany', 'United Kingdom', 'Finland', 'Chile',
+                                'Mexico', 'South Africa', 'New Zealand'];
+    v_cities_per_country INT := 8;
+    v_relatives INT := p_interviews / 2;
+BEGIN
+    PERFORM setseed(0.42);
+
+    INSERT INTO sexes (sex) VALUES ('female'), ('male');
+    INSERT INTO marital_statuses (status)
+    SELECT unnest(ARRAY['single', 'married', 'widowed', 'divorced', 'separated', 'engaged']);
+    INSERT INTO legal_statuses (status)
+    SELECT unnest(ARRAY['citizen of origin country', 'naturalized citizen', 'legal immigrant',
+                        'temporary resident', 'refugee', 'undocumented']);
+    INSERT INTO education_levels (level)
+    SELECT unnest(ARRAY['no formal education', 'primary school', 'some secondary school',
+                        'completed secondary school', 'trade or vocational training',
+                        'some college/university', 'completed college/university']);
+    INSERT INTO travel_types (type) VALUES ('steamship'), ('sailing ship'), ('train'), ('emigrant ship');
+    INSERT INTO ports (port) VALUES ('Gothenburg'), ('Liverpool'), ('Hull'), ('New York'), ('Boston'),
+                                    ('Quebec'), ('Buenos Aires');
+    INSERT INTO relationships (relationship_type) VALUES ('mother'), ('father'), ('sister'), ('brother'),
+                                                         ('spouse'), ('cousin'), ('friend');
+    -- Gazetteer (psql/gazetteer.sql) locating every synthetic country and city,
+    -- loaded first so the lookups below are resolved as ingest would
+    IF to_regclass('gazetteer_places') IS NOT NULL THEN
+        INSERT INTO gazetteer_places (id_place, kind, name, country_code, latitude, longitude, population)
+        SELECT 1000 + c.n, 'country', c.name, chr(64 + c.n::INT) || 'X',
+               -50 + random() * 110, -150 + random() * 300, 1000000
+        FROM unnest(v_countries) WITH ORDINALITY AS c(name, n);
+        INSERT INTO gazetteer_places (id_place, kind, name, country_code, latitude, longitude, population)
+        SELECT 100000 + (p.id_place - 1000) * v_cities_per_country + n, 'city', p.name || ' city ' || n,
+               p.country_code, p.latitude + random() * 4 - 2, p.longitude + random() * 4 - 2, 1000 * n
+        FROM gazetteer_places p, generate_series(1, v_cities_per_country) n
+        WHERE p.kind = 'country';
+        INSERT INTO gazetteer_names (name_key, id_place)
+        SELECT person_name_key(name), id_place FROM gazetteer_places;
+    END IF;
+
+    INSERT INTO countries (country) SELECT unnest(v_countries);
+    -- City ids follow (id_country - 1) * v_cities_per_country + n
+    INSERT INTO cities (city, id_country)
+    SELECT c.country || ' city ' || n, c.id_country
+    FROM countries c, generate_series(1, v_cities_per_country) n
+    ORDER BY c.id_country, n;
+    INSERT INTO schools (name) SELECT 'School ' || n FROM generate_series(1, 40) n;
+
+    -- Interviewees are people 1..p_interviews, relatives come after them
+    INSERT INTO people (name, birthday, birthplace_city, birthplace_country, sex, marital_status, legal_status)
+    SELECT v_first[1 + n % cardinality(v_first)] || ' ' || v_last[1 + (n * 7) % cardinality(v_last)] || ' ' || n,
+           CASE WHEN random() < 0.8 THEN date '1840-01-01' + (random() * 60 * 365)::INT END,
+           CASE WHEN random() < 0.7 THEN 1 + (random() * (v_cities_per_country - 1))::INT END,
+           CASE WHEN random() < 0.9 THEN 1 END,
+           CASE WHEN random() < 0.9 THEN 1 + n % 2 END,
+           CASE WHEN random() < 0.7 THEN 1 + (random() * 5)::INT END,
+           CASE WHEN random() < 0.5 THEN 1 + (random() * 5)::INT END
+    FROM generate_series(1, p_interviews + v_relatives) n
+    ORDER BY n;
+
+    INSERT INTO people_relationships (id_people, id_relative, id_type)
+    SELECT 1 + (n - 1) % p_interviews, p_interviews + n, 1 + (random() * 6)::INT
+    FROM generate_series(1, v_relatives) n;
+
+    INSERT INTO text_files (id_people, filename, interview_location, interview_date, story_title, story_summary)
+    SELECT p.id_people,
+           'interview_' || lpad(p.id_people::TEXT, 6, '0') || '.txt',
+           CASE WHEN random() < 0.6 THEN v_countries[1 + (random() * 2)::INT] END,
+           CASE WHEN random() < 0.7 THEN date '1950-01-01' + (random() * 50 * 365)::INT END,
+           'The ' || v_words[1 + (random() * (cardinality(v_words) - 1))::INT] || ' of ' || p.name,
+           p.name || ' remembers the ' || v_words[1 + (random() * (cardinality(v_words) - 1))::INT]
+               || ' and the ' || v_words[1 + (random() * (cardinality(v_words) - 1))::INT] || '.'
+    FROM people p
+    WHERE p.id_people <= p_interviews
+    ORDER BY p.id_people;
+
+    -- One immigration per interviewee, a second one for about 30% of them.
+    -- Destinations are skewed towards the first countries of the list.
+    INSERT INTO immigrations (
+        immigration_date, reason_immigration, id_people, origin_city_id, origin_country_id,
+        destination_city_id, destination_country_id, travel_type_id, entry_port_id,
+        arrival_port_id, return_plans
+    )
+    SELECT CASE WHEN random() < 0.9 THEN date '1850-01-01' + (random() * 80 * 365)::INT END,
+           v_motives[1 + (random() * (cardinality(v_motives) - 1))::INT],
+           e.id_people,
+           1 + (random() * (v_cities_per_country - 1))::INT,
+           1,
+           (e.destination - 1) * v_cities_per_country + 1 + (random() * (v_cities_per_country - 1))::INT,
+           e.destination,
+           1 + (random() * 3)::INT,
+           1 + (random() * 2)::INT,
+           4 + (random() * 3)::INT,
+           CASE WHEN random() < 0.2 THEN 'planned to return' END
+    FROM (
+        SELECT n AS id_people, 2 + floor(power(random(), 2) * (cardinality(v_countries) - 1))::INT AS destination
+        FROM generate_series(1, p_interviews) n, generate_series(1, 2) k
+        WHERE k = 1 OR random() < 0.3
+    ) e
+    ORDER BY e.id_people;
+
+    INSERT INTO jobs (id_people, occupation, employer, job_position, education_level)
+    SELECT n, v_occupations[1 + (random() * (cardinality(v_occupations) - 1))::INT],
+           CASE WHEN random() < 0.3 THEN 'Employer ' || (random() * 500)::INT END, NULL,
+           CASE WHEN random() < 0.5 THEN 1 + (random() * 6)::INT END
+    FROM generate_series(1, p_interviews) n;
+
+    INSERT INTO person_education (id_people, id_school, id_education_level, graduation_year)
+    SELECT n, 1 + (random() * 39)::INT, 1 + (random() * 6)::INT, (1850 + (random() * 60)::INT)::TEXT
+    FROM generate_series(1, p_interviews) n
+    WHERE random() < 0.7;
+
+    -- Eight keywords per interview, frequent words more likely
+    INSERT INTO keywords (keyword, id_text)
+    SELECT v_words[1 + floor(power(random(), 1.5) * cardinality(v_words))::INT], t.id_text
+    FROM text_files t, generate_series(1, 8) k
+    ORDER BY t.id_text, k;
+
+    -- Raw interview text for full-text search (psql/search_index.sql): one word
+    -- in ten comes from v_words, so each of them appears in about 10% of the
+    -- interviews; the rest are filler tokens.
+    IF to_regclass('search_documents') IS NOT NULL THEN
+        UPDATE search_documents d
+        SET body = (SELECT string_agg(CASE WHEN random() < 0.1
+                                           THEN v_words[1 + floor(random() * cardinality(v_words))::INT]
+                                           ELSE 'w' || (random() * 50000)::INT END, ' ')
+                    FROM generate_series(1, 60 + d.source_id % 2))
+        WHERE d.source = 'interview';
+    END IF;
+
+    INSERT INTO emigrant_stories (
+        title, summary, main_first, main_last, sex, marital_status, education_level,
+        destination_city, destination_country, motive, travel_duration, return_plans, created_at
+    )
+    SELECT 'Story ' || n, 'A story about ' || v_words[1 + (random() * (cardinality(v_words) - 1))::INT],
+           v_first[1 + n % cardinality(v_first)], v_last[1 + (n * 5) % cardinality(v_last)],
+           (ARRAY['female', 'male'])[1 + n % 2], 'married', 'primary school',
+           'Chicago', v_countries[2 + floor(power(random(), 2) * (cardinality(v_countries) - 1))::INT],
+           v_motives[1 + (random() * (cardinality(v_motives) - 1))::INT], '3 weeks', NULL,
+           now() - make_interval(secs => random() * 3 * 365 * 86400)
+    FROM generate_series(1, greatest(p_interviews / 10, 50)) n;
+
+    INSERT INTO admins (email, password, created_at)
+    SELECT 'admin' || n || '@example.org', 'not-a-real-hash', now() - make_interval(days => n)
+    FROM generate_series(1, 25) n;
+
+    -- Upload tool listing (psql/media_catalog.sql): the files are not on disk
+    IF to_regclass('media_catalog') IS NOT NULL THEN
+        INSERT INTO media_catalog (path, kind, filename, size_bytes, mtime_ns, content_hash, mime_type)
+        SELECT 'text/' || t.filename, 'text', t.filename, 4000 + (random() * 40000)::INT, 0,
+               md5(t.filename), 'text/plain'
+        FROM text_files t;
+    END IF;
+END;
+$$;
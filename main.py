@@ -6,15 +6,48 @@ from flask import (
     url_for,
     flash,
     session,
-    send_from_directory,
+    g,
+    jsonify,
+    has_request_context,
+    send_file,
+    abort,
+    make_response,
+    before_render_template,
+    template_rendered,
 )
 from psycopg import sql
+from psycopg_pool import ConnectionPool
 import psycopg
 import os
 import json
-import subprocess
+import functools
+import contextlib
+import base64
+import sys
+import time
+import socket
+import atexit
+import hashlib
+import threading
+import gzip
+import glob
+import shutil
+import mimetypes
+import io
+import zipfile
+import urllib.request
 from deep_translator import GoogleTranslator
-from functools import lru_cache
+from collections import OrderedDict
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+from PIL import Image, ImageOps
+import click
+from markupsafe import Markup, escape
+
+try:
+    import brotli  # opcional: variantes .br precomprimidas
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
 app.secret_key = "a12f9c2b4d5e6f7g8h9i0jklmnopqrst"  # Needed for flashing messages
@@ -41,24 +74,489 @@ def is_touch_device():
 
 
 # --- Multimedia serving ---
+from werkzeug.security import safe_join
+
+MEDIA_FOLDER = os.path.join(app.root_path, "multimedia")
+MEDIA_VARIANT_FOLDER = os.path.join(app.root_path, "media_cache", "precompressed")
+# Cache-Control por tipo de archivo; las respuestas siempre llevan ETag, así que
+# al expirar el navegador revalida y recibe un 304 si el archivo no cambió
+MEDIA_CACHE_POLICIES = {
+    "image": "public, max-age=604800, stale-while-revalidate=86400",  # una semana
+    "video": "public, max-age=604800",
+    "audio": "public, max-age=604800",
+    "text": "public, max-age=3600, must-revalidate",
+}
+MEDIA_DEFAULT_CACHE_POLICY = "public, max-age=3600"
+MEDIA_COMPRESSIBLE_TYPES = {"application/json", "application/xml", "image/svg+xml"}
+MEDIA_COMPRESS_MIN_SIZE = 1024  # bytes; archivos más pequeños se envían tal cual
+MEDIA_ENCODINGS = {"br": ".br", "gzip": ".gz"}  # en orden de preferencia
+
+_media_hashes = {}  # ruta -> (mtime_ns, tamaño, sha256)
+_media_hashes_lock = threading.Lock()
+
+
+def media_content_hash(path, stat):
+    """sha256 of a media file, recomputed only when its mtime or size changes."""
+    with _media_hashes_lock:
+        cached = _media_hashes.get(path)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    digest = digest.hexdigest()
+    with _media_hashes_lock:
+        _media_hashes[path] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest
+
+
+def is_compressible(mimetype, size):
+    return size >= MEDIA_COMPRESS_MIN_SIZE and (
+        mimetype.startswith("text/") or mimetype in MEDIA_COMPRESSIBLE_TYPES
+    )
+
+
+def media_variant(path, digest, encoding):
+    """Path of the precompressed ``encoding`` variant of a media file, built once.
+
+    Variants are named after the content hash, so a replaced file gets new
+    ones. Returns None when the encoding is unavailable or does not save space.
+    """
+    if encoding == "br" and brotli is None:
+        return None
+    rel_path = os.path.relpath(path, MEDIA_FOLDER)
+    variant = os.path.join(
+        MEDIA_VARIANT_FOLDER, f"{rel_path}.{digest[:16]}{MEDIA_ENCODINGS[encoding]}"
+    )
+    if not os.path.exists(variant):
+        with open(path, "rb") as f:
+            data = f.read()
+        if encoding == "br":
+            compressed = brotli.compress(data, quality=11)
+        else:
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        os.makedirs(os.path.dirname(variant), exist_ok=True)
+        tmp_path = f"{variant}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(compressed)
+        os.replace(tmp_path, variant)
+    if os.path.getsize(variant) >= os.path.getsize(path):
+        return None
+    return variant
+
+
+def resolve_media_path(rel_path):
+    """(full path, catalog path) of a media path posted by the upload tool.
+
+    The catalog path is relative to MEDIA_FOLDER with "/" separators, as
+    ``flask reconcile-media-catalog`` writes it. Returns (None, None) when the
+    path is missing or leaves MEDIA_FOLDER.
+    """
+    full_path = safe_join(MEDIA_FOLDER, rel_path) if rel_path else None
+    if full_path is None:
+        return None, None
+    return full_path, os.path.relpath(full_path, MEDIA_FOLDER).replace(os.sep, "/")
+
+
+def discard_media_variants(rel_path):
+    """Removes the precompressed variants of a deleted or replaced media file."""
+    for ext in MEDIA_ENCODINGS.values():
+        for variant in glob.glob(
+            os.path.join(MEDIA_VARIANT_FOLDER, f"{glob.escape(rel_path)}.*{ext}")
+        ):
+            os.remove(variant)
+
+
+# --- Image derivatives ---
+# Copias reducidas de cada imagen, guardadas por hash del original: una
+# imagen reemplazada obtiene derivados nuevos y dos copias idénticas los comparten
+IMAGE_DERIVATIVE_FOLDER = os.path.join(app.root_path, "media_cache", "images")
+IMAGE_DERIVATIVE_WIDTHS = [160, 320, 640, 1280]  # 160 = miniatura
+IMAGE_DERIVATIVE_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 6}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+IMAGE_DERIVATIVE_TYPES = {"image/png", "image/jpeg", "image/webp"}  # GIF se sirve tal cual
+IMAGE_BACKFILL_WORKERS = os.cpu_count() or 1
+
+
+def image_derivative_path(digest, width, fmt):
+    return os.path.join(IMAGE_DERIVATIVE_FOLDER, digest[:2], digest, f"{width}.{fmt}")
+
+
+def build_image_derivatives(path, digest, force=False):
+    """Writes the WebP and JPEG derivatives of one image; returns how many were written.
+
+    Widths are never upscaled: the first width at least as wide as the
+    original holds a re-encoded full-size copy and larger ones are skipped.
+    Top-level so the backfill process pool can run it.
+    """
+    written = 0
+    with Image.open(path) as source:
+        image = ImageOps.exif_transpose(source)
+        has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+        for width in IMAGE_DERIVATIVE_WIDTHS:
+            target = min(width, image.width)
+            resized = image.resize(
+                (target, max(1, round(image.height * target / image.width))),
+                Image.LANCZOS,
+            ) if target < image.width else image
+
+            for fmt, (pil_format, options) in IMAGE_DERIVATIVE_FORMATS.items():
+                out_path = image_derivative_path(digest, width, fmt)
+                if os.path.exists(out_path) and not force:
+                    continue
+                frame = resized
+                if pil_format == "JPEG" and has_alpha:
+                    frame = Image.new("RGB", resized.size, "white")
+                    frame.paste(resized, mask=resized.getchannel("A"))
+                os.makedirs(os.path.dirname(out_path), exist_ok=True)
+                tmp_path = f"{out_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                frame.save(tmp_path, pil_format, **options)
+                os.replace(tmp_path, out_path)
+                written += 1
+
+            if target == image.width:
+                break
+    return written
+
+
+def image_derivative_for(path, digest, width, fmt):
+    """(width, path) of the smallest derivative at least ``width`` wide, else the largest.
+
+    Derivatives missing for this image are built on first use. Returns None
+    when they can't be built (corrupt or unsupported image), so the caller
+    serves the original file.
+    """
+    candidates = [(w, image_derivative_path(digest, w, fmt)) for w in IMAGE_DERIVATIVE_WIDTHS]
+    if not os.path.exists(candidates[0][1]):
+        try:
+            build_image_derivatives(path, digest)
+        except Exception as e:
+            print(f"Error generando derivados de {path}: {e}")
+            return None
+    existing = [(w, p) for w, p in candidates if os.path.exists(p)]
+    for w, p in existing:
+        if w >= width:
+            return w, p
+    return existing[-1] if existing else None
+
+
+def process_uploaded_image(save_path, rel_path):
+    """Queues the derivatives of a just uploaded or replaced image."""
+    mimetype = mimetypes.guess_type(save_path)[0]
+    if mimetype not in IMAGE_DERIVATIVE_TYPES:
+        return
+    try:
+        track_upload_job(enqueue_job("image_derivatives", save_path), rel_path)
+    except Exception as e:
+        flash(f"Image saved, but its thumbnails could not be queued: {e}", "warning")
+
+
+@app.template_global()
+def media_srcset(filename):
+    """srcset listing every derivative width of an archive image."""
+    return ", ".join(
+        f"{url_for('serve_multimedia', filename=filename, w=w)} {w}w"
+        for w in IMAGE_DERIVATIVE_WIDTHS
+    )
+
+
+def _build_image_derivatives_job(job):
+    path, digest, force = job
+    try:
+        return path, build_image_derivatives(path, digest, force), None
+    except Exception as e:
+        return path, 0, str(e)
+
+
+@app.cli.command("build-image-derivatives")
+@click.option("--workers", default=IMAGE_BACKFILL_WORKERS, show_default=True, help="Worker processes.")
+@click.option("--force", is_flag=True, help="Rebuild derivatives that already exist.")
+@click.option("--prune", is_flag=True, help="Delete derivatives of images no longer in the library.")
+def build_image_derivatives_command(workers, force, prune):
+    """Backfills thumbnails and responsive variants for the whole image library."""
+    jobs = []
+    for dirpath, _, filenames in os.walk(MEDIA_FOLDER):
+        for fname in filenames:
+            path = os.path.join(dirpath, fname)
+            if mimetypes.guess_type(path)[0] in IMAGE_DERIVATIVE_TYPES:
+                jobs.append((path, media_content_hash(path, os.stat(path)), force))
+
+    written = failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        for path, count, error in pool.map(_build_image_derivatives_job, jobs, chunksize=4):
+            written += count
+            if error:
+                failed += 1
+                print(f"Failed {os.path.relpath(path, MEDIA_FOLDER)}: {error}")
+    print(f"{len(jobs)} images, {written} derivatives written, {failed} failed")
+
+    if prune and os.path.isdir(IMAGE_DERIVATIVE_FOLDER):
+        live = {digest for _, digest, _ in jobs}
+        removed = 0
+        for prefix in os.listdir(IMAGE_DERIVATIVE_FOLDER):
+            for digest in os.listdir(os.path.join(IMAGE_DERIVATIVE_FOLDER, prefix)):
+                if digest not in live:
+                    shutil.rmtree(os.path.join(IMAGE_DERIVATIVE_FOLDER, prefix, digest))
+                    removed += 1
+        print(f"Pruned derivatives of {removed} images no longer in the library")
+
+
 @app.route("/multimedia/<path:filename>")
 def serve_multimedia(filename):
-    return send_from_directory("multimedia", filename)
+    """Serves archive media with strong ETags, per-type caching and byte ranges.
+
+    Conditional requests (If-None-Match, If-Range) and Range are handled by
+    send_file against the content-hash ETag. Text files are answered with a
+    precompressed br/gzip variant when the client accepts one; the file is
+    passed to the server as-is (sendfile when available), never re-read here.
+    Images requested with ``?w=<px>`` get the smallest derivative at least
+    that wide, as WebP when the browser accepts it and JPEG otherwise.
+    """
+    path = safe_join(MEDIA_FOLDER, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    stat = os.stat(path)
+    digest = media_content_hash(path, stat)
+    mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    send_path, etag, encoding = path, digest, None
+
+    width = request.args.get("w", type=int)
+    if width and width > 0 and mimetype in IMAGE_DERIVATIVE_TYPES:
+        # Solo si el navegador anuncia WebP explícitamente (*/* no cuenta)
+        fmt = "webp" if "image/webp" in request.headers.get("Accept", "") else "jpeg"
+        derivative = image_derivative_for(path, digest, width, fmt)
+        if derivative:
+            derivative_width, derivative_path = derivative
+            response = send_file(
+                derivative_path,
+                mimetype=f"image/{fmt}",
+                etag=f"{digest}-{derivative_width}-{fmt}",
+                conditional=True,
+            )
+            response.vary.add("Accept")
+            response.headers["Cache-Control"] = MEDIA_CACHE_POLICIES["image"]
+            return response
+
+    compressible = is_compressible(mimetype, stat.st_size)
+    if compressible:
+        for candidate in MEDIA_ENCODINGS:
+            if request.accept_encodings.quality(candidate) > 0:
+                variant = media_variant(path, digest, candidate)
+                if variant:
+                    send_path, etag, encoding = variant, f"{digest}-{candidate}", candidate
+                    break
+
+    response = send_file(send_path, mimetype=mimetype, etag=etag, conditional=True)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    if compressible:
+        response.vary.add("Accept-Encoding")
+    response.headers["Cache-Control"] = MEDIA_CACHE_POLICIES.get(
+        mimetype.split("/")[0], MEDIA_DEFAULT_CACHE_POLICY
+    )
+    return response
+
+
+@app.cli.command("precompress-media")
+def precompress_media():
+    """Builds the br/gzip variants of every compressible media file ahead of time."""
+    built = 0
+    for dirpath, _, filenames in os.walk(MEDIA_FOLDER):
+        for fname in filenames:
+            path = os.path.join(dirpath, fname)
+            stat = os.stat(path)
+            mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            if not is_compressible(mimetype, stat.st_size):
+                continue
+            digest = media_content_hash(path, stat)
+            for encoding in MEDIA_ENCODINGS:
+                if media_variant(path, digest, encoding):
+                    built += 1
+    print(f"{built} precompressed variants ready in {MEDIA_VARIANT_FOLDER}")
 
 
 # --- Funciones de traducción ---
-@lru_cache(maxsize=1000)
+TRANSLATION_LRU_SIZE = int(os.getenv("TRANSLATION_LRU_SIZE", "5000"))
+TRANSLATION_WORKERS = int(os.getenv("TRANSLATION_WORKERS", "4"))
+TRANSLATION_DEADLINE = float(os.getenv("TRANSLATION_DEADLINE", "3"))  # segundos
+
+# LRU en memoria delante de translation_cache: (texto, idioma) -> traducción
+_translation_memory = OrderedDict()
+_translation_memory_lock = threading.Lock()
+_translation_executor = ThreadPoolExecutor(
+    max_workers=TRANSLATION_WORKERS, thread_name_prefix="translate"
+)
+
+
+def translation_key(text):
+    """Hash used as key in the translation_cache table."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _remember_translations(target_lang, translations):
+    with _translation_memory_lock:
+        for text, translated in translations.items():
+            _translation_memory[(text, target_lang)] = translated
+            _translation_memory.move_to_end((text, target_lang))
+        while len(_translation_memory) > TRANSLATION_LRU_SIZE:
+            _translation_memory.popitem(last=False)
+
+
+def get_stored_translations(texts, target_lang):
+    """Busca varias traducciones en translation_cache con una sola consulta."""
+    keys = {translation_key(text): text for text in texts}
+    try:
+        with get_db_pool().connection() as conn:
+            rows = conn.execute(
+                "SELECT text_hash, translated_text FROM translation_cache "
+                "WHERE target_lang = %s AND text_hash = ANY(%s)",
+                (target_lang, list(keys)),
+            ).fetchall()
+        return {keys[text_hash]: translated for text_hash, translated in rows}
+    except psycopg.Error as e:
+        print(f"Error leyendo caché de traducciones: {e}")
+        return {}
+
+
+def store_translations(target_lang, translations):
+    """Guarda traducciones para que las reutilicen todos los procesos."""
+    if not translations:
+        return
+    try:
+        with get_db_pool().connection() as conn:
+            with conn.cursor() as cur:
+                cur.executemany(
+                    "INSERT INTO translation_cache "
+                    "(text_hash, target_lang, source_text, translated_text) "
+                    "VALUES (%s, %s, %s, %s) ON CONFLICT DO NOTHING",
+                    [
+                        (translation_key(text), target_lang, text, translated)
+                        for text, translated in translations.items()
+                    ],
+                )
+    except psycopg.Error as e:
+        print(f"Error guardando caché de traducciones: {e}")
+
+
+def _translate_one(text, target_lang):
+    # Corre en el pool de traducción, una cadena por tarea: deep_translator hace
+    # una petición HTTP por cadena (translate_batch solo las recorre en serie).
+    # Guarda el resultado aunque la petición que lo pidió ya haya vencido su plazo
+    translated = GoogleTranslator(source="auto", target=target_lang).translate(text)
+    if not translated:
+        return {}
+    result = {text: translated}
+    store_translations(target_lang, result)
+    _remember_translations(target_lang, result)
+    return result
+
+
+def translate_many(texts, target_lang, deadline=TRANSLATION_DEADLINE):
+    """Translates several strings, returning a {text: translation} dict.
+
+    Strings are deduplicated, looked up in memory and then in translation_cache
+    in one query; only the remaining misses reach the translator, one string
+    per task on a bounded pool. Anything not translated before ``deadline``
+    seconds (None waits forever) or that fails falls back to the source.
+    """
+    unique = [text for text in dict.fromkeys(texts) if text]
+    if target_lang == DEFAULT_LANGUAGE or not unique:
+        return {text: text for text in unique}
+
+    started = time.perf_counter()
+    with metrics_phase("translate"):
+        result = {}
+        misses = []
+        with _translation_memory_lock:
+            for text in unique:
+                key = (text, target_lang)
+                if key in _translation_memory:
+                    _translation_memory.move_to_end(key)
+                    result[text] = _translation_memory[key]
+                else:
+                    misses.append(text)
+        TRANSLATION_STRINGS.inc(len(result), target_lang, "memory")
+
+        if misses:
+            stored = get_stored_translations(misses, target_lang)
+            _remember_translations(target_lang, stored)
+            result.update(stored)
+            TRANSLATION_STRINGS.inc(len(stored), target_lang, "db")
+            misses = [text for text in misses if text not in stored]
+
+        translator_misses = len(misses)
+        if misses:
+            futures = {
+                _translation_executor.submit(_translate_one, text, target_lang): text
+                for text in misses
+            }
+            done, not_done = wait(futures, timeout=deadline)
+            for future in done:
+                try:
+                    result.update(future.result())
+                except Exception as e:
+                    print(f"Error al traducir {futures[future][:40]!r}: {e}")
+            if not_done:
+                print(
+                    f"Traducción: {len(not_done)} cadenas superaron el plazo de {deadline}s"
+                )
+
+    TRANSLATION_STRINGS.inc(len(unique) - len(result), target_lang, "fallback")
+    TRANSLATION_STRINGS.inc(translator_misses - (len(unique) - len(result)), target_lang, "translator")
+    TRANSLATION_DURATION.observe(
+        time.perf_counter() - started, target_lang, "miss" if translator_misses else "hit"
+    )
+    if len(result) < len(unique):
+        # No cachear la página con textos sin traducir
+        mark_page_uncacheable()
+    return {text: result.get(text, text) for text in unique}
+
+
 def translate_text(text, target_lang):
-    """Traduce texto al idioma especificado usando caché para eficiencia"""
+    """Traduce texto al idioma especificado (LRU en memoria + caché en Postgres)"""
     if not text or target_lang == DEFAULT_LANGUAGE:
         return text
+    return translate_many([text], target_lang).get(text, text)
 
-    try:
-        translator = GoogleTranslator(source="auto", target=target_lang)
-        return translator.translate(text)
-    except Exception as e:
-        print(f"Error al traducir: {e}")
-        return text
+
+@app.cli.command("warm-translations")
+def warm_translations():
+    """Pre-translates titles, summaries, keywords and place names after an ingest."""
+    with get_db_pool().connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT story_title FROM text_files
+            UNION SELECT story_summary FROM text_files
+            UNION SELECT trim(keyword) FROM keywords
+            UNION SELECT country FROM countries
+            UNION SELECT city FROM cities
+            UNION SELECT port FROM ports
+            UNION SELECT type FROM travel_types
+            """
+        ).fetchall()
+    texts = [r[0] for r in rows if r[0] and r[0].strip()]
+
+    for lang in LANGUAGES:
+        if lang == DEFAULT_LANGUAGE:
+            continue
+        with get_db_pool().connection() as conn:
+            done = {
+                r[0]
+                for r in conn.execute(
+                    "SELECT text_hash FROM translation_cache WHERE target_lang = %s",
+                    (lang,),
+                )
+            }
+        pending = [t for t in texts if translation_key(t) not in done]
+        print(f"[{lang}] {len(texts) - len(pending)} cached, {len(pending)} to translate")
+        translate_many(pending, lang, deadline=None)
 
 
 def get_current_language():
@@ -75,35 +573,43 @@ def switch_language(lang):
 
 
 # Función para procesar y traducir datos del dashboard
+DASHBOARD_TEXT_KEYS = ["wf_words", "geo_countries", "motive_labels", "transport_labels"]
+STORY_TEXT_FIELDS = [
+    "title",
+    "summary",
+    "motive",
+    "travel_duration",
+    "return_plans",
+    "destination_city",
+    "destination_country",
+]
+
+
 def process_dashboard_data(data, target_lang):
     """Traduce los datos del dashboard al idioma especificado"""
     if target_lang == DEFAULT_LANGUAGE:
         return data
 
-    translated_data = {}
+    # Reunir todas las cadenas para traducirlas en un solo lote
+    texts = []
+    for key in DASHBOARD_TEXT_KEYS:
+        texts.extend(data.get(key, []))
+    for story in data.get("stories", []):
+        texts.extend(story.get(field) for field in STORY_TEXT_FIELDS)
+        texts.extend(story.get("mentions") or [])
+        texts.extend(story.get("methods") or [])
+    translations = translate_many(texts, target_lang)
 
-    # Traducir palabras clave
-    if "wf_words" in data:
-        translated_data["wf_words"] = [
-            translate_text(word, target_lang) for word in data["wf_words"]
-        ]
+    def tr(text):
+        return translations.get(text, text) if text else text
 
-    # Traducir países/ciudades
-    if "geo_countries" in data:
-        translated_data["geo_countries"] = [
-            translate_text(country, target_lang) for country in data["geo_countries"]
-        ]
+    # Los datos numéricos se copian sin traducir
+    translated_data = data.copy()
 
-    # Copiar datos numéricos sin traducir
-    for key in [
-        "wf_counts",
-        "geo_counts",
-        "timeline_years",
-        "timeline_counts",
-        "drilldown_data",
-    ]:
+    # Traducir palabras clave, países, motivos y medios de transporte
+    for key in DASHBOARD_TEXT_KEYS:
         if key in data:
-            translated_data[key] = data[key]
+            translated_data[key] = [tr(text) for text in data[key]]
 
     # Traducir historias
     if "stories" in data:
@@ -111,29 +617,14 @@ def process_dashboard_data(data, target_lang):
         for story in data["stories"]:
             translated_story = story.copy()
             # Traducir campos de texto de la historia
-            for field in [
-                "title",
-                "summary",
-                "motive",
-                "travel_duration",
-                "return_plans",
-                "destination_city",
-                "destination_country",
-            ]:
+            for field in STORY_TEXT_FIELDS:
                 if field in story and story[field]:
-                    translated_story[field] = translate_text(story[field], target_lang)
-
-            # Traducir menciones
-            if "mentions" in story and story["mentions"]:
-                translated_story["mentions"] = [
-                    translate_text(m, target_lang) for m in story["mentions"] if m
-                ]
+                    translated_story[field] = tr(story[field])
 
-            # Traducir métodos de viaje
-            if "methods" in story and story["methods"]:
-                translated_story["methods"] = [
-                    translate_text(m, target_lang) for m in story["methods"] if m
-                ]
+            # Traducir menciones y métodos de viaje
+            for field in ["mentions", "methods"]:
+                if field in story and story[field]:
+                    translated_story[field] = [tr(m) for m in story[field] if m]
 
             translated_stories.append(translated_story)
 
@@ -157,6 +648,262 @@ def allowed_file(filename, allowed_extensions):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in allowed_extensions
 
 
+# --- Media catalog (psql/media_catalog.sql) ---
+MEDIA_CATALOG_PAGE_SIZE = 48
+MEDIA_CATALOG_BATCH_SIZE = 1000  # filas por executemany en la reconciliación
+# kind -> (folder under multimedia/, allowed extensions)
+MEDIA_CATALOG_FOLDERS = {
+    "image": ("images", ALLOWED_IMAGE_EXTENSIONS),
+    "text": ("text", ALLOWED_TEXT_EXTENSIONS),
+}
+
+UPSERT_MEDIA_CATALOG_SQL = """
+    INSERT INTO media_catalog AS m (path, kind, filename, size_bytes, mtime_ns, content_hash, mime_type)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (path) DO UPDATE
+    SET kind = EXCLUDED.kind, size_bytes = EXCLUDED.size_bytes, mtime_ns = EXCLUDED.mtime_ns,
+        content_hash = EXCLUDED.content_hash, mime_type = EXCLUDED.mime_type, updated_at = now()
+    WHERE (m.size_bytes, m.mtime_ns, m.content_hash) IS DISTINCT FROM
+          (EXCLUDED.size_bytes, EXCLUDED.mtime_ns, EXCLUDED.content_hash)
+"""
+
+
+def media_kind(rel_path):
+    """Catalog kind of a path relative to multimedia/, or None."""
+    folder = rel_path.replace(os.sep, "/").split("/", 1)[0]
+    for kind, (kind_folder, extensions) in MEDIA_CATALOG_FOLDERS.items():
+        if folder == kind_folder and allowed_file(rel_path, extensions):
+            return kind
+    return None
+
+
+def media_catalog_entry(kind, rel_path, stat=None):
+    rel_path = rel_path.replace(os.sep, "/")
+    full_path = os.path.join(MEDIA_FOLDER, rel_path)
+    stat = stat or os.stat(full_path)
+    return (
+        rel_path,
+        kind,
+        os.path.basename(rel_path),
+        stat.st_size,
+        stat.st_mtime_ns,
+        media_content_hash(full_path, stat),
+        mimetypes.guess_type(full_path)[0],
+    )
+
+
+def catalog_media_files(conn, entries):
+    """Upserts catalog entries and links them to text_files/image_files."""
+    with conn.cursor() as cur:
+        cur.executemany(UPSERT_MEDIA_CATALOG_SQL, entries)
+        cur.execute("SELECT link_media_catalog(%s)", ([entry[2] for entry in entries],))
+
+
+def update_media_catalog(rel_path):
+    """Records a file just uploaded or replaced through the upload tool."""
+    kind = media_kind(rel_path)
+    if kind is None:
+        return
+    try:
+        conn = get_db_connection()
+        catalog_media_files(conn, [media_catalog_entry(kind, rel_path)])
+        conn.commit()
+    except (OSError, psycopg.Error) as e:
+        rollback_db_connection()
+        flash(f"{rel_path} was saved, but the media catalog could not be updated: {e}", "warning")
+
+
+def remove_from_media_catalog(rel_path):
+    try:
+        conn = get_db_connection()
+        conn.execute("DELETE FROM media_catalog WHERE path = %s", (rel_path.replace(os.sep, "/"),))
+        conn.commit()
+    except psycopg.Error as e:
+        rollback_db_connection()
+        flash(f"{rel_path} was deleted, but the media catalog could not be updated: {e}", "warning")
+
+
+def get_media_catalog_page(conn, kind, query, after=None, before=None):
+    """Returns (files, total, exact_total, next_cursor, prev_cursor) for one page of the upload tool.
+
+    Pages seek on (kind, filename, id_media) like the admin listings, and the
+    total is the planner's estimate above EXACT_COUNT_THRESHOLD.
+    """
+    conditions = []
+    if kind:
+        conditions.append(sql.SQL("kind = {}").format(sql.Literal(kind)))
+    if query:
+        pattern = "%" + query.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        conditions.append(sql.SQL("lower(filename) LIKE {}").format(sql.Literal(pattern)))
+
+    rows, next_cursor, prev_cursor = keyset_page(
+        conn,
+        "media_catalog",
+        sql.SQL("path, kind, filename, size_bytes, mime_type, id_text, id_image"),
+        [sql.Identifier("kind"), sql.Identifier("filename"), sql.Identifier("id_media")],
+        conditions,
+        False,
+        after=after,
+        before=before,
+        page_size=MEDIA_CATALOG_PAGE_SIZE,
+    )
+    total, exact_total = estimate_row_count(conn, "media_catalog", conditions)
+
+    files = [
+        {
+            "path": row[0],
+            "type": row[1],
+            "name": row[2],
+            "size": row[3],
+            "mime_type": row[4],
+            "id_text": row[5],
+            "id_image": row[6],
+        }
+        for row in rows
+    ]
+    return files, total, exact_total, next_cursor, prev_cursor
+
+
+@app.cli.command("reconcile-media-catalog")
+def reconcile_media_catalog():
+    """Syncs media_catalog with files added, changed or removed outside the app."""
+    on_disk = {}
+    for kind, (folder, extensions) in MEDIA_CATALOG_FOLDERS.items():
+        folder_path = os.path.join(MEDIA_FOLDER, folder)
+        if not os.path.isdir(folder_path):
+            continue
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                if entry.is_file() and allowed_file(entry.name, extensions):
+                    on_disk[f"{folder}/{entry.name}"] = (kind, entry.stat())
+
+    with get_db_pool().connection() as conn:
+        known = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in conn.execute("SELECT path, size_bytes, mtime_ns FROM media_catalog")
+        }
+        # Only new files and files whose size or mtime changed are hashed again
+        changed = [
+            (path, kind, stat)
+            for path, (kind, stat) in on_disk.items()
+            if known.get(path) != (stat.st_size, stat.st_mtime_ns)
+        ]
+        removed = [path for path in known if path not in on_disk]
+
+        for start in range(0, len(changed), MEDIA_CATALOG_BATCH_SIZE):
+            batch = changed[start : start + MEDIA_CATALOG_BATCH_SIZE]
+            catalog_media_files(conn, [media_catalog_entry(kind, path, stat) for path, kind, stat in batch])
+            conn.commit()
+        if removed:
+            conn.execute("DELETE FROM media_catalog WHERE path = ANY(%s)", (removed,))
+
+    print(f"Media catalog: {len(changed)} added or updated, {len(removed)} removed, {len(on_disk)} files on disk.")
+
+
+@app.cli.command("dedupe-people")
+@click.option("--dry-run", is_flag=True, help="List the people that would be merged without merging them.")
+def dedupe_people(dry_run):
+    """Merges people recorded twice under different spellings (psql/person_resolution.sql)."""
+    with get_db_pool().connection() as conn:
+        if dry_run:
+            pairs = conn.execute(
+                """
+                SELECT d.kept_id, k.name, d.merged_id, m.name, d.score
+                FROM find_duplicate_people() d
+                JOIN people k ON k.id_people = d.kept_id
+                JOIN people m ON m.id_people = d.merged_id
+                ORDER BY d.merged_id
+                """
+            ).fetchall()
+            for kept_id, kept_name, merged_id, merged_name, score in pairs:
+                print(f"{merged_id} {merged_name!r} -> {kept_id} {kept_name!r} (score {score:.2f})")
+            print(f"{len(pairs)} people would be merged.")
+            return
+        before = conn.execute("SELECT count(*) FROM person_merges").fetchone()[0]
+        conn.execute("CALL merge_duplicate_people()")
+        merged = conn.execute("SELECT count(*) FROM person_merges").fetchone()[0] - before
+    print(f"Merged {merged} duplicate people.")
+
+
+# --- Gazetteer (psql/gazetteer.sql) ---
+# GeoNames dumps, read from GAZETTEER_DIR; --download fetches the missing ones
+GAZETTEER_DIR = os.getenv("GAZETTEER_DIR", os.path.join(app.root_path, "gazetteer"))
+GAZETTEER_SOURCES = {
+    "cities": "https://download.geonames.org/export/dump/cities15000.zip",
+    "countries": "https://download.geonames.org/export/dump/countryInfo.txt",
+}
+GAZETTEER_IMPORT_COLUMNS = (
+    "id_place, kind, name, ascii_name, alternate_names, country_code, latitude, longitude, population, is_capital"
+)
+
+
+def read_geonames_rows(path):
+    """Tab-separated rows of a GeoNames dump (.txt or the .zip holding it), without comments."""
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            member = os.path.basename(path)[: -len(".zip")] + ".txt"
+            with archive.open(member) as raw:
+                for line in io.TextIOWrapper(raw, encoding="utf-8"):
+                    if line.strip() and not line.startswith("#"):
+                        yield line.rstrip("\n").split("\t")
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip() and not line.startswith("#"):
+                    yield line.rstrip("\n").split("\t")
+
+
+def gazetteer_import_rows(cities_path, countries_path):
+    """gazetteer_import rows: GeoNames cities (main dump format) and countryInfo."""
+    for row in read_geonames_rows(cities_path):
+        yield (
+            int(row[0]), "city", row[1], row[2], row[3], row[8],
+            float(row[4]), float(row[5]), int(row[14] or 0), row[7] == "PPLC",
+        )
+    for row in read_geonames_rows(countries_path):
+        # ISO, ISO3, ISO-Numeric, fips, Country, Capital, Area, Population, ..., geonameid (16)
+        if len(row) > 16 and row[16]:
+            yield (int(row[16]), "country", row[4], None, row[1], row[0], None, None, int(row[7] or 0), False)
+
+
+@app.cli.command("import-gazetteer")
+@click.option("--cities", "cities_path", help="GeoNames cities dump (default: cities15000.zip in GAZETTEER_DIR).")
+@click.option("--countries", "countries_path", help="GeoNames countryInfo.txt (default: in GAZETTEER_DIR).")
+@click.option("--download", is_flag=True, help="Download the default files missing from GAZETTEER_DIR.")
+def import_gazetteer(cities_path, countries_path, download):
+    """Loads place coordinates from local GeoNames files and links the archive's places to them."""
+    paths = {"cities": cities_path, "countries": countries_path}
+    for name, url in GAZETTEER_SOURCES.items():
+        if paths[name]:
+            continue
+        paths[name] = os.path.join(GAZETTEER_DIR, os.path.basename(url))
+        if not os.path.exists(paths[name]):
+            if not download:
+                raise click.ClickException(f"{paths[name]} not found; pass --download or --{name}.")
+            os.makedirs(GAZETTEER_DIR, exist_ok=True)
+            print(f"Downloading {url}...")
+            urllib.request.urlretrieve(url, paths[name] + ".part")
+            os.replace(paths[name] + ".part", paths[name])
+
+    with get_db_pool().connection() as conn:
+        conn.execute("TRUNCATE gazetteer_import")
+        imported = 0
+        with conn.cursor() as cur:
+            with cur.copy(f"COPY gazetteer_import ({GAZETTEER_IMPORT_COLUMNS}) FROM STDIN") as copy:
+                for row in gazetteer_import_rows(paths["cities"], paths["countries"]):
+                    copy.write_row(row)
+                    imported += 1
+        conn.execute("CALL apply_gazetteer_import()")
+        located = conn.execute(
+            """
+            SELECT (SELECT count(*) FILTER (WHERE id_place IS NOT NULL) || '/' || count(*) FROM countries),
+                   (SELECT count(*) FILTER (WHERE id_place IS NOT NULL) || '/' || count(*) FROM cities),
+                   (SELECT count(*) FILTER (WHERE id_place IS NOT NULL) || '/' || count(*) FROM ports)
+            """
+        ).fetchone()
+    print(f"Imported {imported} places. Located countries {located[0]}, cities {located[1]}, ports {located[2]}.")
+
+
 # --- Delete file endpoint ---
 @app.route("/delete-file", methods=["POST"])
 def delete_file():
@@ -164,11 +911,16 @@ def delete_file():
         flash("Login required.", "danger")
         return redirect(url_for("login"))
 
-    rel_path = request.form.get("file_path")
-    full_path = os.path.join("multimedia", rel_path)
+    # Mismo chequeo que serve_multimedia: nada fuera de MEDIA_FOLDER
+    full_path, rel_path = resolve_media_path(request.form.get("file_path"))
+    if full_path is None:
+        flash("Invalid file path.", "danger")
+        return redirect(url_for("upload_tool"))
 
     try:
         os.remove(full_path)
+        discard_media_variants(rel_path)
+        remove_from_media_catalog(rel_path)
         flash(f"Deleted {rel_path}", "success")
     except FileNotFoundError:
         flash(f"File not found: {rel_path}", "warning")
@@ -185,16 +937,22 @@ def replace_file():
         flash("Login required.", "danger")
         return redirect(url_for("login"))
 
-    orig_path = request.form.get("orig_path")
     new_file = request.files.get("new_file")
 
     if not new_file or new_file.filename == "":
         flash("No replacement file selected.", "warning")
         return redirect(url_for("upload_tool"))
 
-    full_orig = os.path.join("multimedia", orig_path)
+    full_orig, orig_path = resolve_media_path(request.form.get("orig_path"))
+    if full_orig is None:
+        flash("Invalid file path.", "danger")
+        return redirect(url_for("upload_tool"))
+
     try:
         new_file.save(full_orig)
+        discard_media_variants(orig_path)
+        update_media_catalog(orig_path)
+        process_uploaded_image(full_orig, orig_path)
         flash(f"Replaced {orig_path}", "success")
     except Exception as e:
         flash(f"Error replacing {orig_path}: {e}", "danger")
@@ -210,14 +968,492 @@ DB_HOST = "localhost"
 DB_PORT = "5432"
 
 
+# --- Connection pool settings ---
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "300"))  # segundos
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))  # espera de checkout
+
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+
+def get_db_pool():
+    """Returns the process-wide connection pool, opening it on first use."""
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                pool = ConnectionPool(
+                    kwargs=dict(
+                        dbname=DB_NAME,
+                        user=DB_USER,
+                        password=DB_PASS,
+                        host=DB_HOST,
+                        port=DB_PORT,
+                        cursor_factory=TimedCursor,
+                    ),
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=DB_POOL_MAX_SIZE,
+                    max_idle=DB_POOL_MAX_IDLE,  # cierra conexiones ociosas
+                    timeout=DB_POOL_TIMEOUT,
+                    check=ConnectionPool.check_connection,  # health check
+                    name="house_of_emigrants",
+                    open=False,
+                )
+                pool.open()
+                atexit.register(pool.close)
+                _db_pool = pool
+    return _db_pool
+
+
 def get_db_connection():
-    return psycopg.connect(
-        dbname=DB_NAME, user=DB_USER, password=DB_PASS, host=DB_HOST, port=DB_PORT
+    """Checks out a pooled connection for the current request.
+
+    The connection is shared by every call within the same request and is
+    returned to the pool by ``release_db_connection`` on teardown, so routes
+    must not close it. Outside a request (scripts, CLI) a plain connection is
+    returned and the caller is responsible for closing it.
+    """
+    if not has_request_context():
+        return psycopg.connect(
+            dbname=DB_NAME,
+            user=DB_USER,
+            password=DB_PASS,
+            host=DB_HOST,
+            port=DB_PORT,
+            cursor_factory=TimedCursor,
+        )
+
+    if "db_conn" not in g:
+        g.db_conn = get_db_pool().getconn()
+    return g.db_conn
+
+
+@app.teardown_request
+def release_db_connection(exc):
+    """Devuelve la conexión de la petición al pool."""
+    conn = g.pop("db_conn", None)
+    if conn is None:
+        return
+
+    # Descartar cualquier transacción que la ruta no haya confirmado
+    if conn.info.transaction_status != psycopg.pq.TransactionStatus.IDLE:
+        try:
+            conn.rollback()
+        except psycopg.Error:
+            pass
+    get_db_pool().putconn(conn)
+
+
+def rollback_db_connection():
+    """Limpia una transacción fallida para poder reutilizar la conexión."""
+    conn = g.get("db_conn")
+    if conn is not None and not conn.closed:
+        conn.rollback()
+
+
+@app.route("/admin/pool-stats")
+def admin_pool_stats():
+    """Exposes connection pool counters to help size DB_POOL_MIN/MAX_SIZE."""
+    if "admin_id" not in session:
+        flash("Login required.", "danger")
+        return redirect(url_for("login"))
+
+    pool = get_db_pool()
+    stats = pool.get_stats()
+    stats.update(
+        {
+            "min_size": pool.min_size,
+            "max_size": pool.max_size,
+            "max_idle": pool.max_idle,
+        }
+    )
+    return jsonify(stats)
+
+
+# --- Instrumentation ---
+# Histograms kept in memory by each process and exposed in Prometheus text
+# format at /metrics (with several worker processes, scrape each one). Every
+# request also collects a per-phase breakdown (db, translate, template) that is
+# printed when it takes longer than SLOW_REQUEST_SECONDS.
+METRICS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))  # 0 = sin log
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")  # sin token: solo localhost o admins
+
+
+def _metric_labels(names, values):
+    escaped = (
+        str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values
+    )
+    return "".join(f'{name}="{value}",' for name, value in zip(names, escaped))
+
+
+class Histogram:
+    """Cumulative histogram per label combination (Prometheus text format)."""
+
+    def __init__(self, name, help_text, labelnames, buckets=METRICS_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}  # labels -> [count por bucket..., suma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in items:
+            base = _metric_labels(self.labelnames, labels)
+            for bound, n in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{base}le="{bound:g}"}} {n}')
+            lines.append(f'{self.name}_bucket{{{base}le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{base.rstrip(',')}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{base.rstrip(',')}}} {series[-1]}")
+        return "\n".join(lines)
+
+
+class Counter:
+    """Monotonic counter per label combination (Prometheus text format)."""
+
+    def __init__(self, name, help_text, labelnames):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount, *labels):
+        if amount:
+            with self._lock:
+                self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in items:
+            lines.append(f"{self.name}{{{_metric_labels(self.labelnames, labels).rstrip(',')}}} {value}")
+        return "\n".join(lines)
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time spent serving requests.", ("method", "endpoint", "status")
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Time spent executing SQL statements.", ("operation",)
+)
+TRANSLATION_DURATION = Histogram(
+    "translation_duration_seconds",
+    "Time spent in translate_many; miss = the translator was called.",
+    ("lang", "result"),
+)
+TRANSLATION_STRINGS = Counter(
+    "translation_strings_total",
+    "Strings translated by source (memory, db, translator, fallback = left untranslated).",
+    ("lang", "source"),
+)
+TEMPLATE_RENDER_DURATION = Histogram(
+    "template_render_duration_seconds", "Time spent rendering templates.", ("template",)
+)
+METRICS = (
+    REQUEST_DURATION,
+    DB_QUERY_DURATION,
+    TRANSLATION_DURATION,
+    TRANSLATION_STRINGS,
+    TEMPLATE_RENDER_DURATION,
+)
+
+
+def _add_phase(phase, seconds):
+    phases = g.get("metrics_phases")
+    if phases is not None:
+        entry = phases.setdefault(phase, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+
+@contextlib.contextmanager
+def metrics_phase(phase):
+    """Adds the block's time to a phase of the request breakdown. Queries and
+    renders nested inside it count towards this phase, not their own."""
+    if not has_request_context() or "metrics_phases" not in g:
+        yield
+        return
+    outer = g.metrics_active_phase
+    g.metrics_active_phase = outer or phase
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        g.metrics_active_phase = outer
+        if outer is None:
+            _add_phase(phase, time.perf_counter() - started)
+
+
+def record_query(query, seconds, cursor):
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    elif not isinstance(query, str):
+        try:
+            query = query.as_string(cursor)
+        except Exception:
+            query = ""
+    words = query.split(None, 1)
+    if not words:
+        return  # health check del pool
+    operation = words[0].upper()
+    if operation not in {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "CALL", "EXPLAIN"}:
+        operation = "OTHER"
+    DB_QUERY_DURATION.observe(seconds, operation)
+    if has_request_context() and g.get("metrics_active_phase") is None:
+        _add_phase("db", seconds)
+
+
+class TimedCursor(psycopg.Cursor):
+    """Cursor that records the time of every statement in DB_QUERY_DURATION."""
+
+    def execute(self, query, params=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, params, **kwargs)
+        finally:
+            record_query(query, time.perf_counter() - started, self)
+
+    def executemany(self, query, params_seq, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, params_seq, **kwargs)
+        finally:
+            record_query(query, time.perf_counter() - started, self)
+
+
+@before_render_template.connect_via(app)
+def _template_render_started(sender, template, context, **extra):
+    if has_request_context() and "metrics_phases" in g:
+        g.setdefault("metrics_templates", []).append(
+            (time.perf_counter(), g.metrics_active_phase)
+        )
+        g.metrics_active_phase = g.metrics_active_phase or "template"
+
+
+@template_rendered.connect_via(app)
+def _template_render_finished(sender, template, context, **extra):
+    if not has_request_context() or not g.get("metrics_templates"):
+        return
+    started, outer = g.metrics_templates.pop()
+    elapsed = time.perf_counter() - started
+    g.metrics_active_phase = outer
+    TEMPLATE_RENDER_DURATION.observe(elapsed, template.name or "<string>")
+    if outer is None:
+        _add_phase("template", elapsed)
+
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_started = time.perf_counter()
+    g.metrics_phases = {}
+    g.metrics_active_phase = None
+
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop("metrics_started", None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    REQUEST_DURATION.observe(
+        elapsed, request.method, request.endpoint or "unmatched", str(response.status_code)
     )
+    if SLOW_REQUEST_SECONDS and elapsed >= SLOW_REQUEST_SECONDS:
+        phases = g.metrics_phases
+        breakdown = ", ".join(
+            f"{phase} {seconds:.3f}s/{n}" for phase, (seconds, n) in sorted(phases.items())
+        )
+        other = elapsed - sum(seconds for seconds, _ in phases.values())
+        print(
+            f"Petición lenta: {request.method} {request.full_path.rstrip('?')} -> "
+            f"{response.status_code} en {elapsed:.3f}s ({breakdown + ', ' if breakdown else ''}"
+            f"otros {other:.3f}s)"
+        )
+    return response
+
+
+def metrics_allowed():
+    if METRICS_TOKEN:
+        return request.headers.get("Authorization") == f"Bearer {METRICS_TOKEN}"
+    return request.remote_addr in ("127.0.0.1", "::1") or "admin_id" in session
+
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus scrape endpoint for this process."""
+    if not metrics_allowed():
+        abort(403)
+    lines = [metric.render() for metric in METRICS]
+    if _db_pool is not None:
+        stats = _db_pool.get_stats()
+        for key in ("pool_size", "pool_available", "requests_waiting"):
+            lines.append(f"# TYPE db_{key} gauge\ndb_{key} {stats.get(key, 0)}")
+    response = make_response("\n".join(lines) + "\n")
+    response.mimetype = "text/plain"
+    response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+# --- Rendered page cache (psql/page_cache.sql) ---
+# Public pages only depend on the language, the device mode and, for the
+# dashboards, the archive data, so the rendered HTML is reused until
+# data_version changes. Memory LRU per process, page_cache table shared.
+PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", "200"))  # páginas en memoria
+PAGE_CACHE_VERSION_TTL = 2.0  # segundos que se reutiliza data_version sin consultarla
+TEMPLATE_VERSION_TTL = 5.0  # segundos entre revisiones de las plantillas
+
+_page_cache = OrderedDict()  # cache_key -> (etag, body)
+_page_cache_lock = threading.Lock()
+_data_version = {"value": None, "checked_at": float("-inf")}
+_template_version = {"value": None, "checked_at": float("-inf")}
+
+
+def get_data_version():
+    """Current data_version, or None if it can't be read (cache disabled)."""
+    now = time.monotonic()
+    if now - _data_version["checked_at"] < PAGE_CACHE_VERSION_TTL:
+        return _data_version["value"]
+    try:
+        with get_db_pool().connection() as conn:
+            row = conn.execute("SELECT version FROM data_version").fetchone()
+        version = row[0] if row else None
+    except psycopg.Error:
+        version = None
+    _data_version.update(value=version, checked_at=now)
+    return version
+
+
+def template_version():
+    """Changes whenever a template file does (deploys without a restart).
+
+    Template mtimes are rechecked every TEMPLATE_VERSION_TTL seconds, like
+    get_data_version; Jinja has to reload templates too
+    (TEMPLATES_AUTO_RELOAD) for edits to render without a restart.
+    """
+    now = time.monotonic()
+    if now - _template_version["checked_at"] < TEMPLATE_VERSION_TTL:
+        return _template_version["value"]
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(app.root_path, "templates", "**", "*.html"), recursive=True)):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:  # removed while listing
+            continue
+        digest.update(f"{path}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+    _template_version.update(value=digest.hexdigest()[:16], checked_at=now)
+    return _template_version["value"]
+
+
+def mark_page_uncacheable():
+    """Keeps the current response out of the page cache (e.g. partial translations)."""
+    if has_request_context():
+        g.page_uncacheable = True
+
+
+def page_cache_get(key):
+    with _page_cache_lock:
+        if key in _page_cache:
+            _page_cache.move_to_end(key)
+            return _page_cache[key]
+    try:
+        with get_db_pool().connection() as conn:
+            row = conn.execute("SELECT etag, body FROM page_cache WHERE cache_key = %s", (key,)).fetchone()
+    except psycopg.Error:
+        return None
+    if row:
+        _remember_page(key, tuple(row))
+        return tuple(row)
+    return None
+
+
+def _remember_page(key, entry):
+    with _page_cache_lock:
+        _page_cache[key] = entry
+        _page_cache.move_to_end(key)
+        while len(_page_cache) > PAGE_CACHE_SIZE:
+            _page_cache.popitem(last=False)
+
+
+def page_cache_put(key, data_version, etag, body):
+    _remember_page(key, (etag, body))
+    try:
+        with get_db_pool().connection() as conn:
+            conn.execute(
+                "INSERT INTO page_cache (cache_key, data_version, etag, body) "
+                "VALUES (%s, %s, %s, %s) ON CONFLICT DO NOTHING",
+                (key, data_version, etag, body),
+            )
+    except psycopg.Error as e:
+        print(f"Error guardando página en caché: {e}")
+
+
+def cached_page(reads_data=False):
+    """Caches a public page per (route, language, device mode[, data version]).
+
+    Responses carry an ETag of the body, so browsers revalidate with a 304.
+    Logged-in admins (their navbar differs) and debug mode bypass the cache.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if "admin_id" in session or app.debug:
+                return view(*args, **kwargs)
+
+            version = None
+            if reads_data:
+                version = get_data_version()
+                if version is None:
+                    return view(*args, **kwargs)
+
+            key = hashlib.sha256(
+                f"{request.path}|{get_current_language()}|{is_touch_device()}|"
+                f"{version}|{template_version()}".encode()
+            ).hexdigest()
+            entry = page_cache_get(key)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or g.get("page_uncacheable"):
+                    return response
+                body = response.get_data(as_text=True)
+                entry = (hashlib.sha256(body.encode("utf-8")).hexdigest()[:32], body)
+                page_cache_put(key, version, *entry)
+
+            response = make_response(entry[1])
+            response.set_etag(entry[0])
+            # Depende de la sesión (idioma, modo táctil): solo caché del navegador
+            response.headers["Cache-Control"] = "private, no-cache"
+            response.vary.update(("Cookie", "User-Agent"))
+            return response.make_conditional(request)
+
+        return wrapper
+
+    return decorator
 
 
 # --- Routes ---
 @app.route("/")
+@cached_page()
 def homepage():
     # Obtener el idioma actual
     current_lang = get_current_language()
@@ -245,7 +1481,6 @@ def login():
         cur.execute(query, (email,))
         admin = cur.fetchone()
         cur.close()
-        conn.close()
 
         if admin and admin[2] == password:
             session["admin_id"] = admin[0]
@@ -273,274 +1508,342 @@ def change_password():
     )
 
 
-@app.route("/dataExploration")
-def data_exploration():
-    # Obtener el idioma actual
-    current_lang = get_current_language()
+MONTH_NAMES = {
+    "en": [
+        "January",
+        "February",
+        "March",
+        "April",
+        "May",
+        "June",
+        "July",
+        "August",
+        "September",
+        "October",
+        "November",
+        "December",
+    ],
+    "es": [
+        "Enero",
+        "Febrero",
+        "Marzo",
+        "Abril",
+        "Mayo",
+        "Junio",
+        "Julio",
+        "Agosto",
+        "Septiembre",
+        "Octubre",
+        "Noviembre",
+        "Diciembre",
+    ],
+}
+EXPLORATION_TOP_N = 10  # palabras y países mostrados en los gráficos
+KEYWORD_LANGUAGE = "en"  # idioma en que Gemini extrae las palabras clave
+FEATURED_STORIES_COUNT = 6
+# Series served by /api/exploration/<series>; True = accepts ?from=&to=&country=
+# (the demographic aggregates and the routes are not broken down by year or
+# country; keywords are counted in the decade of each interview's first
+# immigration, so years filter them by the decades they overlap)
+EXPLORATION_SERIES = {
+    "timeline": True,
+    "drilldown": True,
+    "geo": True,
+    "motive": True,
+    "transport": True,
+    "keywords": True,
+    "flows": False,
+    "sex": False,
+    "marital": False,
+    "education": False,
+}
+EXPLORATION_TRANSLATED_SERIES = {"geo", "keywords", "motive", "transport"}
+EXPLORATION_API_MAX_AGE = 60  # segundos, URLs sin ?v= de la versión actual
+EXPLORATION_API_IMMUTABLE_AGE = 31536000  # ?v=<data_version> nunca cambia de contenido
+
+
+def parse_exploration_filters(args):
+    """Reads ?from=&to= (years) and ?country= (destination id); raises ValueError."""
+    return {name: int(args[name]) for name in ("from", "to", "country") if args.get(name)}
+
+
+def immigration_filter_sql(filters):
+    """WHERE clause over the (year, id_country) columns of the immigration aggregates."""
+    conditions = [sql.SQL("TRUE")]
+    if "from" in filters:
+        conditions.append(sql.SQL("year >= {}").format(sql.Literal(filters["from"])))
+    if "to" in filters:
+        conditions.append(sql.SQL("year <= {}").format(sql.Literal(filters["to"])))
+    if "country" in filters:
+        conditions.append(sql.SQL("id_country = {}").format(sql.Literal(filters["country"])))
+    return sql.SQL(" AND ").join(conditions)
+
+
+def get_exploration_series(conn, series, lang, filters):
+    """Reads one dashboard series from the summary tables (psql/exploration_stats.sql)."""
+    where = immigration_filter_sql(filters)
+
+    with conn.cursor() as cur:
+        if series == "timeline":
+            cur.execute(
+                sql.SQL(
+                    "SELECT year, sum(n)::BIGINT FROM stats_immigration_monthly "
+                    "WHERE {} GROUP BY year ORDER BY year"
+                ).format(where)
+            )
+            rows = cur.fetchall()
+            return {"labels": [r[0] for r in rows], "values": [r[1] for r in rows]}
 
-    # Datos de ejemplo para evitar la consulta a la base de datos
-    # Esto evita el error de función PostgreSQL no existente
-
-    # Ejemplo de datos para timeline
-    timeline_years = [2010, 2011, 2012, 2013, 2014, 2015]
-    timeline_counts = [15, 22, 18, 25, 30, 28]
-
-    # Ejemplo de datos para drilldown
-    drilldown_data = {
-        2010: [
-            {"name": "Enero", "y": 2},
-            {"name": "Febrero", "y": 1},
-            {"name": "Marzo", "y": 3},
-            {"name": "Abril", "y": 1},
-            {"name": "Mayo", "y": 0},
-            {"name": "Junio", "y": 2},
-            {"name": "Julio", "y": 1},
-            {"name": "Agosto", "y": 0},
-            {"name": "Septiembre", "y": 2},
-            {"name": "Octubre", "y": 1},
-            {"name": "Noviembre", "y": 1},
-            {"name": "Diciembre", "y": 1},
-        ],
-        2011: [
-            {"name": "Enero", "y": 1},
-            {"name": "Febrero", "y": 2},
-            {"name": "Marzo", "y": 2},
-            {"name": "Abril", "y": 3},
-            {"name": "Mayo", "y": 2},
-            {"name": "Junio", "y": 1},
-            {"name": "Julio", "y": 3},
-            {"name": "Agosto", "y": 2},
-            {"name": "Septiembre", "y": 1},
-            {"name": "Octubre", "y": 2},
-            {"name": "Noviembre", "y": 2},
-            {"name": "Diciembre", "y": 1},
-        ],
+        if series == "drilldown":
+            months = MONTH_NAMES.get(lang, MONTH_NAMES[DEFAULT_LANGUAGE])
+            cur.execute(
+                sql.SQL(
+                    "SELECT year, month, sum(n)::BIGINT FROM stats_immigration_monthly "
+                    "WHERE {} GROUP BY year, month ORDER BY year, month"
+                ).format(where)
+            )
+            drilldown = {}
+            for year, month, n in cur.fetchall():
+                drilldown.setdefault(year, [{"name": m, "y": 0} for m in months])
+                drilldown[year][month - 1]["y"] = n
+            return drilldown
+
+        if series == "geo":
+            if filters:
+                query = sql.SQL(
+                    """
+                    SELECT c.id_country, c.country, s.n, gp.latitude, gp.longitude
+                    FROM (
+                        SELECT id_country, sum(n)::BIGINT AS n FROM stats_immigration_monthly
+                        WHERE {} AND id_country <> 0 GROUP BY id_country
+                    ) s
+                    JOIN countries c ON c.id_country = s.id_country
+                    LEFT JOIN gazetteer_places gp ON gp.id_place = c.id_place
+                    ORDER BY s.n DESC
+                    LIMIT {}
+                    """
+                ).format(where, sql.Literal(EXPLORATION_TOP_N))
+            else:
+                query = sql.SQL(
+                    """
+                    SELECT c.id_country, c.country, s.n, gp.latitude, gp.longitude
+                    FROM stats_destination_countries s
+                    JOIN countries c ON c.id_country = s.id_country
+                    LEFT JOIN gazetteer_places gp ON gp.id_place = c.id_place
+                    ORDER BY s.n DESC
+                    LIMIT {}
+                    """
+                ).format(sql.Literal(EXPLORATION_TOP_N))
+            cur.execute(query)
+            rows = cur.fetchall()
+            result = {
+                "ids": [r[0] for r in rows],
+                "labels": [r[1] for r in rows],
+                "values": [r[2] for r in rows],
+                # [lat, lon] from the gazetteer (psql/gazetteer.sql), null if not located
+                "coords": [[r[3], r[4]] if r[3] is not None else None for r in rows],
+            }
+
+        elif series == "flows":
+            cur.execute("SELECT * FROM top_immigration_flows(%s)", (EXPLORATION_TOP_N,))
+            rows = cur.fetchall()
+            mean_km, located_share = cur.execute("SELECT * FROM immigration_flow_distance()").fetchone()
+            names = translate_many([name for r in rows for name in (r[0], r[3])], lang)
+            result = {
+                "origins": [names.get(r[0], r[0]) for r in rows],
+                "destinations": [names.get(r[3], r[3]) for r in rows],
+                "values": [r[7] for r in rows],
+                # [origin lat, origin lon, destination lat, destination lon], null if an end is not located
+                "coords": [list(r[1:3] + r[4:6]) if r[6] is not None else None for r in rows],
+                "distances_km": [round(r[6]) if r[6] is not None else None for r in rows],
+                "mean_km": round(mean_km) if mean_km is not None else None,
+                "located_share": located_share,
+            }
+
+        elif series == "keywords":
+            # Grouped by stem in the language the keywords are written in
+            # (psql/keyword_index.sql); only the labels are translated below
+            cur.execute(
+                "SELECT initcap(label), frequency FROM top_keyword_stems(%s, %s, %s, %s, %s)",
+                (KEYWORD_LANGUAGE, EXPLORATION_TOP_N, filters.get("country"), filters.get("from"), filters.get("to")),
+            )
+            rows = cur.fetchall()
+            result = {"labels": [r[0] for r in rows], "values": [r[1] for r in rows]}
+
+        elif series in ("motive", "transport") and filters:
+            cur.execute(
+                sql.SQL(
+                    "SELECT label, sum(n)::BIGINT AS total FROM stats_immigration_dimensions "
+                    "WHERE dimension = {} AND {} GROUP BY label ORDER BY total DESC"
+                ).format(sql.Literal(series), where)
+            )
+            rows = cur.fetchall()
+            result = {"labels": [r[0] for r in rows], "values": [r[1] for r in rows]}
+
+        else:
+            cur.execute(
+                "SELECT label, n FROM stats_dimension_counts WHERE dimension = %s ORDER BY n DESC",
+                (series,),
+            )
+            rows = cur.fetchall()
+            result = {"labels": [r[0] for r in rows], "values": [r[1] for r in rows]}
+
+    if series in EXPLORATION_TRANSLATED_SERIES:
+        translations = translate_many(result["labels"], lang)
+        result["labels"] = [translations.get(label, label) for label in result["labels"]]
+    if series == "keywords":
+        # Distinct stems may translate to the same word
+        merged = {}
+        for label, value in zip(result["labels"], result["values"]):
+            merged[label] = merged.get(label, 0) + value
+        merged = sorted(merged.items(), key=lambda item: -item[1])
+        result = {"labels": [label for label, _ in merged], "values": [value for _, value in merged]}
+    return result
+
+
+def get_exploration_summary(conn):
+    """Counters of the dashboard's statistics cards."""
+    row = conn.execute(
+        """
+        SELECT (SELECT n FROM stats_dimension_counts WHERE dimension = 'archive' AND label = 'stories'),
+               (SELECT count(*) FROM stats_destination_countries),
+               (SELECT count(DISTINCT year) FROM stats_immigration_monthly),
+               (SELECT count(*) FROM stats_dimension_counts WHERE dimension = 'transport')
+        """
+    ).fetchone()
+    return {
+        "stories_count": row[0] or 0,
+        "geo_countries_count": row[1],
+        "timeline_years_count": row[2],
+        "transport_methods_count": row[3],
     }
 
-    # Ejemplo de datos para palabras frecuentes (versión en inglés)
-    wf_words_en = [
-        "Work",
-        "Family",
-        "Hope",
-        "Journey",
-        "Future",
-        "Freedom",
-        "Opportunity",
-        "America",
-        "Dream",
-        "Letters",
-    ]
-    wf_counts = [45, 38, 32, 29, 26, 22, 18, 15, 12, 10]
 
-    # Ejemplo de datos para distribución geográfica (versión en inglés)
-    geo_countries_en = ["United States", "Canada", "Australia", "Brazil", "Argentina"]
-    geo_counts = [45, 25, 15, 10, 5]
+def get_destination_countries(conn):
+    """(id, name) of every destination country, for the dashboard filter."""
+    return conn.execute(
+        """
+        SELECT c.id_country, c.country
+        FROM stats_destination_countries s
+        JOIN countries c ON c.id_country = s.id_country
+        ORDER BY c.country
+        """
+    ).fetchall()
 
-    # Ejemplo de historias (versión en inglés)
-    stories_en = [
-        {
-            "title": "Gustaf Johansson's Journey",
-            "summary": "Story of a young farmer who emigrated to Chicago in 1882.",
-            "main_first": "Gustaf",
-            "main_last": "Johansson",
-            "sex": "male",
-            "marital_status": "single",
-            "education_level": "basic",
-            "legal_status": "documented",
-            "mentions": ["Maria Johansson", "Erik Svensson"],
-            "departure_date": None,
-            "destination_city": "Chicago",
-            "destination_country": "United States",
-            "motive": "work",
-            "travel_duration": "3 months",
-            "return_plans": "No",
-            "methods": ["steamship", "train"],
-        },
-        {
-            "title": "The Lindberg Sisters",
-            "summary": "Three sisters who emigrated together to Minnesota to reunite with their uncle in 1895.",
-            "main_first": "Astrid",
-            "main_last": "Lindberg",
-            "sex": "female",
-            "marital_status": "single",
-            "education_level": "medium",
-            "legal_status": "documented",
-            "mentions": ["Ingrid Lindberg", "Helga Lindberg", "Karl Lindberg"],
-            "departure_date": None,
-            "destination_city": "Saint Paul",
-            "destination_country": "United States",
-            "motive": "family reunion",
-            "travel_duration": "2 months",
-            "return_plans": "No",
-            "methods": ["steamship", "train"],
-        },
-        {
-            "title": "Olof Larsson's American Dream",
-            "summary": "A carpenter who emigrated to Boston looking for better work and fortune in 1878.",
-            "main_first": "Olof",
-            "main_last": "Larsson",
-            "sex": "male",
-            "marital_status": "married",
-            "education_level": "medium",
-            "legal_status": "documented",
-            "mentions": ["Elsa Larsson", "Karl Nilsson"],
-            "departure_date": None,
-            "destination_city": "Boston",
-            "destination_country": "United States",
-            "motive": "economic",
-            "travel_duration": "45 days",
-            "return_plans": "After 5 years",
-            "methods": ["steamship", "wagon or cart"],
-        },
-    ]
 
-    # Preparar los datos según el idioma seleccionado
-    if current_lang == "es":
-        # Versión en español (ya traducida estáticamente para estos ejemplos)
-        wf_words = [
-            "Trabajo",
-            "Familia",
-            "Esperanza",
-            "Viaje",
-            "Futuro",
-            "Libertad",
-            "Oportunidad",
-            "América",
-            "Sueño",
-            "Cartas",
-        ]
-        geo_countries = ["Estados Unidos", "Canadá", "Australia", "Brasil", "Argentina"]
-        stories = [
-            {
-                "title": "El viaje de Gustaf Johansson",
-                "summary": "Historia de un joven granjero que emigró a Chicago en 1882.",
-                "main_first": "Gustaf",
-                "main_last": "Johansson",
-                "sex": "male",
-                "marital_status": "single",
-                "education_level": "basic",
-                "legal_status": "documented",
-                "mentions": ["Maria Johansson", "Erik Svensson"],
-                "departure_date": None,
-                "destination_city": "Chicago",
-                "destination_country": "Estados Unidos",
-                "motive": "trabajo",
-                "travel_duration": "3 meses",
-                "return_plans": "No",
-                "methods": ["barco de vapor", "tren"],
-            },
-            {
-                "title": "Las hermanas Lindberg",
-                "summary": "Tres hermanas que emigraron juntas a Minnesota para reunirse con su tío en 1895.",
-                "main_first": "Astrid",
-                "main_last": "Lindberg",
-                "sex": "female",
-                "marital_status": "single",
-                "education_level": "medium",
-                "legal_status": "documented",
-                "mentions": ["Ingrid Lindberg", "Helga Lindberg", "Karl Lindberg"],
-                "departure_date": None,
-                "destination_city": "Saint Paul",
-                "destination_country": "Estados Unidos",
-                "motive": "reunión familiar",
-                "travel_duration": "2 meses",
-                "return_plans": "No",
-                "methods": ["barco de vapor", "tren"],
-            },
+def get_featured_stories(conn):
+    """Historias destacadas: las últimas entrevistas ingresadas."""
+    rows = conn.execute(
+        """
+        SELECT t.story_title, t.story_summary, p.name, i.reason_immigration,
+               dci.city, dco.country, tt.type
+        FROM text_files t
+        JOIN people p ON p.id_people = t.id_people
+        LEFT JOIN LATERAL (
+            SELECT reason_immigration, destination_city_id,
+                   destination_country_id, travel_type_id
+            FROM immigrations
+            WHERE id_people = t.id_people
+            ORDER BY immigration_date NULLS LAST, id_immigration
+            LIMIT 1
+        ) i ON TRUE
+        LEFT JOIN cities dci ON dci.id_city = i.destination_city_id
+        LEFT JOIN countries dco ON dco.id_country = i.destination_country_id
+        LEFT JOIN travel_types tt ON tt.id_type = i.travel_type_id
+        ORDER BY t.id_text DESC
+        LIMIT %s
+        """,
+        (FEATURED_STORIES_COUNT,),
+    ).fetchall()
+
+    stories = []
+    for title, summary, name, motive, city, country, method in rows:
+        first, _, last = (name or "").partition(" ")
+        stories.append(
             {
-                "title": "El sueño americano de Olof Larsson",
-                "summary": "Un carpintero que emigró a Boston en busca de mejor trabajo y fortuna en 1878.",
-                "main_first": "Olof",
-                "main_last": "Larsson",
-                "sex": "male",
-                "marital_status": "married",
-                "education_level": "medium",
-                "legal_status": "documented",
-                "mentions": ["Elsa Larsson", "Karl Nilsson"],
-                "departure_date": None,
-                "destination_city": "Boston",
-                "destination_country": "Estados Unidos",
-                "motive": "económico",
-                "travel_duration": "45 días",
-                "return_plans": "Después de 5 años",
-                "methods": ["barco de vapor", "carreta"],
-            },
-        ]
-    else:
-        # Versión en inglés (idioma predeterminado)
-        wf_words = wf_words_en
-        geo_countries = geo_countries_en
-        stories = stories_en
-
-    # Procesamiento de datos adicionales para nuevos gráficos
-    def process_demographics_and_travel_data(stories_data):
-        # Análisis demográfico
-        sex_data = {}
-        marital_data = {}
-        education_data = {}
-
-        # Motivos de emigración
-        motive_data = {}
-
-        # Métodos de transporte
-        transport_data = {}
-
-        for story in stories_data:
-            # Procesar sexo
-            if story.get("sex"):
-                sex = story["sex"]
-                sex_data[sex] = sex_data.get(sex, 0) + 1
-
-            # Procesar estado civil
-            if story.get("marital_status"):
-                marital = story["marital_status"]
-                marital_data[marital] = marital_data.get(marital, 0) + 1
-
-            # Procesar nivel educativo
-            if story.get("education_level"):
-                education = story["education_level"]
-                education_data[education] = education_data.get(education, 0) + 1
-
-            # Procesar motivos
-            if story.get("motive"):
-                motive = story["motive"]
-                motive_data[motive] = motive_data.get(motive, 0) + 1
-
-            # Procesar métodos de transporte
-            if story.get("methods"):
-                for method in story["methods"]:
-                    if method:
-                        transport_data[method] = transport_data.get(method, 0) + 1
-
-        return {
-            "sex": sex_data,
-            "marital": marital_data,
-            "education": education_data,
-            "motives": motive_data,
-            "transport": transport_data,
-        }
+                "title": title,
+                "summary": summary,
+                "main_first": first,
+                "main_last": last,
+                "destination_city": city,
+                "destination_country": country,
+                "motive": motive,
+                "methods": [method] if method else [],
+            }
+        )
+    return stories
 
-    # Procesar los datos
-    processed_data = process_demographics_and_travel_data(stories)
 
-    # Preparar datos para los gráficos
-    # Datos demográficos
-    sex_labels = list(processed_data["sex"].keys())
-    sex_values = list(processed_data["sex"].values())
+@app.route("/api/exploration/<series>")
+def exploration_api(series):
+    """One dashboard series as JSON, fetched by the charts when they are shown.
 
-    marital_labels = list(processed_data["marital"].keys())
-    marital_values = list(processed_data["marital"].values())
+    Responses carry an ETag; URLs with ``?lang=`` and ``?v=`` set to the
+    current data_version (as built by the dashboard) are cached for good,
+    since any change to the data bumps the version and thus the URL.
+    """
+    if series not in EXPLORATION_SERIES:
+        abort(404)
+    try:
+        filters = parse_exploration_filters(request.args)
+    except ValueError:
+        return jsonify({"error": "from, to and country must be integers."}), 400
+    if filters and not EXPLORATION_SERIES[series]:
+        return jsonify({"error": f"The {series} series cannot be filtered by year or country."}), 400
+
+    lang = request.args.get("lang") or get_current_language()
+    if lang not in LANGUAGES:
+        lang = DEFAULT_LANGUAGE
+
+    version = get_data_version()
+    key = hashlib.sha256(f"api|{series}|{lang}|{sorted(filters.items())}|{version}".encode()).hexdigest()
+    entry = page_cache_get(key) if version is not None else None
+    if entry is None:
+        try:
+            payload = get_exploration_series(get_db_connection(), series, lang, filters)
+        except psycopg.Error as e:
+            rollback_db_connection()
+            return jsonify({"error": str(e)}), 503
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        entry = (hashlib.sha256(body.encode("utf-8")).hexdigest()[:32], body)
+        if version is not None and not g.get("page_uncacheable"):
+            page_cache_put(key, version, *entry)
+
+    response = make_response(entry[1])
+    response.mimetype = "application/json"
+    response.set_etag(entry[0])
+    if "lang" not in request.args:
+        response.headers["Cache-Control"] = "private, no-cache"
+        response.vary.add("Cookie")
+    elif version is not None and request.args.get("v") == str(version) and not g.get("page_uncacheable"):
+        response.headers["Cache-Control"] = f"public, max-age={EXPLORATION_API_IMMUTABLE_AGE}, immutable"
+    else:
+        response.headers["Cache-Control"] = f"public, max-age={EXPLORATION_API_MAX_AGE}"
+    return response.make_conditional(request)
 
-    education_labels = list(processed_data["education"].keys())
-    education_values = list(processed_data["education"].values())
 
-    # Datos de motivos
-    motive_labels = list(processed_data["motives"].keys())
-    motive_values = list(processed_data["motives"].values())
+@app.route("/dataExploration")
+@cached_page(reads_data=True)
+def data_exploration():
+    # Obtener el idioma actual
+    current_lang = get_current_language()
+
+    # Los gráficos piden sus series a /api/exploration al mostrarse
+    summary = {}
+    stories = []
+    countries = []
+    try:
+        conn = get_db_connection()
+        summary = get_exploration_summary(conn)
+        stories = get_featured_stories(conn)
+        countries = get_destination_countries(conn)
+    except Exception as e:
+        rollback_db_connection()
+        flash(f"Error loading exploration data: {e}", "danger")
+        mark_page_uncacheable()
 
-    # Datos de transporte
-    transport_labels = list(processed_data["transport"].keys())
-    transport_values = list(processed_data["transport"].values())
+    stories = process_dashboard_data({"stories": stories}, current_lang)["stories"]
+    country_names = translate_many([name for _, name in countries], current_lang)
 
     # Usar la interfaz correcta basada en el dispositivo
     if is_touch_device():
@@ -548,42 +1851,459 @@ def data_exploration():
     else:
         template = "dataExploration.html"  # Versión desktop
 
+    api_params = {"lang": current_lang}
+    version = get_data_version()
+    if version is not None:
+        api_params["v"] = version
+
     return render_template(
         template,
-        timeline_years=json.dumps(timeline_years),
-        timeline_counts=json.dumps(timeline_counts),
-        drilldown_data=json.dumps(drilldown_data),
-        wf_words=json.dumps(wf_words),
-        wf_counts=json.dumps(wf_counts),
-        geo_countries=json.dumps(geo_countries),
-        geo_counts=json.dumps(geo_counts),
+        api_params=api_params,
+        filterable_series=[name for name, filterable in EXPLORATION_SERIES.items() if filterable],
+        filter_countries=[(id_country, country_names.get(name, name)) for id_country, name in countries],
         stories=stories,
-        # Nuevos datos para gráficos adicionales
-        sex_labels=json.dumps(sex_labels),
-        sex_values=json.dumps(sex_values),
-        marital_labels=json.dumps(marital_labels),
-        marital_values=json.dumps(marital_values),
-        education_labels=json.dumps(education_labels),
-        education_values=json.dumps(education_values),
-        motive_labels=json.dumps(motive_labels),
-        motive_values=json.dumps(motive_values),
-        transport_labels=json.dumps(transport_labels),
-        transport_values=json.dumps(transport_values),
-        # Longitudes para las estadísticas
-        geo_countries_count=len(geo_countries),
-        timeline_years_count=len(timeline_years),
-        transport_methods_count=len(transport_labels),
+        stories_count=summary.get("stories_count", 0),
+        geo_countries_count=summary.get("geo_countries_count", 0),
+        timeline_years_count=summary.get("timeline_years_count", 0),
+        transport_methods_count=summary.get("transport_methods_count", 0),
+        languages=LANGUAGES,
+        current_lang=current_lang,
+    )
+
+
+# --- Full-text search (psql/search_index.sql) ---
+SEARCH_PAGE_SIZE = 20
+# Coincidencias ordenadas por relevancia: el costo de una búsqueda no crece con el archivo
+SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", "500"))
+SEARCH_MAX_QUERY_LENGTH = 200
+SEARCH_SNIPPET_BODY_CHARS = 20000  # texto de la entrevista usado para el fragmento
+SEARCH_CONFIGS = {"en": "english", "es": "spanish"}
+# Marcadores de control: el fragmento se escapa antes de convertirlos en <mark>
+SEARCH_MARK_START, SEARCH_MARK_STOP = "\x02", "\x03"
+INTERVIEW_TEXT_FOLDERS = ["./multimedia/text", "./multimedia/texts"]
+
+
+def highlight_snippet(snippet):
+    """Escapes a ts_headline fragment and turns the match markers into <mark> tags."""
+    escaped = str(escape(snippet or ""))
+    return Markup(
+        escaped.replace(SEARCH_MARK_START, "<mark>").replace(SEARCH_MARK_STOP, "</mark>")
+    )
+
+
+def search_documents(conn, query, lang, page):
+    """Returns (results, total, more) for one page of ranked matches.
+
+    Only the first SEARCH_MAX_CANDIDATES matches the GIN index finds are
+    ranked, so common terms don't rank the whole archive; ``more`` tells
+    whether there were further matches, and ``total`` is capped at the
+    candidates. Snippets are built afterwards for the rows of the page alone.
+    """
+    cur = conn.cursor()
+    cur.execute(
+        """
+        WITH q AS (SELECT search_query(%(query)s) AS query),
+        candidates AS MATERIALIZED (
+            SELECT d.id_document, d.document
+            FROM search_documents d, q
+            WHERE d.document @@ q.query
+            LIMIT %(candidates)s + 1
+        ),
+        page AS (
+            SELECT c.id_document, ts_rank_cd(c.document, q.query) AS rank,
+                   (SELECT count(*) FROM candidates) AS total
+            FROM (SELECT * FROM candidates LIMIT %(candidates)s) c, q
+            ORDER BY rank DESC, c.id_document
+            LIMIT %(limit)s OFFSET %(offset)s
+        )
+        SELECT d.source, d.source_id, d.title, t.filename,
+               ts_headline(%(config)s::regconfig,
+                           concat_ws(' … ', d.summary, left(d.body, %(body_chars)s)),
+                           q.query,
+                           %(options)s),
+               page.total
+        FROM page
+        JOIN search_documents d USING (id_document)
+        LEFT JOIN text_files t ON d.source = 'interview' AND t.id_text = d.source_id
+        CROSS JOIN q
+        ORDER BY page.rank DESC, d.id_document
+        """,
+        {
+            "query": query,
+            "candidates": SEARCH_MAX_CANDIDATES,
+            "limit": SEARCH_PAGE_SIZE,
+            "offset": (page - 1) * SEARCH_PAGE_SIZE,
+            "config": SEARCH_CONFIGS.get(lang, "english"),
+            "body_chars": SEARCH_SNIPPET_BODY_CHARS,
+            "options": f"StartSel={SEARCH_MARK_START}, StopSel={SEARCH_MARK_STOP}, "
+            "MaxFragments=2, MaxWords=30, MinWords=12, FragmentDelimiter=\" … \"",
+        },
+    )
+    rows = cur.fetchall()
+    cur.close()
+
+    results = [
+        {
+            "source": source,
+            "id": source_id,
+            "title": title,
+            "filename": filename,
+            "snippet": highlight_snippet(snippet),
+        }
+        for source, source_id, title, filename, snippet, _ in rows
+    ]
+    total = rows[0][5] if rows else 0
+    return results, min(total, SEARCH_MAX_CANDIDATES), total > SEARCH_MAX_CANDIDATES
+
+
+@app.route("/search")
+def search():
+    current_lang = get_current_language()
+    query = request.args.get("q", "").strip()[:SEARCH_MAX_QUERY_LENGTH]
+    page = max(request.args.get("page", 1, type=int), 1)
+
+    results, total, more = [], 0, False
+    if query:
+        try:
+            results, total, more = search_documents(get_db_connection(), query, current_lang, page)
+        except Exception as e:
+            flash(f"Error searching the archive: {e}", "danger")
+
+    return render_template(
+        "search.html",
+        query=query,
+        results=results,
+        total=total,
+        more=more,
+        page=page,
+        pages=(total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE,
         languages=LANGUAGES,
         current_lang=current_lang,
     )
 
 
+@app.cli.command("index-interview-texts")
+def index_interview_texts():
+    """Loads the raw interview texts into the search index."""
+    updated = 0
+    with get_db_pool().connection() as conn:
+        for folder in INTERVIEW_TEXT_FOLDERS:
+            if not os.path.isdir(folder):
+                continue
+            for fname in sorted(os.listdir(folder)):
+                if not fname.endswith(".txt"):
+                    continue
+                with open(os.path.join(folder, fname), encoding="utf-8", errors="replace") as f:
+                    updated += conn.execute(
+                        "SELECT set_interview_search_text(%s, %s)", (fname, f.read())
+                    ).fetchone()[0]
+    print(f"Updated the text of {updated} indexed interviews.")
+
+
 @app.route("/about")
+@cached_page()
 def about():
     current_lang = get_current_language()
     return render_template("about.html", languages=LANGUAGES, current_lang=current_lang)
 
 
+# --- Background jobs (psql/background_jobs.sql) ---
+# Upload processing (interview extraction, image thumbnails) runs off the
+# request: the upload routes enqueue a job and worker threads claim it.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # hilos por proceso; 0 = solo `flask run-job-worker`
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))  # segundos entre consultas de la cola
+JOB_RETRY_DELAY = 30  # segundos antes del primer reintento, se duplica en cada uno
+JOB_STALE_AFTER = 1800  # segundos en 'running' antes de considerar muerto al worker
+UPLOAD_JOBS_TRACKED = 20  # jobs recientes mostrados en la herramienta de carga
+EXTRACTION_MODULE_DIR = os.path.join(app.root_path, "multimedia")
+
+_job_wakeup = threading.Event()
+_job_workers = []
+_job_workers_lock = threading.Lock()
+_csv_output_lock = threading.Lock()  # los CSV de extracción se escriben en modo append
+_extractor = None
+_ingest_manifest = None
+_ingest_manifest_lock = threading.Lock()
+
+
+def enqueue_job(kind, file_path, max_attempts=3):
+    """Queues ``kind`` for a file and returns the job id.
+
+    The same file content is only processed once: enqueueing it again returns
+    the queued, running or finished job instead of adding a new one.
+    """
+    file_path = os.path.abspath(file_path)
+    dedupe_key = f"{kind}:{file_path}:{media_content_hash(file_path, os.stat(file_path))}"
+    payload = json.dumps({"path": file_path})
+
+    with get_db_pool().connection() as conn:
+        row = None
+        for _ in range(3):  # the existing job may fail between both statements
+            row = conn.execute(
+                """
+                INSERT INTO background_jobs (kind, dedupe_key, payload, max_attempts)
+                VALUES (%s, %s, %s::jsonb, %s)
+                ON CONFLICT (dedupe_key) WHERE status <> 'failed' DO NOTHING
+                RETURNING id_job
+                """,
+                (kind, dedupe_key, payload, max_attempts),
+            ).fetchone() or conn.execute(
+                "SELECT id_job FROM background_jobs WHERE dedupe_key = %s AND status <> 'failed'",
+                (dedupe_key,),
+            ).fetchone()
+            if row:
+                break
+
+    start_job_workers()
+    _job_wakeup.set()
+    return row[0] if row else None
+
+
+def claim_job(worker_name):
+    """Takes the oldest ready job, or returns None when the queue is empty."""
+    with get_db_pool().connection() as conn:
+        # Jobs left 'running' by a worker that died go back to the queue
+        conn.execute(
+            """
+            UPDATE background_jobs
+            SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+                last_error = 'Worker stopped responding', locked_by = NULL
+            WHERE status = 'running' AND started_at < now() - make_interval(secs => %s)
+            """,
+            (JOB_STALE_AFTER,),
+        )
+        return conn.execute(
+            """
+            UPDATE background_jobs
+            SET status = 'running', attempts = attempts + 1, started_at = now(),
+                finished_at = NULL, locked_by = %s
+            WHERE id_job = (
+                SELECT id_job FROM background_jobs
+                WHERE status = 'queued' AND run_after <= now()
+                ORDER BY run_after, id_job
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id_job, kind, payload
+            """,
+            (worker_name,),
+        ).fetchone()
+
+
+def finish_job(job_id, error=None):
+    """Marks a job done, or schedules its retry with exponential backoff."""
+    with get_db_pool().connection() as conn:
+        if error is None:
+            conn.execute(
+                """
+                UPDATE background_jobs
+                SET status = 'done', finished_at = now(), last_error = NULL, locked_by = NULL
+                WHERE id_job = %s
+                """,
+                (job_id,),
+            )
+            return
+        conn.execute(
+            """
+            UPDATE background_jobs
+            SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+                run_after = now() + make_interval(secs => %s * power(2, attempts - 1)),
+                finished_at = CASE WHEN attempts >= max_attempts THEN now() END,
+                last_error = %s, locked_by = NULL
+            WHERE id_job = %s
+            """,
+            (JOB_RETRY_DELAY, error, job_id),
+        )
+
+
+def get_extractor():
+    """Imports multimedia/genai_data_extraction.py on first use."""
+    global _extractor
+    if _extractor is None:
+        if EXTRACTION_MODULE_DIR not in sys.path:
+            sys.path.insert(0, EXTRACTION_MODULE_DIR)
+        import genai_data_extraction
+
+        _extractor = genai_data_extraction
+    return _extractor
+
+
+def get_ingest_manifest():
+    """The extraction script's IngestManifest, shared by this process' workers."""
+    global _ingest_manifest
+    with _ingest_manifest_lock:
+        if _ingest_manifest is None:
+            extractor = get_extractor()
+            _ingest_manifest = extractor.IngestManifest(extractor.INGEST_MANIFEST_PATH)
+    return _ingest_manifest
+
+
+def run_extraction_job(payload):
+    """Extracts an uploaded interview with Gemini and ingests it.
+
+    Each step is checkpointed in the ingest manifest (the same one the
+    extraction script uses), so a retry or a requeued stale job only repeats
+    the steps that didn't finish for this file content. The CSV rows are
+    written once, after the database store succeeded.
+    """
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise RuntimeError("GOOGLE_API_KEY environment variable not found")
+
+    extractor = get_extractor()
+    manifest = get_ingest_manifest()
+    path = payload["path"]
+    stage = manifest.status(path)
+    if stage == "committed":
+        return
+
+    # Retries reuse the extraction cache, so Gemini isn't called again
+    data = extractor.analyze_interview_with_gemini(path, api_key)
+    if data is None:
+        raise RuntimeError("Gemini returned no usable data")
+    manifest.mark(path, "extracted")
+    if stage != "db_committed":
+        if not extractor.store_extracted_data_v2(path, data):
+            raise RuntimeError("The interview could not be stored in the database")
+        manifest.mark(path, "db_committed")
+    if stage != "csv_written":
+        with _csv_output_lock:
+            extractor.save_data_to_csvs(os.path.basename(path), data)
+        manifest.mark(path, "csv_written")
+
+
+def run_image_derivatives_job(payload):
+    path = payload["path"]
+    if mimetypes.guess_type(path)[0] in IMAGE_DERIVATIVE_TYPES:
+        build_image_derivatives(path, media_content_hash(path, os.stat(path)))
+
+
+JOB_HANDLERS = {
+    "extract_interview": run_extraction_job,
+    "image_derivatives": run_image_derivatives_job,
+}
+
+
+def job_worker_loop(worker_name):
+    while True:
+        try:
+            job = claim_job(worker_name)
+        except Exception as e:
+            app.logger.warning("Job queue unavailable: %s", e)
+            job = None
+
+        if job is None:
+            _job_wakeup.wait(JOB_POLL_INTERVAL)
+            _job_wakeup.clear()
+            continue
+
+        job_id, kind, payload = job
+        try:
+            JOB_HANDLERS[kind](payload)
+        except Exception as e:
+            app.logger.exception("Job %s (%s) failed", job_id, kind)
+            error = f"{type(e).__name__}: {e}"
+        else:
+            error = None
+
+        try:
+            finish_job(job_id, error)
+        except Exception as e:
+            # Left 'running'; requeued once JOB_STALE_AFTER passes
+            app.logger.warning("Could not record the result of job %s: %s", job_id, e)
+
+
+def start_job_workers(count=None):
+    """Starts this process' worker threads once."""
+    count = JOB_WORKERS if count is None else count
+    if _job_workers or count <= 0:
+        return
+    with _job_workers_lock:
+        if _job_workers:
+            return
+        for i in range(count):
+            worker = threading.Thread(
+                target=job_worker_loop,
+                args=(f"{socket.gethostname()}:{os.getpid()}:{i}",),
+                name=f"job-worker-{i}",
+                daemon=True,
+            )
+            worker.start()
+            _job_workers.append(worker)
+
+
+@app.before_request
+def ensure_job_workers():
+    # Picks up jobs queued before a restart without waiting for a new upload
+    start_job_workers()
+
+
+@app.cli.command("run-job-worker")
+@click.option("--workers", default=JOB_WORKERS or 1, show_default=True, help="Worker threads.")
+def run_job_worker(workers):
+    """Processes queued upload jobs (for deployments with JOB_WORKERS=0)."""
+    start_job_workers(workers)
+    print(f"Processing background jobs with {workers} worker(s), Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+def track_upload_job(job_id, rel_path):
+    """Remembers a job in the admin's session for the upload tool panel."""
+    if job_id is None:
+        return
+    jobs = [j for j in session.get("upload_jobs", []) if j["id"] != job_id]
+    jobs.append({"id": job_id, "file": rel_path})
+    session["upload_jobs"] = jobs[-UPLOAD_JOBS_TRACKED:]
+
+
+def get_job_statuses(job_ids):
+    if not job_ids:
+        return []
+    with get_db_pool().connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT id_job, kind, payload->>'path', status, attempts, max_attempts, last_error
+            FROM background_jobs
+            WHERE id_job = ANY(%s)
+            ORDER BY id_job
+            """,
+            (list(job_ids),),
+        ).fetchall()
+    return [
+        {
+            "id": row[0],
+            "kind": row[1],
+            "file": os.path.basename(row[2] or ""),
+            "status": row[3],
+            "attempts": row[4],
+            "max_attempts": row[5],
+            "last_error": row[6],
+        }
+        for row in rows
+    ]
+
+
+@app.route("/jobs/status")
+def jobs_status():
+    """Polled by the upload tool until every tracked job is done or failed."""
+    if "admin_id" not in session:
+        return jsonify({"error": "Login required."}), 401
+
+    ids = request.args.get("ids")
+    if ids:
+        job_ids = [int(i) for i in ids.split(",") if i.strip().isdigit()]
+    else:
+        job_ids = [j["id"] for j in session.get("upload_jobs", [])]
+    try:
+        return jsonify(get_job_statuses(job_ids))
+    except psycopg.Error as e:
+        return jsonify({"error": str(e)}), 503
+
+
 @app.route("/uploadTool")
 def upload_tool():
     if "admin_id" not in session:
@@ -592,10 +2312,12 @@ def upload_tool():
 
     current_lang = get_current_language()
 
-    # Get list of existing files
-    image_files = []
-    text_files = []
+    query = request.args.get("q", "").strip()
+    kind = request.args.get("kind")
+    if kind not in MEDIA_CATALOG_FOLDERS:
+        kind = None
 
+    files, total, exact_total, next_cursor, prev_cursor = [], 0, True, None, None
     try:
         if not os.path.exists(app.config["UPLOAD_IMAGE_FOLDER"]):
             os.makedirs(app.config["UPLOAD_IMAGE_FOLDER"])
@@ -603,24 +2325,30 @@ def upload_tool():
         if not os.path.exists(app.config["UPLOAD_TEXT_FOLDER"]):
             os.makedirs(app.config["UPLOAD_TEXT_FOLDER"])
 
-        for fname in os.listdir(app.config["UPLOAD_IMAGE_FOLDER"]):
-            if os.path.isfile(
-                os.path.join(app.config["UPLOAD_IMAGE_FOLDER"], fname)
-            ) and allowed_file(fname, ALLOWED_IMAGE_EXTENSIONS):
-                image_files.append(os.path.join("images", fname))
-
-        for fname in os.listdir(app.config["UPLOAD_TEXT_FOLDER"]):
-            if os.path.isfile(
-                os.path.join(app.config["UPLOAD_TEXT_FOLDER"], fname)
-            ) and allowed_file(fname, ALLOWED_TEXT_EXTENSIONS):
-                text_files.append(os.path.join("text", fname))
+        # Listado desde media_catalog (ver `flask reconcile-media-catalog`)
+        files, total, exact_total, next_cursor, prev_cursor = get_media_catalog_page(
+            get_db_connection(),
+            kind,
+            query,
+            after=request.args.get("after"),
+            before=request.args.get("before"),
+        )
     except Exception as e:
+        rollback_db_connection()
         flash(f"Error accessing files: {e}", "danger")
 
     return render_template(
         "uploadTool.html",
-        image_files=sorted(image_files),
-        text_files=sorted(text_files),
+        files=files,
+        total=total,
+        exact_total=exact_total,
+        query=query,
+        kind=kind,
+        # Parámetros que se conservan al cambiar de página
+        list_args={name: value for name, value in (("q", query), ("kind", kind)) if value},
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
+        upload_jobs=session.get("upload_jobs", []),
         languages=LANGUAGES,
         current_lang=current_lang,
     )
@@ -649,11 +2377,13 @@ def upload_file():
         ):
             save_path = os.path.join(app.config["UPLOAD_TEXT_FOLDER"], filename)
             file.save(save_path)
+            update_media_catalog(os.path.join("text", filename))
             try:
-                subprocess.run(["python", "dataExtraction.py", save_path], check=True)
-                flash(f"Uploaded and processed text file: {filename}", "success")
-            except subprocess.CalledProcessError as e:
-                flash(f"Uploaded {filename}, but processing failed: {e}", "warning")
+                job_id = enqueue_job("extract_interview", save_path)
+                track_upload_job(job_id, os.path.join("text", filename))
+                flash(f"Uploaded text file: {filename}, queued for processing", "success")
+            except Exception as e:
+                flash(f"Uploaded {filename}, but it could not be queued for processing: {e}", "warning")
 
         elif (
             file
@@ -662,6 +2392,8 @@ def upload_file():
         ):
             save_path = os.path.join(app.config["UPLOAD_IMAGE_FOLDER"], filename)
             file.save(save_path)
+            update_media_catalog(os.path.join("images", filename))
+            process_uploaded_image(save_path, os.path.join("images", filename))
             flash(f"Uploaded image file: {filename}", "success")
 
         else:
@@ -675,6 +2407,116 @@ def upload_file():
 # ===============================
 
 
+# --- Admin listings (psql/admin_listings.sql) ---
+ADMIN_PAGE_SIZE = 50
+EXACT_COUNT_THRESHOLD = 10000  # por debajo del estimado se cuenta exacto
+# ?sort= value -> sort key column of emigrant_stories (None = created_at only)
+STORY_SORT_COLUMNS = {
+    "created": None,
+    "country": "destination_country",
+    "motive": "motive",
+    "sex": "sex",
+}
+# ?<filter>= value -> filtered column
+STORY_FILTER_COLUMNS = {
+    "country": "destination_country",
+    "motive": "motive",
+    "sex": "sex",
+}
+
+
+def encode_page_cursor(values):
+    """Opaque ?after=/?before= token holding the sort key of a row."""
+    values = [{"ts": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def decode_page_cursor(token):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return [datetime.fromisoformat(v["ts"]) if isinstance(v, dict) else v for v in values]
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+def keyset_page(
+    conn, table, columns, keys, conditions, descending, after=None, before=None, page_size=ADMIN_PAGE_SIZE
+):
+    """Fetches one page of ``table`` (``page_size`` rows) by seeking on the ``keys`` tuple.
+
+    ``keys`` are SQL expressions whose last one is unique; ``after`` and
+    ``before`` are cursors of the last/first row of the page the user comes
+    from. Returns (rows, next_cursor, prev_cursor), cursors being None when
+    there is nothing further in that direction.
+    """
+    backwards = bool(before)
+    key_list = sql.SQL(", ").join(keys)
+    conditions = list(conditions)
+
+    cursor_values = decode_page_cursor(before or after) if (before or after) else None
+    if cursor_values is not None and len(cursor_values) == len(keys):
+        conditions.append(
+            sql.SQL("({}) {} ({})").format(
+                key_list,
+                sql.SQL("<" if descending != backwards else ">"),
+                sql.SQL(", ").join(map(sql.Literal, cursor_values)),
+            )
+        )
+    else:
+        cursor_values = None
+
+    direction = sql.SQL(" DESC" if descending != backwards else " ASC")
+    rows = conn.execute(
+        sql.SQL("SELECT {columns}, {keys} FROM {table} {where} ORDER BY {order} LIMIT {limit}").format(
+            columns=columns,
+            keys=key_list,
+            table=sql.Identifier(table),
+            where=sql.SQL("WHERE ") + sql.SQL(" AND ").join(conditions) if conditions else sql.SQL(""),
+            order=sql.SQL(", ").join(key + direction for key in keys),
+            limit=sql.Literal(page_size + 1),
+        )
+    ).fetchall()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+    has_next = has_more if not backwards else cursor_values is not None
+    has_prev = has_more if backwards else cursor_values is not None
+
+    n = len(keys)
+    return (
+        [row[:-n] for row in rows],
+        encode_page_cursor(rows[-1][-n:]) if rows and has_next else None,
+        encode_page_cursor(rows[0][-n:]) if rows and has_prev else None,
+    )
+
+
+def estimate_row_count(conn, table, conditions):
+    """Row count from the planner's estimate; exact only for small results."""
+    if conditions:
+        plan = conn.execute(
+            sql.SQL("EXPLAIN (FORMAT JSON) SELECT 1 FROM {} WHERE {}").format(
+                sql.Identifier(table), sql.SQL(" AND ").join(conditions)
+            )
+        ).fetchone()[0]
+        estimate = plan[0]["Plan"]["Plan Rows"]
+    else:
+        estimate = conn.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", (table,)
+        ).fetchone()[0]
+
+    # Also covers reltuples = -1 (table never analyzed)
+    if estimate < EXACT_COUNT_THRESHOLD:
+        return conn.execute(
+            sql.SQL("SELECT count(*) FROM {} {}").format(
+                sql.Identifier(table),
+                sql.SQL("WHERE ") + sql.SQL(" AND ").join(conditions) if conditions else sql.SQL(""),
+            )
+        ).fetchone()[0], True
+    return int(estimate), False
+
+
 # --- STORIES MANAGEMENT CRUD ---
 @app.route("/admin/stories")
 def admin_stories():
@@ -684,32 +2526,69 @@ def admin_stories():
 
     current_lang = get_current_language()
 
+    sort = request.args.get("sort", "created")
+    if sort not in STORY_SORT_COLUMNS:
+        sort = "created"
+    descending = request.args.get("dir", "desc") != "asc"
+    filters = {name: request.args[name] for name in STORY_FILTER_COLUMNS if request.args.get(name)}
+
     try:
         conn = get_db_connection()
-        cur = conn.cursor()
 
-        # Obtener todas las historias
-        cur.execute(
-            """
-            SELECT id, title, summary, main_first, main_last, sex, marital_status, 
-                   education_level, destination_city, destination_country, motive, 
-                   travel_duration, return_plans, created_at
-            FROM emigrant_stories 
-            ORDER BY created_at DESC
-        """
+        conditions = [
+            sql.SQL("COALESCE({}, '') = {}").format(
+                sql.Identifier(STORY_FILTER_COLUMNS[name]), sql.Literal(value)
+            )
+            for name, value in filters.items()
+        ]
+        keys = [sql.Identifier("created_at"), sql.Identifier("id")]
+        if STORY_SORT_COLUMNS[sort]:
+            keys.insert(0, sql.SQL("COALESCE({}, '')").format(sql.Identifier(STORY_SORT_COLUMNS[sort])))
+
+        stories, next_cursor, prev_cursor = keyset_page(
+            conn,
+            "emigrant_stories",
+            sql.SQL(
+                """id, title, summary, main_first, main_last, sex, marital_status,
+                   education_level, destination_city, destination_country, motive,
+                   travel_duration, return_plans, created_at"""
+            ),
+            keys,
+            conditions,
+            descending,
+            after=request.args.get("after"),
+            before=request.args.get("before"),
         )
-        stories = cur.fetchall()
+        total, exact_total = estimate_row_count(conn, "emigrant_stories", conditions)
+        filter_options = {
+            name: [
+                row[0]
+                for row in conn.execute("SELECT emigrant_story_filter_values(%s)", (column,))
+                if row[0]
+            ]
+            for name, column in STORY_FILTER_COLUMNS.items()
+        }
 
-        cur.close()
-        conn.close()
+        # Parámetros que se conservan al cambiar de página
+        list_args = dict(filters, sort=sort, dir="desc" if descending else "asc")
 
         return render_template(
             "admin_stories.html",
             stories=stories,
+            total=total,
+            exact_total=exact_total,
+            filters=filters,
+            filter_options=filter_options,
+            sort=sort,
+            descending=descending,
+            list_args=list_args,
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor,
             languages=LANGUAGES,
             current_lang=current_lang,
         )
     except Exception as e:
+        rollback_db_connection()
         flash(f"Error loading stories: {e}", "danger")
         return redirect(url_for("homepage"))
 
@@ -754,7 +2633,6 @@ def admin_create_story():
 
             conn.commit()
             cur.close()
-            conn.close()
 
             flash("Story created successfully!", "success")
             return redirect(url_for("admin_stories"))
@@ -811,12 +2689,12 @@ def admin_edit_story(story_id):
 
             conn.commit()
             cur.close()
-            conn.close()
 
             flash("Story updated successfully!", "success")
             return redirect(url_for("admin_stories"))
 
         except Exception as e:
+            rollback_db_connection()
             flash(f"Error updating story: {e}", "danger")
 
     # GET request - obtener datos de la historia
@@ -836,7 +2714,6 @@ def admin_edit_story(story_id):
         story = cur.fetchone()
 
         cur.close()
-        conn.close()
 
         if not story:
             flash("Story not found.", "danger")
@@ -876,7 +2753,6 @@ def admin_delete_story(story_id):
             flash("Story not found.", "warning")
 
         cur.close()
-        conn.close()
 
     except Exception as e:
         flash(f"Error deleting story: {e}", "danger")
@@ -895,30 +2771,39 @@ def admin_admins():
 
     try:
         conn = get_db_connection()
-        cur = conn.cursor()
 
-        # Obtener todos los administradores
-        cur.execute(
-            "SELECT id_admin, email, created_at FROM admins ORDER BY created_at DESC"
+        admins, next_cursor, prev_cursor = keyset_page(
+            conn,
+            "admins",
+            sql.SQL("id_admin, email, created_at"),
+            [sql.Identifier("created_at"), sql.Identifier("id_admin")],
+            [],
+            True,
+            after=request.args.get("after"),
+            before=request.args.get("before"),
         )
-        admins = cur.fetchall()
-
-        cur.close()
-        conn.close()
+        total, exact_total = estimate_row_count(conn, "admins", [])
 
         return render_template(
             "admin_admins.html",
             admins=admins,
+            total=total,
+            exact_total=exact_total,
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor,
             current_admin_id=session["admin_id"],
             languages=LANGUAGES,
             current_lang=current_lang,
         )
     except Exception as e:
+        rollback_db_connection()
         flash(f"Error loading admins: {e}", "danger")
         # En lugar de redirigir a homepage, renderizar template con lista vacía
         return render_template(
             "admin_admins.html",
             admins=[],
+            total=0,
+            exact_total=True,
             current_admin_id=session.get("admin_id"),
             languages=LANGUAGES,
             current_lang=current_lang,
@@ -960,7 +2845,6 @@ def admin_create_admin():
 
             conn.commit()
             cur.close()
-            conn.close()
 
             flash("Admin created successfully!", "success")
             return redirect(url_for("admin_admins"))
@@ -1014,12 +2898,12 @@ def admin_edit_admin(admin_id):
 
             conn.commit()
             cur.close()
-            conn.close()
 
             flash("Admin updated successfully!", "success")
             return redirect(url_for("admin_admins"))
 
         except Exception as e:
+            rollback_db_connection()
             flash(f"Error updating admin: {e}", "danger")
 
     # GET request - obtener datos del administrador
@@ -1031,7 +2915,6 @@ def admin_edit_admin(admin_id):
         admin = cur.fetchone()
 
         cur.close()
-        conn.close()
 
         if not admin:
             flash("Admin not found.", "danger")
@@ -1076,7 +2959,6 @@ def admin_delete_admin(admin_id):
             flash("Admin not found.", "warning")
 
         cur.close()
-        conn.close()
 
     except Exception as e:
         flash(f"Error deleting admin: {e}", "danger")
@@ -1,10 +1,20 @@
+import argparse
+import hashlib
 import json
 import os
+import queue
+import threading
 import time
+import uuid
 import random
+import re
 import csv
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 import google.generativeai as genai
 import psycopg 
+from psycopg import sql
 
 # --- Database connection settings ---
 DB_NAME = "house_of_emigrants"
@@ -25,8 +35,44 @@ MODEL_NAME = "gemini-2.0-flash"
 LOW_TEMPERATURE = 0.1
 MAX_OUTPUT_TOKENS = 4096
 
+# --- Batch / concurrency configuration ---
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_RPM", "15"))  # model quota
+GEMINI_BURST = 1  # requests allowed back-to-back before throttling kicks in
+DEFAULT_WORKERS = 1  # extraction requests in flight (1 = sequential)
+WRITE_QUEUE_SIZE = 16  # extracted results waiting for the CSV/DB writer
+
+# --- Long interview configuration ---
+CHUNK_THRESHOLD_CHARS = 24000  # longer interviews are extracted in segments
+CHUNK_SIZE_CHARS = 16000  # about 4k tokens of interview per request
+CHUNK_OVERLAP_CHARS = 1500  # repeated at the start of the next segment
+CHUNK_WORKERS = 4  # segments of one interview extracted at once
+MERGED_KEYWORDS_LIMIT = 15  # same bound the prompt asks for
+
 # --- CSV Configuration ---
 CSV_OUTPUT_DIR = "csv_extractions"
+CSV_FLUSH_ROWS = 500  # buffered rows (all tables) before writing them out
+
+# --- Bulk CSV load configuration ---
+CSV_LOAD_BATCH_SIZE = 1000  # interviews merged per transaction
+
+# CSV file -> staging table (psql/bulk_load_staging.sql), interviews_core first
+BULK_LOAD_TABLES = {
+    "interviews_core.csv": "stg_interviews_core",
+    "immigration_events.csv": "stg_immigration_events",
+    "jobs.csv": "stg_jobs",
+    "education_history.csv": "stg_education_history",
+    "other_people.csv": "stg_other_people",
+    "interview_associated_cultures.csv": "stg_cultures",
+    "interview_languages.csv": "stg_languages",
+    "interview_historic_events.csv": "stg_historic_events",
+    "general_keywords.csv": "stg_keywords",
+}
+
+# --- Extraction cache configuration ---
+EXTRACTION_CACHE_DIR = "extraction_cache"
+
+# --- Ingest manifest configuration ---
+INGEST_MANIFEST_PATH = "ingest_manifest.sqlite3"
 
 GEMINI_JSON_PROMPT_TEMPLATE = """
 You are an expert data extractor specializing in historical personal narratives. Based on the following interview text with an emigrant or their descendants, extract the specified information.
@@ -169,36 +215,342 @@ Interview Text:
 """
 
 
-def write_csv_row(filepath: str, data_dict: dict, fieldnames: list, interview_id: str):
-    """Appends a data row to a CSV file. Writes header if file is new."""
-    file_exists = os.path.isfile(filepath)
-    row_to_write = {"interview_id": interview_id, **data_dict}
+# Short fingerprint of the prompt template, recorded with each cache entry
+PROMPT_VERSION = hashlib.sha256(
+    GEMINI_JSON_PROMPT_TEMPLATE.encode("utf-8")
+).hexdigest()[:12]
+
+
+class ExtractionCache:
+    """On-disk cache of parsed Gemini extractions.
+
+    Entries are keyed by a hash of everything that determines the model output
+    (interview text, prompt template, model name, temperature and output
+    limit), so re-running the batch on unchanged interviews replays the stored
+    JSON instead of calling the API.
+    """
+
+    def __init__(self, directory: str = EXTRACTION_CACHE_DIR, enabled: bool = True):
+        self.directory = directory
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.lock = threading.Lock()
+
+    def key(self, interview_text: str) -> str:
+        material = json.dumps(
+            [
+                interview_text,
+                GEMINI_JSON_PROMPT_TEMPLATE,
+                MODEL_NAME,
+                LOW_TEMPERATURE,
+                MAX_OUTPUT_TOKENS,
+            ]
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
 
-    actual_fieldnames = fieldnames[:]  # Create a copy
-    if "interview_id" not in actual_fieldnames:
-        actual_fieldnames.insert(0, "interview_id")
-    elif actual_fieldnames[0] != "interview_id":
-        actual_fieldnames.remove("interview_id")
-        actual_fieldnames.insert(0, "interview_id")
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
 
-    try:
-        with open(filepath, "a", newline="", encoding="utf-8") as csvfile:
+    def get(self, interview_text: str) -> dict | None:
+        if not self.enabled:
+            return None
+        path = self._path(self.key(interview_text))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return entry["data"]
+
+    def put(self, interview_text: str, data: dict, filename: str):
+        if not self.enabled:
+            return
+        path = self._path(self.key(interview_text))
+        entry = {
+            "filename": filename,
+            "model": MODEL_NAME,
+            "prompt_version": PROMPT_VERSION,
+            "temperature": LOW_TEMPERATURE,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "data": data,
+        }
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)  # Atomic, so readers never see half a file
+            with self.lock:
+                self.writes += 1
+        except OSError as e:
+            print(f"Error writing extraction cache entry for {filename}: {e}")
+
+    def _entries(self):
+        if not os.path.isdir(self.directory):
+            return
+        for dirpath, _, filenames in os.walk(self.directory):
+            for name in filenames:
+                if name.endswith(".json"):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        with open(path, "r", encoding="utf-8") as f:
+                            yield path, json.load(f)
+                    except (OSError, json.JSONDecodeError):
+                        yield path, {}
+
+    def invalidate(self, model: str = None, prompt_version: str = None) -> int:
+        """Deletes entries matching the given model and/or prompt version."""
+        removed = 0
+        for path, entry in list(self._entries()):
+            if model and entry.get("model") != model:
+                continue
+            if prompt_version and entry.get("prompt_version") != prompt_version:
+                continue
+            os.remove(path)
+            removed += 1
+        return removed
+
+    def stats(self) -> dict:
+        """Session counters plus a summary of what is stored on disk."""
+        entries = 0
+        size_bytes = 0
+        by_version = {}
+        for path, entry in self._entries():
+            entries += 1
+            size_bytes += os.path.getsize(path)
+            version = f"{entry.get('model')} / prompt {entry.get('prompt_version')}"
+            by_version[version] = by_version.get(version, 0) + 1
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "entries": entries,
+            "size_bytes": size_bytes,
+            "by_version": by_version,
+        }
+
+
+extraction_cache = ExtractionCache()
+
+
+class IngestManifest:
+    """Persistent record of how far each interview file got in the batch.
+
+    One row per file with its content hash and the time each stage finished
+    (extracted, CSV written, DB committed). A rerun skips files already
+    committed with the same content, and resumes partly processed ones at the
+    stage where they stopped. A changed file starts over.
+    """
+
+    def __init__(self, path: str = INGEST_MANIFEST_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                filename        TEXT PRIMARY KEY,
+                content_hash    TEXT NOT NULL,
+                size            INTEGER NOT NULL,
+                mtime           REAL NOT NULL,
+                extracted_at    TEXT,
+                csv_written_at  TEXT,
+                db_committed_at TEXT
+            )
+            """
+        )
+        self.conn.commit()
+
+    def _row(self, filename: str):
+        return self.conn.execute(
+            "SELECT content_hash, size, mtime, extracted_at, csv_written_at, db_committed_at "
+            "FROM files WHERE filename = ?",
+            (filename,),
+        ).fetchone()
+
+    def status(self, file_path: str) -> str:
+        """Returns 'committed', 'db_committed', 'csv_written', 'extracted' or 'pending'.
+
+        Unchanged size and mtime are trusted without rehashing the file.
+        """
+        filename = os.path.basename(file_path)
+        stat = os.stat(file_path)
+        with self.lock:
+            row = self._row(filename)
+            if row and row[1] == stat.st_size and row[2] == stat.st_mtime:
+                content_hash = row[0]
+            else:
+                with open(file_path, "rb") as f:
+                    content_hash = hashlib.sha256(f.read()).hexdigest()
+                if row is None or row[0] != content_hash:
+                    # New or modified interview: every stage has to run again
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO files (filename, content_hash, size, mtime) "
+                        "VALUES (?, ?, ?, ?)",
+                        (filename, content_hash, stat.st_size, stat.st_mtime),
+                    )
+                    self.conn.commit()
+                    return "pending"
+                self.conn.execute(
+                    "UPDATE files SET size = ?, mtime = ? WHERE filename = ?",
+                    (stat.st_size, stat.st_mtime, filename),
+                )
+                self.conn.commit()
+
+        if row[5] and row[4]:
+            return "committed"
+        if row[5]:
+            return "db_committed"
+        if row[4]:
+            return "csv_written"
+        if row[3]:
+            return "extracted"
+        return "pending"
+
+    def mark(self, file_path: str, stage: str):
+        """Records that ``stage`` (extracted, csv_written, db_committed) finished."""
+        if stage not in ("extracted", "csv_written", "db_committed"):
+            raise ValueError(f"Unknown ingest stage: {stage}")
+        with self.lock:
+            self.conn.execute(
+                f"UPDATE files SET {stage}_at = ? WHERE filename = ?",
+                (datetime.now().isoformat(timespec="seconds"), os.path.basename(file_path)),
+            )
+            self.conn.commit()
+
+    def reset(self, file_path: str):
+        """Clears every stage of a file that is processed again from scratch (--force)."""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE files SET extracted_at = NULL, csv_written_at = NULL, db_committed_at = NULL "
+                "WHERE filename = ?",
+                (os.path.basename(file_path),),
+            )
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class CsvBatchWriter:
+    """Buffered writer for the CSV extraction tables.
+
+    Keeps one open handle per output file for the whole batch, writes each
+    header once (only when the file is new or empty) and buffers rows until
+    ``flush_rows`` are pending or the batch ends. ``on_flush`` is called after
+    every flush that got all the buffered rows on disk. Not meant to be shared
+    between threads; the batch runner feeds it from its single writer thread.
+    """
+
+    def __init__(self, flush_rows: int = CSV_FLUSH_ROWS, on_flush=None):
+        self.flush_rows = flush_rows
+        self.on_flush = on_flush
+        self.handles = {}  # filepath -> (file, csv.DictWriter)
+        self.buffers = {}  # filepath -> (fieldnames, [rows])
+        self.pending_rows = 0
+
+    def write_row(
+        self,
+        filepath: str,
+        data_dict: dict,
+        fieldnames: list,
+        interview_id: str,
+        extraction_id: str = None,
+    ):
+        """Queues a data row for a CSV file, with interview_id and extraction_id as first columns."""
+        actual_fieldnames = ["interview_id", "extraction_id"] + [
+            name for name in fieldnames if name not in ("interview_id", "extraction_id")
+        ]
+        _, rows = self.buffers.setdefault(filepath, (actual_fieldnames, []))
+        rows.append({"interview_id": interview_id, "extraction_id": extraction_id, **data_dict})
+        self.pending_rows += 1
+
+    def end_interview(self):
+        """Flushes once enough rows are buffered; call after each interview."""
+        if self.pending_rows >= self.flush_rows:
+            self.flush()
+
+    def _writer_for(self, filepath: str, fieldnames: list):
+        if filepath not in self.handles:
+            os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+            csvfile = open(filepath, "a+", newline="", encoding="utf-8")
+            if csvfile.tell() > 0:
+                # Appending: keep the columns the file already has (files from
+                # before extraction_id existed go on without it)
+                csvfile.seek(0)
+                fieldnames = next(csv.reader(csvfile), None) or fieldnames
+                csvfile.seek(0, os.SEEK_END)
             writer = csv.DictWriter(
                 csvfile,
-                fieldnames=actual_fieldnames,
+                fieldnames=fieldnames,
                 extrasaction="ignore",
                 quoting=csv.QUOTE_MINIMAL,
             )
-            if not file_exists or os.path.getsize(filepath) == 0:
+            if csvfile.tell() == 0:
                 writer.writeheader()
-            writer.writerow(row_to_write)
-    except Exception as e:
-        print(f"Error writing to CSV file {filepath}: {e}")
+            self.handles[filepath] = (csvfile, writer)
+        return self.handles[filepath][1]
+
+    def flush(self):
+        """Writes the buffered rows out.
+
+        Rows of a file that could not be written stay buffered for the next
+        flush and an OSError is raised; ``on_flush`` only runs once every
+        buffered row is on disk.
+        """
+        failed = []
+        for filepath, (fieldnames, rows) in self.buffers.items():
+            if not rows:
+                continue
+            try:
+                self._writer_for(filepath, fieldnames).writerows(rows)
+                self.handles[filepath][0].flush()
+            except Exception as e:
+                print(f"Error writing to CSV file {filepath}: {e}")
+                failed.append(filepath)
+                continue
+            rows.clear()
+        self.pending_rows = sum(len(rows) for _, rows in self.buffers.values())
+        if failed:
+            raise OSError(f"Could not write CSV files: {', '.join(failed)}")
+        if self.on_flush:
+            self.on_flush()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            for csvfile, _ in self.handles.values():
+                csvfile.close()
+            self.handles.clear()
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
-def save_data_to_csvs(interview_id: str, data: dict):
-    """Saves extracted data into multiple CSV files."""
-    os.makedirs(CSV_OUTPUT_DIR, exist_ok=True)
+
+def save_data_to_csvs(interview_id: str, data: dict, writer: CsvBatchWriter = None):
+    """Saves extracted data into multiple CSV files.
+
+    Rows go to ``writer`` when given (batch mode); otherwise a writer is
+    opened for this interview alone and closed before returning.
+    """
+    if writer is None:
+        with CsvBatchWriter() as single_writer:
+            save_data_to_csvs(interview_id, data, single_writer)
+        return
+
+    # Tags every row of this extraction, so a re-extraction can replace all of
+    # them when the CSVs are loaded (see read_csv_extraction)
+    extraction_id = uuid.uuid4().hex
 
     # 1. interviews_core.csv
     core_data = {
@@ -233,11 +585,12 @@ def save_data_to_csvs(interview_id: str, data: dict):
         "interviewee_marital_status",
         "interviewee_legal_status",
     ]  # Explicit order
-    write_csv_row(
+    writer.write_row(
         os.path.join(CSV_OUTPUT_DIR, "interviews_core.csv"),
         core_data,
         core_fieldnames,
         interview_id,
+        extraction_id,
     )
 
     # 2. immigration_events.csv
@@ -260,11 +613,12 @@ def save_data_to_csvs(interview_id: str, data: dict):
             k: event.get(k) for k in imm_fieldnames if k != "event_sequence_id"
         }
         event_data["event_sequence_id"] = i + 1
-        write_csv_row(
+        writer.write_row(
             os.path.join(CSV_OUTPUT_DIR, "immigration_events.csv"),
             event_data,
             imm_fieldnames,
             interview_id,
+            extraction_id,
         )
 
     # 3. jobs.csv
@@ -279,11 +633,12 @@ def save_data_to_csvs(interview_id: str, data: dict):
     for i, job in enumerate(jobs_list):
         job_data = {k: job.get(k) for k in jobs_fieldnames if k != "job_sequence_id"}
         job_data["job_sequence_id"] = i + 1
-        write_csv_row(
+        writer.write_row(
             os.path.join(CSV_OUTPUT_DIR, "jobs.csv"),
             job_data,
             jobs_fieldnames,
             interview_id,
+            extraction_id,
         )
 
     # 4. education_history.csv
@@ -297,11 +652,12 @@ def save_data_to_csvs(interview_id: str, data: dict):
     for i, edu in enumerate(edu_history):
         edu_data = {k: edu.get(k) for k in edu_fieldnames if k != "edu_sequence_id"}
         edu_data["edu_sequence_id"] = i + 1
-        write_csv_row(
+        writer.write_row(
             os.path.join(CSV_OUTPUT_DIR, "education_history.csv"),
             edu_data,
             edu_fieldnames,
             interview_id,
+            extraction_id,
         )
 
     # 5. other_people.csv
@@ -319,11 +675,12 @@ def save_data_to_csvs(interview_id: str, data: dict):
             if k != "person_sequence_id"
         }
         person_data["person_sequence_id"] = i + 1
-        write_csv_row(
+        writer.write_row(
             os.path.join(CSV_OUTPUT_DIR, "other_people.csv"),
             person_data,
             other_people_fieldnames,
             interview_id,
+            extraction_id,
         )
 
     # 6. Cultural Aspects
@@ -332,21 +689,23 @@ def save_data_to_csvs(interview_id: str, data: dict):
     assoc_cultures = cultural_aspects.get("associated_culture_names", [])
     cultures_fieldnames = ["culture_name"]
     for culture in assoc_cultures:
-        write_csv_row(
+        writer.write_row(
             os.path.join(CSV_OUTPUT_DIR, "interview_associated_cultures.csv"),
             {"culture_name": culture},
             cultures_fieldnames,
             interview_id,
+            extraction_id,
         )
 
     lang_spoken = cultural_aspects.get("languages_spoken_or_mentioned", [])
     languages_fieldnames = ["language_name", "proficiency_or_context"]
     for lang in lang_spoken:
-        write_csv_row(
+        writer.write_row(
             os.path.join(CSV_OUTPUT_DIR, "interview_languages.csv"),
             lang,
             languages_fieldnames,
             interview_id,
+            extraction_id,
         )
 
     # 7. Historic Event Involvements
@@ -363,29 +722,50 @@ def save_data_to_csvs(interview_id: str, data: dict):
             if k != "event_sequence_id"
         }
         event_data["event_sequence_id"] = i + 1
-        write_csv_row(
+        writer.write_row(
             os.path.join(CSV_OUTPUT_DIR, "interview_historic_events.csv"),
             event_data,
             historic_event_fieldnames,
             interview_id,
+            extraction_id,
         )
 
     # 8. General Keywords
     gen_keywords = data.get("general_keywords", [])
     keywords_fieldnames = ["keyword"]
     for keyword in gen_keywords:
-        write_csv_row(
+        writer.write_row(
             os.path.join(CSV_OUTPUT_DIR, "general_keywords.csv"),
             {"keyword": keyword},
             keywords_fieldnames,
             interview_id,
+            extraction_id,
+        )
+
+
+def index_interview_text(cur, text_file_path: str):
+    """Stores the raw interview text in the search index, if psql/search_index.sql is installed."""
+    cur.execute(
+        "SELECT to_regprocedure('set_interview_search_text(text, text)') IS NOT NULL"
+    )
+    if not cur.fetchone()[0] or not os.path.isfile(text_file_path):
+        return
+    with open(text_file_path, "r", encoding="utf-8", errors="replace") as f:
+        cur.execute(
+            "SELECT set_interview_search_text(%s, %s)",
+            (os.path.basename(text_file_path), f.read()),
         )
 
 
 def store_extracted_data_v2(
     text_file_path: str, data: dict
 ):  # data is the JSON object from Gemini
-    """Stores the extracted AI data into the PostgreSQL database via stored procedure."""
+    """Stores the extracted AI data into the PostgreSQL database via stored procedure.
+
+    Storing a filename that is already in text_files replaces what its earlier
+    extraction wrote, in the same transaction. Returns True if the interview
+    was committed, False otherwise.
+    """
     conn = None
     print(f"Attempting to store data in DB for: {os.path.basename(text_file_path)}")
     try:
@@ -459,10 +839,12 @@ def store_extracted_data_v2(
                     gen_keywords if gen_keywords else None,  # TEXT[]
                 ),
             )
+            index_interview_text(cur, text_file_path)
             conn.commit()
             print(
                 f"Successfully ingested data into DB for: {os.path.basename(text_file_path)}"
             )
+            return True
 
     except psycopg.Error as e:
         if conn:
@@ -471,17 +853,182 @@ def store_extracted_data_v2(
             f"Database error storing data for {os.path.basename(text_file_path)}: {e}"
         )
         print(f"SQLSTATE: {e.sqlstate}")
+        return False
     except Exception as e:
         if conn:
             conn.rollback()
         print(
             f"An unexpected error occurred while storing data for {os.path.basename(text_file_path)}: {e}"
         )
+        return False
     finally:
         if conn:
             conn.close()
 
 
+def read_csv_extraction(path: str):
+    """Reads one extraction CSV as (columns, {interview_id: (extraction_id, rows)}).
+
+    Each interview's rows are written contiguously, so a later block for the
+    same interview comes from a re-extraction and replaces the earlier one;
+    only the last block is returned, with the extraction_id that wrote it
+    (None for files written before the column existed). extraction_id is left
+    out of the columns and rows. Empty fields become None (NULL once copied).
+    """
+    blocks = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        columns = next(reader, [])
+        id_column = columns.index("extraction_id") if "extraction_id" in columns else None
+        previous_block = None
+        for row in reader:
+            interview_id = row[0]
+            extraction_id = row[id_column] if id_column is not None else None
+            if (interview_id, extraction_id) != previous_block:
+                blocks[interview_id] = (extraction_id, [])  # New block
+                previous_block = (interview_id, extraction_id)
+            blocks[interview_id][1].append(
+                [value or None for i, value in enumerate(row) if i != id_column]
+            )
+    if id_column is not None:
+        columns = columns[:id_column] + columns[id_column + 1 :]
+    return columns, blocks
+
+
+def load_csvs_into_db(
+    csv_dir: str = CSV_OUTPUT_DIR,
+    batch_size: int = CSV_LOAD_BATCH_SIZE,
+    manifest: IngestManifest = None,
+    text_dir: str = None,
+) -> dict:
+    """Bulk loads the extraction CSVs into PostgreSQL (psql/bulk_load_staging.sql).
+
+    Interviews are COPYed into staging tables ``batch_size`` at a time and
+    merged with set-based SQL, one transaction per batch. Interviews whose
+    filename is already in text_files are skipped, so a rerun only loads new
+    ones. A failed batch is rolled back and the load goes on with the next.
+    Interview texts found in ``text_dir`` are added to the search index.
+    """
+    # The winning extraction of each interview is its last core row; blocks
+    # left in other tables by earlier extractions are dropped, even when the
+    # winner wrote no rows to that table
+    tables = {}
+    winners = {}
+    for filename, staging_table in BULK_LOAD_TABLES.items():  # interviews_core first
+        path = os.path.join(csv_dir, filename)
+        if not os.path.exists(path):
+            continue
+        columns, blocks = read_csv_extraction(path)
+        if staging_table == "stg_interviews_core":
+            winners = {interview_id: block[0] for interview_id, block in blocks.items()}
+        tables[staging_table] = (
+            columns,
+            {
+                interview_id: rows
+                for interview_id, (extraction_id, rows) in blocks.items()
+                if extraction_id is None or winners.get(interview_id) in (None, extraction_id)
+            },
+        )
+    interview_ids = list(tables.get("stg_interviews_core", ([], {}))[1])
+    counts = {"interviews": len(interview_ids), "loaded": 0, "failed": 0}
+
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT create_bulk_staging_tables()")
+            conn.commit()
+
+            for start in range(0, len(interview_ids), batch_size):
+                batch = interview_ids[start : start + batch_size]
+                started_at = time.monotonic()
+                try:
+                    with conn.transaction():
+                        for staging_table, (columns, rows_by_interview) in tables.items():
+                            copy_sql = sql.SQL("COPY {} ({}) FROM STDIN").format(
+                                sql.Identifier(staging_table),
+                                sql.SQL(", ").join(map(sql.Identifier, columns)),
+                            )
+                            with cur.copy(copy_sql) as copy:
+                                for interview_id in batch:
+                                    for row in rows_by_interview.get(interview_id, ()):
+                                        copy.write_row(row)
+                        cur.execute("CALL merge_staged_interviews()")
+                        loaded = cur.fetchone()[0]
+                        cur.execute("SELECT interview_id FROM stg_loaded")
+                        loaded_ids = [row[0] for row in cur.fetchall()]
+                        if text_dir:
+                            for interview_id in loaded_ids:
+                                index_interview_text(cur, os.path.join(text_dir, interview_id))
+                except psycopg.Error as e:
+                    print(f"Database error loading interviews {start + 1}-{start + len(batch)}: {e}")
+                    counts["failed"] += len(batch)
+                    continue
+
+                counts["loaded"] += loaded
+                if manifest:
+                    for interview_id in loaded_ids:
+                        manifest.mark(interview_id, "db_committed")
+                print(
+                    f"Loaded {loaded} of {len(batch)} interviews "
+                    f"({start + len(batch)}/{len(interview_ids)}) in {time.monotonic() - started_at:.1f}s"
+                )
+    finally:
+        conn.close()
+    return counts
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by all extraction workers.
+
+    Keeps the request rate under the model quota so workers wait locally
+    instead of relying on 429 responses and backoff.
+    """
+
+    def __init__(self, rate_per_second: float, capacity: float = 1):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+
+gemini_rate_limiter = TokenBucket(GEMINI_REQUESTS_PER_MINUTE / 60, GEMINI_BURST)
+
+_gemini_model = None
+_gemini_model_lock = threading.Lock()
+
+
+def get_gemini_model(api_key: str):
+    """Builds the GenerativeModel once and reuses it for every request."""
+    global _gemini_model
+    with _gemini_model_lock:
+        if _gemini_model is None:
+            genai.configure(api_key=api_key)
+            generation_config = genai.types.GenerationConfig(
+                response_mime_type="application/json",
+                temperature=LOW_TEMPERATURE,
+                max_output_tokens=MAX_OUTPUT_TOKENS,
+            )
+            _gemini_model = genai.GenerativeModel(
+                MODEL_NAME, generation_config=generation_config
+            )
+        return _gemini_model
+
+
 def call_gemini_api_with_retry(
     interview_text: str,
     api_key: str,
@@ -489,13 +1036,7 @@ def call_gemini_api_with_retry(
     max_retries: int = 3,
     initial_wait_time: float = 7.0,
 ) -> str | None:
-    genai.configure(api_key=api_key)
-    generation_config = genai.types.GenerationConfig(
-        response_mime_type="application/json",
-        temperature=LOW_TEMPERATURE,
-        max_output_tokens=MAX_OUTPUT_TOKENS,
-    )
-    model = genai.GenerativeModel(MODEL_NAME, generation_config=generation_config)
+    model = get_gemini_model(api_key)
     full_prompt = GEMINI_JSON_PROMPT_TEMPLATE.replace(
         "{{interview_text}}", interview_text
     )
@@ -507,6 +1048,7 @@ def call_gemini_api_with_retry(
             print(
                 f"Attempt {retries + 1}/{max_retries + 1} for {filename_for_log}: Sending prompt to Gemini (model: {MODEL_NAME})..."
             )
+            gemini_rate_limiter.acquire()
             response = model.generate_content(full_prompt)
             if response.parts:
                 return response.text.strip()
@@ -548,6 +1090,271 @@ def call_gemini_api_with_retry(
     return None
 
 
+def extract_json_with_gemini(
+    interview_text: str, api_key: str, filename_for_log: str
+) -> dict | None:
+    """Cached Gemini extraction of one text (a whole interview or a segment)."""
+    cached_data = extraction_cache.get(interview_text)
+    if cached_data is not None:
+        print(f"Using cached extraction for {filename_for_log}")
+        return cached_data
+
+    json_response_str = call_gemini_api_with_retry(
+        interview_text, api_key, filename_for_log
+    )
+
+    if json_response_str:
+        try:
+            extracted_data = json.loads(json_response_str)
+            extraction_cache.put(interview_text, extracted_data, filename_for_log)
+            return extracted_data
+        except json.JSONDecodeError as e:
+            print(f"Error decoding JSON from Gemini API for file {filename_for_log}: {e}")
+            print(f"Received string (failed parse):\n---\n{json_response_str}\n---")
+            return None
+    else:
+        print(
+            f"No valid JSON response from Gemini for {filename_for_log} after retries/errors."
+        )
+        return None
+
+
+# --- Long interviews: split, extract segments in parallel, merge ---
+# A long transcript in one request makes the JSON answer outgrow
+# MAX_OUTPUT_TOKENS (truncated, unparseable output) and serializes the whole
+# interview behind one slow call. Segments overlap so that a passage cut at a
+# boundary is still seen whole by one of them; the merge removes the entities
+# both segments report.
+
+CHUNK_NOTE_TEMPLATE = (
+    "[This is part {part} of {parts} of a longer interview; consecutive parts overlap slightly. "
+    "Extract only what this part states and leave the remaining fields empty.]\n\n"
+)
+
+# list field -> (fields that must match, fields that must not contradict)
+# Two entries are the same entity when their required fields are equal and the
+# optional ones agree wherever both are filled in. Lists with no required
+# field need at least one optional field in common.
+LIST_MERGE_KEYS = {
+    "interviewee_immigration_events": (
+        (),
+        ("immigration_date", "origin_country_name", "destination_country_name", "destination_city_name"),
+    ),
+    "interviewee_jobs": (("occupation",), ("employer",)),
+    "interviewee_education_history": (("education_level_achieved",), ("school_name",)),
+    "interviewee_health_issues": (("health_issue_description",), ()),
+    "other_people_mentioned": (("full_name",), ()),
+    "interviewee_community_involvements": (("community_name",), ()),
+    "interviewee_historic_event_involvement": (("historic_event_name",), ()),
+    # interviewee_cultural_aspects
+    "languages_spoken_or_mentioned": (("language_name",), ()),
+    "cultural_events_mentioned": (("event_name",), ()),
+    "cultural_practices_mentioned": (("practice_name",), ()),
+    # nested in health issues
+    "medical_treatments_received": (("treatment_name",), ()),
+}
+CHUNK_SCALAR_FIELDS = (
+    "story_title",
+    "story_summary",
+    "interview_location",
+    "interview_date",
+    "interviewee_name",
+    "interviewee_birthday",
+    "interviewee_birthplace_city_name",
+    "interviewee_birthplace_country_name",
+    "interviewee_sex",
+    "interviewee_marital_status",
+    "interviewee_legal_status_at_migration_or_current",
+)
+
+
+def split_interview_text(
+    text: str, size: int = CHUNK_SIZE_CHARS, overlap: int = CHUNK_OVERLAP_CHARS
+) -> list:
+    """Cuts text into segments of at most size characters, each one starting
+    overlap characters before the previous one ended. Cuts fall on a paragraph,
+    line or sentence break in the last quarter of the segment when there is one."""
+    segments = []
+    start = 0
+    while True:
+        end = min(start + size, len(text))
+        if end < len(text):
+            for separator in ("\n\n", "\n", ". "):
+                cut = text.rfind(separator, start + size * 3 // 4, end)
+                if cut != -1:
+                    end = cut + len(separator)
+                    break
+        segments.append(text[start:end])
+        if end >= len(text):
+            return segments
+        next_start = max(end - overlap, start + 1)
+        word_break = re.search(r"\s", text[next_start:end])  # don't start mid-word
+        start = next_start + word_break.end() if word_break else next_start
+
+
+def _norm(value) -> str:
+    return " ".join(str(value).split()).casefold() if value else ""
+
+
+def _is_empty(value) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _as_list(value) -> list:
+    if isinstance(value, dict):  # the prompt allows a lone object for immigration events
+        return [value]
+    return value if isinstance(value, list) else []
+
+
+def _same_entity(a: dict, b: dict, required: tuple, optional: tuple) -> bool:
+    for field in required:
+        if not _norm(a.get(field)) or _norm(a.get(field)) != _norm(b.get(field)):
+            return False
+    shared = 0
+    for field in optional:
+        va, vb = _norm(a.get(field)), _norm(b.get(field))
+        if va and vb:
+            if va != vb:
+                return False
+            shared += 1
+    return bool(required) or shared > 0
+
+
+def merge_string_lists(*lists) -> list:
+    """Case-insensitive union, keeping the first spelling and order."""
+    merged, seen = [], set()
+    for values in lists:
+        for value in _as_list(values):
+            key = _norm(value)
+            if key and key not in seen:
+                seen.add(key)
+                merged.append(value)
+    return merged
+
+
+def merge_entity_lists(field: str, *lists) -> list:
+    """Union of extracted entities; duplicates fill in the fields the first one lacks."""
+    required, optional = LIST_MERGE_KEYS[field]
+    merged = []
+    for entries in lists:
+        for entry in _as_list(entries):
+            if not isinstance(entry, dict):
+                continue
+            match = next(
+                (kept for kept in merged if _same_entity(kept, entry, required, optional)),
+                None,
+            )
+            if match is None:
+                merged.append(dict(entry))
+                continue
+            for key, value in entry.items():
+                if _is_empty(value):
+                    continue
+                if _is_empty(match.get(key)):
+                    match[key] = value
+                elif key in LIST_MERGE_KEYS:
+                    match[key] = merge_entity_lists(key, match[key], value)
+                elif isinstance(value, list):
+                    match[key] = merge_string_lists(match[key], value)
+    return merged
+
+
+def merge_chunk_extractions(parts: list) -> dict:
+    """Merges segment extractions (in text order) into one interview extraction.
+
+    Scalars take the first non-empty value, entity lists are deduplicated with
+    LIST_MERGE_KEYS and keywords keep the ones most segments agree on. The
+    result only depends on the order of parts, so reruns give the same rows."""
+    merged = {
+        field: next((p.get(field) for p in parts if not _is_empty(p.get(field))), "")
+        for field in CHUNK_SCALAR_FIELDS
+    }
+    for field in (
+        "interviewee_immigration_events",
+        "interviewee_jobs",
+        "interviewee_education_history",
+        "interviewee_health_issues",
+        "other_people_mentioned",
+        "interviewee_community_involvements",
+        "interviewee_historic_event_involvement",
+    ):
+        merged[field] = merge_entity_lists(field, *(p.get(field) for p in parts))
+
+    # Segments that don't know who is speaking list the interviewee as "other"
+    interviewee = _norm(merged["interviewee_name"])
+    merged["other_people_mentioned"] = [
+        person
+        for person in merged["other_people_mentioned"]
+        if not interviewee or _norm(person.get("full_name")) != interviewee
+    ]
+
+    cultural = [
+        p.get("interviewee_cultural_aspects") or {}
+        for p in parts
+        if isinstance(p.get("interviewee_cultural_aspects"), dict)
+    ]
+    merged["interviewee_cultural_aspects"] = {
+        "associated_culture_names": merge_string_lists(
+            *(c.get("associated_culture_names") for c in cultural)
+        ),
+        **{
+            field: merge_entity_lists(field, *(c.get(field) for c in cultural))
+            for field in (
+                "languages_spoken_or_mentioned",
+                "cultural_events_mentioned",
+                "cultural_practices_mentioned",
+            )
+        },
+    }
+
+    keyword_counts, keyword_first = {}, {}
+    for p in parts:
+        for keyword in merge_string_lists(p.get("general_keywords")):
+            key = _norm(keyword)
+            keyword_counts[key] = keyword_counts.get(key, 0) + 1
+            keyword_first.setdefault(key, (len(keyword_first), keyword))
+    ranked = sorted(keyword_counts, key=lambda k: (-keyword_counts[k], keyword_first[k][0]))
+    merged["general_keywords"] = [
+        keyword_first[k][1] for k in ranked[:MERGED_KEYWORDS_LIMIT]
+    ]
+    return merged
+
+
+def analyze_interview_in_chunks(
+    interview_text: str, api_key: str, filename_for_log: str
+) -> dict | None:
+    """Extracts the segments of a long interview concurrently and merges them.
+    Each segment is cached on its own, so a failed run only repeats the
+    segments that failed."""
+    segments = split_interview_text(interview_text)
+    prompts = [
+        CHUNK_NOTE_TEMPLATE.format(part=i + 1, parts=len(segments)) + segment
+        for i, segment in enumerate(segments)
+    ]
+    print(
+        f"{filename_for_log}: {len(interview_text)} characters, extracting "
+        f"{len(segments)} segments ({min(CHUNK_WORKERS, len(segments))} at a time)"
+    )
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(CHUNK_WORKERS, len(segments))),
+        thread_name_prefix="gemini-chunk",
+    ) as pool:
+        parts = list(
+            pool.map(
+                lambda args: extract_json_with_gemini(
+                    args[1], api_key, f"{filename_for_log} [part {args[0] + 1}/{len(prompts)}]"
+                ),
+                enumerate(prompts),
+            )
+        )
+
+    failed = [i + 1 for i, part in enumerate(parts) if not isinstance(part, dict)]
+    if failed:
+        print(f"Extraction failed for {filename_for_log} (parts {failed}).")
+        return None
+    return merge_chunk_extractions(parts)
+
+
 def analyze_interview_with_gemini(
     interview_file_path: str, api_key: str
 ) -> dict | None:
@@ -564,27 +1371,208 @@ def analyze_interview_with_gemini(
         print(f"Error: File {filename_only} is empty.")
         return None
 
-    json_response_str = call_gemini_api_with_retry(
-        interview_text, api_key, filename_only
-    )
+    if CHUNK_THRESHOLD_CHARS and len(interview_text) > CHUNK_THRESHOLD_CHARS:
+        return analyze_interview_in_chunks(interview_text, api_key, filename_only)
+    return extract_json_with_gemini(interview_text, api_key, filename_only)
 
-    if json_response_str:
+
+def run_extraction_batch(
+    file_paths: list,
+    api_key: str,
+    workers: int = DEFAULT_WORKERS,
+    queue_size: int = WRITE_QUEUE_SIZE,
+    manifest: IngestManifest = None,
+    resume_stages: dict = None,
+) -> dict:
+    """Extracts interviews concurrently and feeds a single CSV/DB writer thread.
+
+    Up to ``workers`` Gemini requests are in flight (paced by
+    gemini_rate_limiter). Extracted results go through a bounded queue, so
+    workers block instead of piling up results when the writer falls behind.
+    With a ``manifest``, each finished stage is checkpointed; ``resume_stages``
+    maps file paths to the manifest status they start from, so files whose
+    CSV rows were already written only get the DB step (and vice versa).
+    """
+    resume_stages = resume_stages or {}
+    counts = {"processed": 0, "failed_extraction": 0, "failed_db": 0}
+    write_queue = queue.Queue(maxsize=queue_size)
+
+    # CSV rows are buffered; an interview only counts as csv_written in the
+    # manifest once its rows have been flushed to disk
+    csv_buffered = []
+
+    def csv_flushed():
+        for file_path in csv_buffered:
+            print(f"--- Successfully saved CSV data for {os.path.basename(file_path)} ---")
+            if manifest:
+                manifest.mark(file_path, "csv_written")
+        csv_buffered.clear()
+
+    csv_writer = CsvBatchWriter(on_flush=csv_flushed)
+
+    def writer():
+        while True:
+            item = write_queue.get()
+            if item is None:
+                break
+            file_path, data = item
+            filename = os.path.basename(file_path)
+            stage = resume_stages.get(file_path)
+            try:
+                if stage != "csv_written":
+                    save_data_to_csvs(filename, data, csv_writer)
+                    csv_buffered.append(file_path)
+                    csv_writer.end_interview()
+                if stage == "db_committed" or store_extracted_data_v2(file_path, data):
+                    if manifest:
+                        manifest.mark(file_path, "db_committed")
+                    counts["processed"] += 1
+                else:
+                    counts["failed_db"] += 1
+            except Exception as e:  # Catch errors during CSV saving or DB storing
+                print(f"--- Error during CSV saving or DB storing for {filename}: {e} ---")
+                counts["failed_db"] += 1
         try:
-            extracted_data = json.loads(json_response_str)
-            return extracted_data
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON from Gemini API for file {filename_only}: {e}")
-            print(f"Received string (failed parse):\n---\n{json_response_str}\n---")
-            return None
-    else:
-        print(
-            f"No valid JSON response from Gemini for {filename_only} after retries/errors."
-        )
-        return None
+            csv_writer.close()
+        except OSError as e:
+            # Interviews still buffered stay unmarked and are written next run
+            print(f"--- Error writing the last CSV rows: {e} ---")
+
+    def extract(file_path):
+        data = analyze_interview_with_gemini(file_path, api_key)
+        if not data:
+            print(f"--- Failed to extract data for {os.path.basename(file_path)} ---")
+            return False
+        print(f"--- Successfully extracted data for {os.path.basename(file_path)} ---")
+        if manifest:
+            manifest.mark(file_path, "extracted")
+        write_queue.put((file_path, data))  # Blocks while the writer is behind
+        return True
+
+    writer_thread = threading.Thread(target=writer, name="csv-db-writer")
+    writer_thread.start()
+    try:
+        with ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="gemini"
+        ) as pool:
+            for ok in pool.map(extract, file_paths):
+                if not ok:
+                    counts["failed_extraction"] += 1
+    finally:
+        write_queue.put(None)
+        writer_thread.join()
+    return counts
 
 
 # --- Main Script ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Extract interview data with Gemini into CSVs and PostgreSQL."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Gemini requests in flight at once (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        default=GEMINI_REQUESTS_PER_MINUTE,
+        help="Requests per minute allowed by the model quota (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--chunk-threshold",
+        type=int,
+        default=CHUNK_THRESHOLD_CHARS,
+        help="Split interviews longer than this many characters into segments extracted "
+        "in parallel; 0 disables splitting (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--chunk-workers",
+        type=int,
+        default=CHUNK_WORKERS,
+        help="Segments of one long interview extracted at once (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=WRITE_QUEUE_SIZE,
+        help="Extracted interviews buffered for the writer (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call Gemini, ignoring and not updating the extraction cache.",
+    )
+    parser.add_argument(
+        "--cache-stats",
+        action="store_true",
+        help="Print extraction cache statistics and exit.",
+    )
+    parser.add_argument(
+        "--invalidate-model",
+        metavar="MODEL",
+        help="Delete cached extractions produced by MODEL and exit.",
+    )
+    parser.add_argument(
+        "--invalidate-prompt",
+        metavar="VERSION",
+        help=f"Delete cached extractions for a prompt version and exit (current: {PROMPT_VERSION}).",
+    )
+    parser.add_argument(
+        "--manifest",
+        default=INGEST_MANIFEST_PATH,
+        help="Checkpoint file used to resume runs (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--since",
+        type=datetime.fromisoformat,
+        metavar="DATE",
+        help="Only consider interviews modified at or after DATE (YYYY-MM-DD[THH:MM]).",
+    )
+    parser.add_argument(
+        "--load-csvs",
+        action="store_true",
+        help=f"Bulk load the CSVs in {CSV_OUTPUT_DIR}/ into PostgreSQL and exit.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=CSV_LOAD_BATCH_SIZE,
+        help="Interviews per transaction for --load-csvs (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Process every interview again, even those already committed.",
+    )
+    args = parser.parse_args()
+
+    if args.cache_stats:
+        print(json.dumps(extraction_cache.stats(), indent=2))
+        exit(0)
+    if args.invalidate_model or args.invalidate_prompt:
+        removed = extraction_cache.invalidate(
+            model=args.invalidate_model, prompt_version=args.invalidate_prompt
+        )
+        print(f"Removed {removed} cached extractions.")
+        exit(0)
+    extraction_cache.enabled = not args.no_cache
+
+    if args.load_csvs:
+        manifest = IngestManifest(args.manifest)
+        counts = load_csvs_into_db(
+            batch_size=args.batch_size, manifest=manifest, text_dir="texts"
+        )
+        manifest.close()
+        print(
+            f"\n--- Bulk load complete: {counts['loaded']} of {counts['interviews']} interviews loaded, "
+            f"{counts['interviews'] - counts['loaded'] - counts['failed']} already in the database, "
+            f"{counts['failed']} in failed batches ---"
+        )
+        exit(0)
+
     google_api_key = os.getenv("GOOGLE_API_KEY")
     if not google_api_key:
         print("Error: GOOGLE_API_KEY environment variable not found.")
@@ -598,12 +1586,14 @@ if __name__ == "__main__":
     os.makedirs(CSV_OUTPUT_DIR, exist_ok=True)
     print(f"CSV files will be saved in: {os.path.abspath(CSV_OUTPUT_DIR)}")
 
+    gemini_rate_limiter = TokenBucket(args.rpm / 60, GEMINI_BURST)
+    CHUNK_THRESHOLD_CHARS = args.chunk_threshold
+    CHUNK_WORKERS = args.chunk_workers
+
     print(
-        f"\n--- Starting Batch Processing from directory: {INTERVIEW_DIR} with Gemini ---"
+        f"\n--- Starting Batch Processing from directory: {INTERVIEW_DIR} with Gemini "
+        f"({args.workers} workers, {args.rpm:g} requests/min) ---"
     )
-    processed_successfully_count = 0
-    failed_extraction_count = 0
-    failed_db_insert_count = 0
 
     # Optional: Clear existing CSV files if you want to overwrite on each full run
     # for dirpath, dirnames, filenames in os.walk(CSV_OUTPUT_DIR):
@@ -612,54 +1602,58 @@ if __name__ == "__main__":
     #             os.remove(os.path.join(dirpath, file))
     # print("Cleared existing CSV files.")
 
-    for filename in os.listdir(INTERVIEW_DIR):
-        if filename.endswith(".txt"):
-            file_path = os.path.join(INTERVIEW_DIR, filename)
-            interview_id_for_csv = (
-                filename  # Use filename as the unique ID for linking CSV rows
-            )
-
-            extracted_info = analyze_interview_with_gemini(file_path, google_api_key)
-
-            if extracted_info:
-                print(f"--- Successfully extracted data for {filename} ---")
-                try:
-                    save_data_to_csvs(interview_id_for_csv, extracted_info)
-                    print(f"--- Successfully saved CSV data for {filename} ---")
-
-                    # Now, also store in the database
-                    store_extracted_data_v2(
-                        file_path, extracted_info
-                    )  # This function now prints its own success/failure
-                    # We assume store_extracted_data_v2 handles its own errors and doesn't raise to here
-                    # unless it's a critical, unhandled exception.
-                    # For counting, we'll rely on the extraction being successful.
-                    # A more robust way would be for store_extracted_data_v2 to return True/False.
-                    processed_successfully_count += 1
-
-                except Exception as e:  # Catch errors during CSV saving or DB storing
-                    print(
-                        f"--- Error during CSV saving or DB storing for {filename}: {e} ---"
-                    )
-                    failed_db_insert_count += (
-                        1  # Or a more general "processing_error_count"
-                    )
-            else:
-                print(f"--- Failed to extract data for {filename} ---")
-                failed_extraction_count += 1
+    file_paths = [
+        os.path.join(INTERVIEW_DIR, filename)
+        for filename in sorted(os.listdir(INTERVIEW_DIR))
+        if filename.endswith(".txt")
+    ]
+    if args.since:
+        file_paths = [
+            path
+            for path in file_paths
+            if os.path.getmtime(path) >= args.since.timestamp()
+        ]
+
+    # Skip interviews already committed with the same content; resume the rest
+    manifest = IngestManifest(args.manifest)
+    resume_stages = {}
+    pending_paths = []
+    for path in file_paths:
+        status = manifest.status(path)
+        if args.force:
+            # An interrupted forced run must not be reported as committed
+            manifest.reset(path)
+            status = "pending"
+        if status == "committed":
+            continue
+        resume_stages[path] = status
+        pending_paths.append(path)
+    print(
+        f"{len(file_paths) - len(pending_paths)} of {len(file_paths)} interviews already "
+        f"committed (manifest: {args.manifest}), {len(pending_paths)} to process."
+    )
 
-            # time.sleep(1) # Optional delay if still facing rate limits despite retry logic
+    counts = run_extraction_batch(
+        pending_paths,
+        google_api_key,
+        workers=args.workers,
+        queue_size=args.queue_size,
+        manifest=manifest,
+        resume_stages=resume_stages,
+    )
+    manifest.close()
 
     print(f"\n--- Batch Processing Complete ---")
+    print(f"Successfully extracted and stored in DB: {counts['processed']} files.")
     print(
-        f"Successfully extracted and attempted DB insert for: {processed_successfully_count} files."
+        f"Failed to extract data (API/JSON parse error): {counts['failed_extraction']} files."
     )
-    print(
-        f"Failed to extract data (API/JSON parse error): {failed_extraction_count} files."
-    )
-    if (
-        failed_db_insert_count > 0
-    ):  # Only print if there were DB insert specific failures
+    if counts["failed_db"] > 0:  # Only print if there were DB insert specific failures
         print(
-            f"Failed during CSV save or DB insert stage (after successful extraction): {failed_db_insert_count} files."
+            f"Failed during CSV save or DB insert stage (after successful extraction): {counts['failed_db']} files."
         )
+    cache_stats = extraction_cache.stats()
+    print(
+        f"Extraction cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+        f"{cache_stats['entries']} entries on disk."
+    )
@@ -0,0 +1,44 @@
+-- Indexes behind the paginated admin listings (/admin/stories, /admin/admins).
+-- Pages are fetched by seeking on (sort key, created_at, id) instead of OFFSET,
+-- so every page costs the same. The story filters/sorts (country, motive, sex)
+-- use COALESCE(column, '') as sort key so rows without a value still page.
+DO $$
+BEGIN
+    IF to_regclass('emigrant_stories') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS idx_emigrant_stories_created
+            ON emigrant_stories (created_at, id);
+        CREATE INDEX IF NOT EXISTS idx_emigrant_stories_country
+            ON emigrant_stories ((COALESCE(destination_country, '')), created_at, id);
+        CREATE INDEX IF NOT EXISTS idx_emigrant_stories_motive
+            ON emigrant_stories ((COALESCE(motive, '')), created_at, id);
+        CREATE INDEX IF NOT EXISTS idx_emigrant_stories_sex
+            ON emigrant_stories ((COALESCE(sex, '')), created_at, id);
+    END IF;
+
+    IF to_regclass('admins') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS idx_admins_created ON admins (created_at, id_admin);
+    END IF;
+END;
+$$;
+
+-- Distinct values of a story filter column for the filter dropdowns.
+-- Loose index scan: one probe of the index above per distinct value instead
+-- of reading the whole table.
+CREATE OR REPLACE FUNCTION emigrant_story_filter_values(p_column TEXT)
+RETURNS SETOF TEXT AS $$
+BEGIN
+    IF p_column NOT IN ('destination_country', 'motive', 'sex') THEN
+        RAISE EXCEPTION 'Not a story filter column: %', p_column;
+    END IF;
+
+    RETURN QUERY EXECUTE format(
+        'WITH RECURSIVE v(val) AS (
+             SELECT min(COALESCE(%1$I, '''')) FROM emigrant_stories
+             UNION ALL
+             SELECT (SELECT min(COALESCE(%1$I, '''')) FROM emigrant_stories WHERE COALESCE(%1$I, '''') > v.val)
+             FROM v WHERE v.val IS NOT NULL
+         )
+         SELECT val FROM v WHERE val IS NOT NULL',
+        p_column);
+END;
+$$ LANGUAGE plpgsql STABLE;
@@ -0,0 +1,28 @@
+-- Work queue for upload processing (interview extraction, image derivatives).
+-- Run after init_house_of_emmigrants.sql. Jobs are enqueued by the upload
+-- routes in main.py and claimed by worker threads with FOR UPDATE SKIP LOCKED,
+-- so several app processes (or `flask run-job-worker`) can share the queue.
+CREATE TABLE IF NOT EXISTS background_jobs (
+  id_job       SERIAL    PRIMARY KEY,
+  kind         TEXT      NOT NULL, -- 'extract_interview' or 'image_derivatives'
+  dedupe_key   TEXT      NOT NULL, -- kind, file and content hash
+  payload      JSONB     NOT NULL,
+  status       TEXT      NOT NULL DEFAULT 'queued'
+               CHECK (status IN ('queued', 'running', 'done', 'failed')),
+  attempts     INT       NOT NULL DEFAULT 0,
+  max_attempts INT       NOT NULL DEFAULT 3,
+  run_after    TIMESTAMP NOT NULL DEFAULT now(), -- retries back off
+  last_error   TEXT,
+  locked_by    TEXT,                             -- worker that claimed it
+  created_at   TIMESTAMP NOT NULL DEFAULT now(),
+  started_at   TIMESTAMP,
+  finished_at  TIMESTAMP
+);
+
+-- The same file content is processed once: enqueueing it again returns the
+-- queued, running or finished job. Failed jobs can be enqueued again.
+CREATE UNIQUE INDEX IF NOT EXISTS uq_background_jobs_dedupe
+  ON background_jobs (dedupe_key) WHERE status <> 'failed';
+
+CREATE INDEX IF NOT EXISTS idx_background_jobs_ready
+  ON background_jobs (run_after, id_job) WHERE status = 'queued';
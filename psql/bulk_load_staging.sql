@@ -0,0 +1,365 @@
+-- Bulk load of the CSVs written by multimedia/genai_data_extraction.py
+-- (csv_extractions/). The loader COPYs a batch of interviews into the session's
+-- staging tables and calls merge_staged_interviews(), which writes the whole
+-- batch with one INSERT ... SELECT per table, resolving lookups the same way
+-- as ingest_interview_from_ai_json_v2. People are not lookups: interviewees
+-- and the other people mentioned go through find_or_create_person (and so
+-- resolve_person, when person_resolution.sql is installed), as in the
+-- procedure. One transaction per batch; the staging rows are cleared on commit.
+-- Run after ingest_data_get_functions.sql (and normalized_name_indexes.sql).
+
+-- Interviews already in text_files are skipped by filename
+CREATE INDEX IF NOT EXISTS idx_text_files_filename ON text_files (filename);
+
+-- Creates the session's staging tables. Columns match the CSV headers; ord
+-- keeps file order (first culture listed is the main one, first spelling wins).
+CREATE OR REPLACE FUNCTION create_bulk_staging_tables()
+RETURNS VOID AS $$
+BEGIN
+    CREATE TEMP TABLE IF NOT EXISTS stg_interviews_core (
+        ord BIGINT GENERATED ALWAYS AS IDENTITY,
+        interview_id TEXT, story_title TEXT, story_summary TEXT,
+        interview_location TEXT, interview_date TEXT,
+        interviewee_name TEXT, interviewee_birthday TEXT,
+        interviewee_birthplace_city_name TEXT, interviewee_birthplace_country_name TEXT,
+        interviewee_sex TEXT, interviewee_marital_status TEXT, interviewee_legal_status TEXT
+    ) ON COMMIT DELETE ROWS;
+
+    CREATE TEMP TABLE IF NOT EXISTS stg_immigration_events (
+        ord BIGINT GENERATED ALWAYS AS IDENTITY,
+        interview_id TEXT, event_sequence_id TEXT,
+        immigration_date TEXT, reason_immigration TEXT,
+        origin_city_name TEXT, origin_country_name TEXT,
+        destination_city_name TEXT, destination_country_name TEXT,
+        travel_type_name TEXT, entry_port_name TEXT, arrival_port_name TEXT,
+        return_plans TEXT
+    ) ON COMMIT DELETE ROWS;
+
+    CREATE TEMP TABLE IF NOT EXISTS stg_jobs (
+        ord BIGINT GENERATED ALWAYS AS IDENTITY,
+        interview_id TEXT, job_sequence_id TEXT,
+        occupation TEXT, employer TEXT, job_position TEXT, education_level_for_job TEXT
+    ) ON COMMIT DELETE ROWS;
+
+    CREATE TEMP TABLE IF NOT EXISTS stg_education_history (
+        ord BIGINT GENERATED ALWAYS AS IDENTITY,
+        interview_id TEXT, edu_sequence_id TEXT,
+        school_name TEXT, education_level_achieved TEXT, graduation_year TEXT
+    ) ON COMMIT DELETE ROWS;
+
+    CREATE TEMP TABLE IF NOT EXISTS stg_other_people (
+        ord BIGINT GENERATED ALWAYS AS IDENTITY,
+        interview_id TEXT, person_sequence_id TEXT,
+        full_name TEXT, relationship_to_interviewee TEXT, details TEXT
+    ) ON COMMIT DELETE ROWS;
+
+    CREATE TEMP TABLE IF NOT EXISTS stg_cultures (
+        ord BIGINT GENERATED ALWAYS AS IDENTITY,
+        interview_id TEXT, culture_name TEXT
+    ) ON COMMIT DELETE ROWS;
+
+    CREATE TEMP TABLE IF NOT EXISTS stg_languages (
+        ord BIGINT GENERATED ALWAYS AS IDENTITY,
+        interview_id TEXT, language_name TEXT, proficiency_or_context TEXT
+    ) ON COMMIT DELETE ROWS;
+
+    CREATE TEMP TABLE IF NOT EXISTS stg_historic_events (
+        ord BIGINT GENERATED ALWAYS AS IDENTITY,
+        interview_id TEXT, event_sequence_id TEXT,
+        historic_event_name TEXT, role_or_involvement_description TEXT
+    ) ON COMMIT DELETE ROWS;
+
+    CREATE TEMP TABLE IF NOT EXISTS stg_keywords (
+        ord BIGINT GENERATED ALWAYS AS IDENTITY,
+        interview_id TEXT, keyword TEXT
+    ) ON COMMIT DELETE ROWS;
+
+    -- Person each staged interview's interviewee resolved to
+    CREATE TEMP TABLE IF NOT EXISTS stg_interviewees (
+        ord BIGINT PRIMARY KEY, id_people INT NOT NULL -- stg_interviews_core.ord
+    ) ON COMMIT DELETE ROWS;
+
+    -- Person each other person mentioned in the batch resolved to
+    CREATE TEMP TABLE IF NOT EXISTS stg_relatives (
+        name_key TEXT PRIMARY KEY, id_people INT -- lower(trim(full_name))
+    ) ON COMMIT DELETE ROWS;
+
+    -- Interviews of the batch that were written to text_files
+    CREATE TEMP TABLE IF NOT EXISTS stg_loaded (
+        interview_id TEXT PRIMARY KEY, id_people INT NOT NULL, id_text INT NOT NULL
+    ) ON COMMIT DELETE ROWS;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Merges the staged batch into the archive tables. Returns (through
+-- p_loaded) the number of interviews written; interviews whose filename is
+-- already in text_files, or without an interviewee name, are skipped.
+CREATE OR REPLACE PROCEDURE merge_staged_interviews(INOUT p_loaded INT DEFAULT NULL)
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_city_names TEXT[];
+    v_city_country_ids INT[];
+    v_row RECORD;
+BEGIN
+    DELETE FROM stg_interviews_core s
+    WHERE COALESCE(trim(s.interviewee_name), '') = ''
+       OR EXISTS (SELECT 1 FROM text_files t WHERE t.filename = s.interview_id);
+
+    -- === Interviewees ===
+    IF to_regprocedure('resolve_person(text,date,integer,integer)') IS NOT NULL THEN
+        -- A namesake born elsewhere or in another year is someone else, so each
+        -- interviewee is resolved on its own, in file order (later rows of the
+        -- batch see the people created for earlier ones)
+        FOR v_row IN SELECT * FROM stg_interviews_core s ORDER BY s.ord LOOP
+            INSERT INTO stg_interviewees (ord, id_people)
+            VALUES (v_row.ord, find_or_create_person(
+                p_full_name := v_row.interviewee_name,
+                p_birthday := v_row.interviewee_birthday,
+                p_birthplace_city_name := v_row.interviewee_birthplace_city_name,
+                p_birthplace_country_name := v_row.interviewee_birthplace_country_name,
+                p_sex_name := v_row.interviewee_sex,
+                p_marital_status_name := v_row.interviewee_marital_status,
+                p_legal_status_name := v_row.interviewee_legal_status
+            ));
+        END LOOP;
+    ELSE
+        -- Without the resolver, the same name match as find_or_create_person
+        PERFORM ensure_lookup_names('countries', 'country', ARRAY(
+            SELECT s.interviewee_birthplace_country_name FROM stg_interviews_core s ORDER BY s.ord
+        ));
+        SELECT array_agg(s.interviewee_birthplace_city_name ORDER BY s.ord),
+               array_agg((SELECT min(c.id_country) FROM countries c
+                          WHERE lower(c.country) = lower(trim(s.interviewee_birthplace_country_name))) ORDER BY s.ord)
+        INTO v_city_names, v_city_country_ids
+        FROM stg_interviews_core s
+        WHERE NOT EXISTS (SELECT 1 FROM people p WHERE lower(p.name) = lower(trim(s.interviewee_name)));
+        PERFORM ensure_city_names(v_city_names, v_city_country_ids);
+
+        INSERT INTO people (name, birthday, birthplace_city, birthplace_country, sex, marital_status, legal_status)
+        SELECT d.name, try_parse_date(d.interviewee_birthday),
+               (SELECT min(ci.id_city) FROM cities ci
+                WHERE lower(ci.city) = lower(trim(d.interviewee_birthplace_city_name))
+                  AND COALESCE(ci.id_country, 0) = COALESCE(bc.id_country, 0)),
+               bc.id_country,
+               (SELECT min(sx.id_sex) FROM sexes sx WHERE lower(sx.sex) = lower(trim(d.interviewee_sex))),
+               (SELECT min(ms.id_marital) FROM marital_statuses ms WHERE lower(ms.status) = lower(trim(d.interviewee_marital_status))),
+               (SELECT min(ls.id_legal) FROM legal_statuses ls WHERE lower(ls.status) = lower(trim(d.interviewee_legal_status)))
+        FROM (
+            SELECT DISTINCT ON (lower(trim(s.interviewee_name))) trim(s.interviewee_name) AS name, s.*
+            FROM stg_interviews_core s
+            ORDER BY lower(trim(s.interviewee_name)), s.ord
+        ) d
+        CROSS JOIN LATERAL (
+            SELECT min(c.id_country) AS id_country FROM countries c
+            WHERE lower(c.country) = lower(trim(d.interviewee_birthplace_country_name))
+        ) bc
+        WHERE NOT EXISTS (SELECT 1 FROM people p WHERE lower(p.name) = lower(d.name))
+        ORDER BY d.ord
+        ON CONFLICT DO NOTHING;
+
+        INSERT INTO stg_interviewees (ord, id_people)
+        SELECT s.ord, p.id_people
+        FROM stg_interviews_core s
+        CROSS JOIN LATERAL (
+            SELECT min(pe.id_people) AS id_people FROM people pe
+            WHERE lower(pe.name) = lower(trim(s.interviewee_name))
+        ) p;
+    END IF;
+
+    -- === Text files ===
+    WITH inserted AS (
+        INSERT INTO text_files (id_people, filename, interview_location, interview_date, story_title, story_summary)
+        SELECT i.id_people, s.interview_id, s.interview_location, try_parse_date(s.interview_date),
+               COALESCE(s.story_title, ''), COALESCE(s.story_summary, '')
+        FROM stg_interviews_core s
+        JOIN stg_interviewees i USING (ord)
+        ORDER BY s.ord
+        RETURNING id_text, id_people, filename
+    )
+    INSERT INTO stg_loaded (interview_id, id_people, id_text)
+    SELECT filename, id_people, id_text FROM inserted;
+
+    -- === Immigration events ===
+    PERFORM ensure_lookup_names('countries', 'country', ARRAY(
+        SELECT x.name FROM stg_immigration_events e JOIN stg_loaded l USING (interview_id)
+        CROSS JOIN LATERAL (VALUES (1, e.origin_country_name), (2, e.destination_country_name)) AS x(pos, name)
+        ORDER BY e.ord, x.pos
+    ));
+    PERFORM ensure_lookup_names('travel_types', 'type', ARRAY(
+        SELECT e.travel_type_name FROM stg_immigration_events e JOIN stg_loaded l USING (interview_id) ORDER BY e.ord
+    ));
+    PERFORM ensure_lookup_names('ports', 'port', ARRAY(
+        SELECT x.name FROM stg_immigration_events e JOIN stg_loaded l USING (interview_id)
+        CROSS JOIN LATERAL (VALUES (1, e.entry_port_name), (2, e.arrival_port_name)) AS x(pos, name)
+        ORDER BY e.ord, x.pos
+    ));
+
+    SELECT array_agg(x.city_name ORDER BY e.ord, x.pos),
+           array_agg((SELECT min(c.id_country) FROM countries c
+                      WHERE lower(c.country) = lower(trim(x.country_name))) ORDER BY e.ord, x.pos)
+    INTO v_city_names, v_city_country_ids
+    FROM stg_immigration_events e JOIN stg_loaded l USING (interview_id)
+    CROSS JOIN LATERAL (VALUES (1, e.origin_city_name, e.origin_country_name),
+                               (2, e.destination_city_name, e.destination_country_name)) AS x(pos, city_name, country_name);
+    PERFORM ensure_city_names(v_city_names, v_city_country_ids);
+
+    INSERT INTO immigrations (
+        immigration_date, reason_immigration, id_people,
+        origin_city_id, origin_country_id, destination_city_id, destination_country_id,
+        travel_type_id, entry_port_id, arrival_port_id, return_plans
+    )
+    SELECT
+        try_parse_date(e.immigration_date), e.reason_immigration, l.id_people,
+        (SELECT min(ci.id_city) FROM cities ci
+         WHERE lower(ci.city) = lower(trim(e.origin_city_name)) AND COALESCE(ci.id_country, 0) = COALESCE(oc.id_country, 0)),
+        oc.id_country,
+        (SELECT min(ci.id_city) FROM cities ci
+         WHERE lower(ci.city) = lower(trim(e.destination_city_name)) AND COALESCE(ci.id_country, 0) = COALESCE(dc.id_country, 0)),
+        dc.id_country,
+        (SELECT min(tt.id_type) FROM travel_types tt WHERE lower(tt.type) = lower(trim(e.travel_type_name))),
+        (SELECT min(po.id_port) FROM ports po WHERE lower(po.port) = lower(trim(e.entry_port_name))),
+        (SELECT min(po.id_port) FROM ports po WHERE lower(po.port) = lower(trim(e.arrival_port_name))),
+        e.return_plans
+    FROM stg_immigration_events e
+    JOIN stg_loaded l USING (interview_id)
+    CROSS JOIN LATERAL (
+        SELECT min(c.id_country) AS id_country FROM countries c
+        WHERE lower(c.country) = lower(trim(e.origin_country_name))
+    ) oc
+    CROSS JOIN LATERAL (
+        SELECT min(c.id_country) AS id_country FROM countries c
+        WHERE lower(c.country) = lower(trim(e.destination_country_name))
+    ) dc
+    ORDER BY e.ord;
+
+    -- === Jobs ===
+    INSERT INTO jobs (id_people, occupation, employer, job_position, education_level)
+    SELECT l.id_people, j.occupation, j.employer, j.job_position,
+           (SELECT min(el.id_education) FROM education_levels el
+            WHERE lower(el.level) = lower(trim(j.education_level_for_job)))
+    FROM stg_jobs j
+    JOIN stg_loaded l USING (interview_id)
+    ORDER BY j.ord;
+
+    -- === Education history (rows without a known level or a school are skipped) ===
+    PERFORM ensure_lookup_names('schools', 'name', ARRAY(
+        SELECT ed.school_name FROM stg_education_history ed JOIN stg_loaded l USING (interview_id) ORDER BY ed.ord
+    ));
+
+    INSERT INTO person_education (id_people, id_school, id_education_level, graduation_year)
+    SELECT l.id_people, s.id_school, lv.id_education, ed.graduation_year
+    FROM stg_education_history ed
+    JOIN stg_loaded l USING (interview_id)
+    CROSS JOIN LATERAL (
+        SELECT min(sc.id_school) AS id_school FROM schools sc
+        WHERE lower(sc.name) = lower(trim(ed.school_name))
+    ) s
+    CROSS JOIN LATERAL (
+        SELECT min(el.id_education) AS id_education FROM education_levels el
+        WHERE lower(el.level) = lower(trim(ed.education_level_achieved))
+    ) lv
+    WHERE s.id_school IS NOT NULL AND lv.id_education IS NOT NULL
+    ORDER BY ed.ord;
+
+    -- === Other people mentioned and relationships ===
+    -- Each distinct name goes through find_or_create_person once, in file order
+    INSERT INTO stg_relatives (name_key, id_people)
+    SELECT d.name_key, find_or_create_person(d.name)
+    FROM (
+        SELECT DISTINCT ON (lower(trim(o.full_name))) lower(trim(o.full_name)) AS name_key, trim(o.full_name) AS name, o.ord
+        FROM stg_other_people o
+        JOIN stg_loaded l USING (interview_id)
+        WHERE trim(o.full_name) <> ''
+        ORDER BY lower(trim(o.full_name)), o.ord
+    ) d
+    ORDER BY d.ord;
+
+    PERFORM ensure_lookup_names('relationships', 'relationship_type', ARRAY(
+        SELECT o.relationship_to_interviewee
+        FROM stg_other_people o
+        JOIN stg_loaded l USING (interview_id)
+        JOIN stg_relatives rel ON rel.name_key = lower(trim(o.full_name))
+        WHERE rel.id_people <> l.id_people -- No relationship of an interviewee to itself
+        ORDER BY o.ord
+    ));
+
+    INSERT INTO people_relationships (id_people, id_relative, id_type)
+    SELECT l.id_people, rel.id_people, rt.id_relationship
+    FROM stg_other_people o
+    JOIN stg_loaded l USING (interview_id)
+    JOIN stg_relatives rel ON rel.name_key = lower(trim(o.full_name))
+    CROSS JOIN LATERAL (
+        SELECT min(r.id_relationship) AS id_relationship FROM relationships r
+        WHERE lower(r.relationship_type) = lower(trim(o.relationship_to_interviewee))
+    ) rt
+    WHERE rel.id_people IS NOT NULL
+      AND rel.id_people <> l.id_people
+      AND rt.id_relationship IS NOT NULL
+    ORDER BY o.ord
+    ON CONFLICT (id_people, id_relative) DO NOTHING;
+
+    -- === Cultures and languages ===
+    PERFORM ensure_lookup_names('cultures', 'name', ARRAY(
+        SELECT c.culture_name FROM stg_cultures c JOIN stg_loaded l USING (interview_id) ORDER BY c.ord
+    ));
+
+    INSERT INTO people_cultures (id_people, id_culture)
+    SELECT l.id_people, cu.id_culture
+    FROM stg_cultures c
+    JOIN stg_loaded l USING (interview_id)
+    CROSS JOIN LATERAL (
+        SELECT min(cl.id_culture) AS id_culture FROM cultures cl WHERE lower(cl.name) = lower(trim(c.culture_name))
+    ) cu
+    WHERE cu.id_culture IS NOT NULL
+    ON CONFLICT (id_people, id_culture) DO NOTHING;
+
+    PERFORM ensure_lookup_names('languages', 'name', ARRAY(
+        SELECT la.language_name FROM stg_languages la JOIN stg_loaded l USING (interview_id) ORDER BY la.ord
+    ));
+
+    -- Languages are linked to the first listed culture of each interview
+    INSERT INTO culture_languages (id_culture, id_language)
+    SELECT mc.id_culture, lg.id_language
+    FROM stg_languages la
+    JOIN (
+        SELECT DISTINCT ON (c.interview_id) c.interview_id, cl.id_culture
+        FROM stg_cultures c
+        JOIN stg_loaded l USING (interview_id)
+        JOIN cultures cl ON lower(cl.name) = lower(trim(c.culture_name))
+        ORDER BY c.interview_id, c.ord
+    ) mc USING (interview_id)
+    CROSS JOIN LATERAL (
+        SELECT min(lgs.id_language) AS id_language FROM languages lgs
+        WHERE lower(lgs.name) = lower(trim(la.language_name))
+    ) lg
+    WHERE lg.id_language IS NOT NULL
+    ON CONFLICT (id_culture, id_language) DO NOTHING;
+
+    -- === Historic events ===
+    PERFORM ensure_lookup_names('historic_events', 'historic_event', ARRAY(
+        SELECT h.historic_event_name FROM stg_historic_events h JOIN stg_loaded l USING (interview_id) ORDER BY h.ord
+    ));
+
+    INSERT INTO people_in_historic_events (id_people, id_event)
+    SELECT l.id_people, ev.id_event
+    FROM stg_historic_events h
+    JOIN stg_loaded l USING (interview_id)
+    CROSS JOIN LATERAL (
+        SELECT min(he.id_event) AS id_event FROM historic_events he
+        WHERE lower(he.historic_event) = lower(trim(h.historic_event_name))
+    ) ev
+    WHERE ev.id_event IS NOT NULL
+    ON CONFLICT (id_people, id_event) DO NOTHING;
+
+    -- === Keywords ===
+    INSERT INTO keywords (keyword, id_text)
+    SELECT trim(k.keyword), l.id_text
+    FROM stg_keywords k
+    JOIN stg_loaded l USING (interview_id)
+    WHERE trim(k.keyword) <> ''
+    ORDER BY k.ord;
+
+    SELECT count(*) INTO p_loaded FROM stg_loaded;
+END;
+$$;
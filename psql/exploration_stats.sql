@@ -0,0 +1,312 @@
+-- Summary tables behind the /dataExploration dashboard.
+-- Run after init_house_of_emmigrants.sql. Statement-level triggers on the
+-- archive tables apply each ingest's delta to these tables, so the page only
+-- reads a few small, indexed aggregates. rebuild_exploration_stats() recomputes
+-- everything from scratch (first install or repair).
+
+CREATE TABLE IF NOT EXISTS stats_immigration_monthly (
+  year       INT    NOT NULL,
+  month      INT    NOT NULL,
+  id_country INT    NOT NULL, -- destination country, 0 = unknown
+  n          BIGINT NOT NULL,
+  PRIMARY KEY (year, month, id_country)
+);
+
+CREATE TABLE IF NOT EXISTS stats_destination_countries (
+  id_country INT    PRIMARY KEY,
+  n          BIGINT NOT NULL
+);
+
+-- One row per (chart, label): sex, marital, legal, education, motive, transport
+-- plus ('archive', 'stories') holding the number of interviews.
+CREATE TABLE IF NOT EXISTS stats_dimension_counts (
+  dimension TEXT   NOT NULL,
+  label     TEXT   NOT NULL,
+  n         BIGINT NOT NULL,
+  PRIMARY KEY (dimension, label)
+);
+
+-- Motive and transport per year and destination country, behind the filtered
+-- /api/exploration series (year 0 = undated, id_country 0 = unknown)
+CREATE TABLE IF NOT EXISTS stats_immigration_dimensions (
+  dimension  TEXT   NOT NULL,
+  label      TEXT   NOT NULL,
+  year       INT    NOT NULL,
+  id_country INT    NOT NULL,
+  n          BIGINT NOT NULL,
+  PRIMARY KEY (dimension, label, year, id_country)
+);
+
+CREATE TABLE IF NOT EXISTS stats_keywords (
+  keyword TEXT   PRIMARY KEY, -- lower(trim(keyword))
+  n       BIGINT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_stats_dimension_counts_top ON stats_dimension_counts (dimension, n DESC);
+CREATE INDEX IF NOT EXISTS idx_stats_keywords_top ON stats_keywords (n DESC);
+CREATE INDEX IF NOT EXISTS idx_stats_destination_countries_top ON stats_destination_countries (n DESC);
+CREATE INDEX IF NOT EXISTS idx_stats_immigration_monthly_country ON stats_immigration_monthly (id_country, year);
+CREATE INDEX IF NOT EXISTS idx_stats_immigration_dimensions_year ON stats_immigration_dimensions (dimension, year);
+
+-- Featured stories look up the interviewee's immigrations
+CREATE INDEX IF NOT EXISTS idx_immigrations_people ON immigrations (id_people);
+
+
+-- === Delta helpers (p_sign = 1 for new rows, -1 for removed rows) ===
+CREATE OR REPLACE FUNCTION stats_apply_immigrations(p_rows immigrations[], p_sign INT)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO stats_immigration_monthly AS s (year, month, id_country, n)
+    SELECT extract(year FROM r.immigration_date)::INT,
+           extract(month FROM r.immigration_date)::INT,
+           COALESCE(r.destination_country_id, 0),
+           p_sign * count(*)
+    FROM unnest(p_rows) r
+    WHERE r.immigration_date IS NOT NULL
+    GROUP BY 1, 2, 3
+    ON CONFLICT (year, month, id_country) DO UPDATE SET n = s.n + EXCLUDED.n;
+
+    INSERT INTO stats_destination_countries AS s (id_country, n)
+    SELECT r.destination_country_id, p_sign * count(*)
+    FROM unnest(p_rows) r
+    WHERE r.destination_country_id IS NOT NULL
+    GROUP BY 1
+    ON CONFLICT (id_country) DO UPDATE SET n = s.n + EXCLUDED.n;
+
+    INSERT INTO stats_dimension_counts AS s (dimension, label, n)
+    SELECT 'motive', lower(trim(r.reason_immigration)), p_sign * count(*)
+    FROM unnest(p_rows) r
+    WHERE trim(r.reason_immigration) <> ''
+    GROUP BY 2
+    UNION ALL
+    SELECT 'transport', lower(trim(tt.type)), p_sign * count(*)
+    FROM unnest(p_rows) r
+    JOIN travel_types tt ON tt.id_type = r.travel_type_id
+    GROUP BY 2
+    ON CONFLICT (dimension, label) DO UPDATE SET n = s.n + EXCLUDED.n;
+
+    INSERT INTO stats_immigration_dimensions AS s (dimension, label, year, id_country, n)
+    SELECT 'motive', lower(trim(r.reason_immigration)),
+           COALESCE(extract(year FROM r.immigration_date)::INT, 0), COALESCE(r.destination_country_id, 0),
+           p_sign * count(*)
+    FROM unnest(p_rows) r
+    WHERE trim(r.reason_immigration) <> ''
+    GROUP BY 2, 3, 4
+    UNION ALL
+    SELECT 'transport', lower(trim(tt.type)),
+           COALESCE(extract(year FROM r.immigration_date)::INT, 0), COALESCE(r.destination_country_id, 0),
+           p_sign * count(*)
+    FROM unnest(p_rows) r
+    JOIN travel_types tt ON tt.id_type = r.travel_type_id
+    GROUP BY 2, 3, 4
+    ON CONFLICT (dimension, label, year, id_country) DO UPDATE SET n = s.n + EXCLUDED.n;
+
+    IF p_sign < 0 THEN
+        DELETE FROM stats_immigration_monthly WHERE n <= 0;
+        DELETE FROM stats_destination_countries WHERE n <= 0;
+        DELETE FROM stats_dimension_counts WHERE n <= 0;
+        DELETE FROM stats_immigration_dimensions WHERE n <= 0;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Demographics are counted per interview, like the original per-story charts
+CREATE OR REPLACE FUNCTION stats_apply_text_files(p_rows text_files[], p_sign INT)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO stats_dimension_counts AS s (dimension, label, n)
+    SELECT 'archive', 'stories', p_sign * count(*)
+    FROM unnest(p_rows) t
+    HAVING count(*) > 0
+    UNION ALL
+    SELECT 'sex', lower(sx.sex), p_sign * count(*)
+    FROM unnest(p_rows) t
+    JOIN people p ON p.id_people = t.id_people
+    JOIN sexes sx ON sx.id_sex = p.sex
+    GROUP BY 2
+    UNION ALL
+    SELECT 'marital', lower(ms.status), p_sign * count(*)
+    FROM unnest(p_rows) t
+    JOIN people p ON p.id_people = t.id_people
+    JOIN marital_statuses ms ON ms.id_marital = p.marital_status
+    GROUP BY 2
+    UNION ALL
+    SELECT 'legal', lower(ls.status), p_sign * count(*)
+    FROM unnest(p_rows) t
+    JOIN people p ON p.id_people = t.id_people
+    JOIN legal_statuses ls ON ls.id_legal = p.legal_status
+    GROUP BY 2
+    ON CONFLICT (dimension, label) DO UPDATE SET n = s.n + EXCLUDED.n;
+
+    IF p_sign < 0 THEN
+        DELETE FROM stats_dimension_counts WHERE n <= 0;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Edited or merged people (the labels of their interviews change; new people
+-- have no interviews yet and people with interviews can't be deleted)
+CREATE OR REPLACE FUNCTION stats_apply_people(p_rows people[], p_sign INT)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO stats_dimension_counts AS s (dimension, label, n)
+    SELECT 'sex', lower(sx.sex), p_sign * count(*)
+    FROM unnest(p_rows) p
+    JOIN text_files t ON t.id_people = p.id_people
+    JOIN sexes sx ON sx.id_sex = p.sex
+    GROUP BY 2
+    UNION ALL
+    SELECT 'marital', lower(ms.status), p_sign * count(*)
+    FROM unnest(p_rows) p
+    JOIN text_files t ON t.id_people = p.id_people
+    JOIN marital_statuses ms ON ms.id_marital = p.marital_status
+    GROUP BY 2
+    UNION ALL
+    SELECT 'legal', lower(ls.status), p_sign * count(*)
+    FROM unnest(p_rows) p
+    JOIN text_files t ON t.id_people = p.id_people
+    JOIN legal_statuses ls ON ls.id_legal = p.legal_status
+    GROUP BY 2
+    ON CONFLICT (dimension, label) DO UPDATE SET n = s.n + EXCLUDED.n;
+
+    IF p_sign < 0 THEN
+        DELETE FROM stats_dimension_counts WHERE n <= 0;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION stats_apply_person_education(p_rows person_education[], p_sign INT)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO stats_dimension_counts AS s (dimension, label, n)
+    SELECT 'education', lower(el.level), p_sign * count(*)
+    FROM unnest(p_rows) pe
+    JOIN education_levels el ON el.id_education = pe.id_education_level
+    GROUP BY 2
+    ON CONFLICT (dimension, label) DO UPDATE SET n = s.n + EXCLUDED.n;
+
+    IF p_sign < 0 THEN
+        DELETE FROM stats_dimension_counts WHERE n <= 0;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION stats_apply_keywords(p_rows keywords[], p_sign INT)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO stats_keywords AS s (keyword, n)
+    SELECT lower(trim(k.keyword)), p_sign * count(*)
+    FROM unnest(p_rows) k
+    WHERE trim(k.keyword) <> ''
+    GROUP BY 1
+    ON CONFLICT (keyword) DO UPDATE SET n = s.n + EXCLUDED.n;
+
+    IF p_sign < 0 THEN
+        DELETE FROM stats_keywords WHERE n <= 0;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- === Triggers (one per table, shared by INSERT/UPDATE/DELETE) ===
+CREATE OR REPLACE FUNCTION stats_immigrations_changed() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM stats_apply_immigrations(ARRAY(SELECT o::immigrations FROM old_rows o), -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM stats_apply_immigrations(ARRAY(SELECT n::immigrations FROM new_rows n), 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION stats_text_files_changed() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM stats_apply_text_files(ARRAY(SELECT o::text_files FROM old_rows o), -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM stats_apply_text_files(ARRAY(SELECT n::text_files FROM new_rows n), 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only updates: the old and new rows of a person have the same interviews
+CREATE OR REPLACE FUNCTION stats_people_changed() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM stats_apply_people(ARRAY(SELECT o::people FROM old_rows o), -1);
+    PERFORM stats_apply_people(ARRAY(SELECT n::people FROM new_rows n), 1);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION stats_person_education_changed() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM stats_apply_person_education(ARRAY(SELECT o::person_education FROM old_rows o), -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM stats_apply_person_education(ARRAY(SELECT n::person_education FROM new_rows n), 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION stats_keywords_changed() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM stats_apply_keywords(ARRAY(SELECT o::keywords FROM old_rows o), -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM stats_apply_keywords(ARRAY(SELECT n::keywords FROM new_rows n), 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    v_table TEXT;
+BEGIN
+    FOREACH v_table IN ARRAY ARRAY['immigrations', 'text_files', 'person_education', 'keywords'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_stats_%1$s_ins ON %1$I', v_table);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_stats_%1$s_upd ON %1$I', v_table);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_stats_%1$s_del ON %1$I', v_table);
+        EXECUTE format(
+            'CREATE TRIGGER trg_stats_%1$s_ins AFTER INSERT ON %1$I '
+            'REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_%1$s_changed()',
+            v_table);
+        EXECUTE format(
+            'CREATE TRIGGER trg_stats_%1$s_upd AFTER UPDATE ON %1$I '
+            'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_%1$s_changed()',
+            v_table);
+        EXECUTE format(
+            'CREATE TRIGGER trg_stats_%1$s_del AFTER DELETE ON %1$I '
+            'REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_%1$s_changed()',
+            v_table);
+    END LOOP;
+
+    DROP TRIGGER IF EXISTS trg_stats_people_upd ON people;
+    CREATE TRIGGER trg_stats_people_upd AFTER UPDATE ON people
+      REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION stats_people_changed();
+END;
+$$;
+
+
+-- Full recompute (initial backfill, or after editing lookup tables by hand)
+CREATE OR REPLACE PROCEDURE rebuild_exploration_stats()
+LANGUAGE plpgsql AS $$
+BEGIN
+    TRUNCATE stats_immigration_monthly, stats_destination_countries,
+             stats_dimension_counts, stats_immigration_dimensions, stats_keywords;
+
+    PERFORM stats_apply_immigrations(ARRAY(SELECT i FROM immigrations i), 1);
+    PERFORM stats_apply_text_files(ARRAY(SELECT t FROM text_files t), 1);
+    PERFORM stats_apply_person_education(ARRAY(SELECT pe FROM person_education pe), 1);
+    PERFORM stats_apply_keywords(ARRAY(SELECT k FROM keywords k), 1);
+END;
+$$;
+
+CALL rebuild_exploration_stats();
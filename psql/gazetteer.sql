@@ -0,0 +1,358 @@
+-- Offline gazetteer: coordinates for the places of the archive.
+-- Run after person_resolution.sql (it reuses person_name_key()) and
+-- exploration_stats.sql. `flask import-gazetteer` loads a GeoNames dump
+-- (cities15000 + countryInfo, downloaded once or copied by hand) into
+-- gazetteer_import and calls apply_gazetteer_import(). Countries, cities and
+-- ports are linked to gazetteer places by triggers when ingest creates them,
+-- through place_resolutions, a cache of every name already looked up. Map
+-- and route statistics then join indexed coordinates; nothing is geocoded
+-- while serving pages.
+
+CREATE TABLE IF NOT EXISTS gazetteer_places (
+  id_place     INT              PRIMARY KEY, -- GeoNames geonameid
+  kind         TEXT             NOT NULL CHECK (kind IN ('city', 'country')),
+  name         TEXT             NOT NULL,
+  country_code TEXT,                         -- ISO 3166-1 alpha-2
+  latitude     DOUBLE PRECISION,
+  longitude    DOUBLE PRECISION,
+  population   BIGINT           NOT NULL DEFAULT 0
+);
+
+-- Every known spelling of a place (name, ASCII name, alternate names, ISO3
+-- code of countries), as person_name_key() keys
+CREATE TABLE IF NOT EXISTS gazetteer_names (
+  name_key TEXT NOT NULL,
+  id_place INT  NOT NULL REFERENCES gazetteer_places (id_place) ON DELETE CASCADE,
+  PRIMARY KEY (name_key, id_place)
+);
+
+CREATE INDEX IF NOT EXISTS idx_gazetteer_names_place ON gazetteer_names (id_place);
+CREATE INDEX IF NOT EXISTS idx_gazetteer_places_country ON gazetteer_places (kind, country_code);
+
+-- Country names used in interviews that GeoNames doesn't list
+CREATE TABLE IF NOT EXISTS gazetteer_aliases (
+  alias        TEXT PRIMARY KEY,
+  country_code TEXT NOT NULL
+);
+INSERT INTO gazetteer_aliases (alias, country_code)
+VALUES ('America', 'US'), ('United States of America', 'US'), ('Estados Unidos', 'US'),
+       ('England', 'GB'), ('Scotland', 'GB'), ('Wales', 'GB'), ('Great Britain', 'GB'), ('Britain', 'GB'),
+       ('Holland', 'NL'), ('Sverige', 'SE'), ('Norge', 'NO'), ('Danmark', 'DK'), ('Suomi', 'FI'),
+       ('Deutschland', 'DE'), ('Prussia', 'DE'), ('Russian Empire', 'RU'), ('Soviet Union', 'RU'),
+       ('Brasil', 'BR'), ('Espana', 'ES')
+ON CONFLICT DO NOTHING;
+
+-- Rows of one import, filled with COPY by `flask import-gazetteer`
+CREATE UNLOGGED TABLE IF NOT EXISTS gazetteer_import (
+  id_place        INT              NOT NULL,
+  kind            TEXT             NOT NULL,
+  name            TEXT             NOT NULL,
+  ascii_name      TEXT,
+  alternate_names TEXT,            -- comma separated
+  country_code    TEXT,
+  latitude        DOUBLE PRECISION,
+  longitude       DOUBLE PRECISION,
+  population      BIGINT           NOT NULL DEFAULT 0,
+  is_capital      BOOLEAN          NOT NULL DEFAULT FALSE
+);
+
+-- Names already looked up, found or not. Imports clear every entry except
+-- the manual ones, which pin a name to a place (or to none).
+CREATE TABLE IF NOT EXISTS place_resolutions (
+  kind         TEXT    NOT NULL CHECK (kind IN ('city', 'country', 'port')),
+  name_key     TEXT    NOT NULL,            -- person_name_key() of the archive name
+  country_code TEXT    NOT NULL DEFAULT '', -- country the city was searched in, '' = any
+  id_place     INT     REFERENCES gazetteer_places (id_place) ON DELETE SET NULL, -- NULL = not found
+  manual       BOOLEAN NOT NULL DEFAULT FALSE,
+  resolved_at  TIMESTAMP NOT NULL DEFAULT now(),
+  PRIMARY KEY (kind, name_key, country_code)
+);
+
+ALTER TABLE countries ADD COLUMN IF NOT EXISTS id_place INT REFERENCES gazetteer_places (id_place) ON DELETE SET NULL;
+ALTER TABLE cities ADD COLUMN IF NOT EXISTS id_place INT REFERENCES gazetteer_places (id_place) ON DELETE SET NULL;
+ALTER TABLE ports ADD COLUMN IF NOT EXISTS id_place INT REFERENCES gazetteer_places (id_place) ON DELETE SET NULL;
+
+
+-- Gazetteer place of an archive name: cached answer first, otherwise the most
+-- populated place with that spelling (cities and ports only within
+-- p_country_code when given). Misses are cached too, except while the
+-- gazetteer is empty.
+CREATE OR REPLACE FUNCTION resolve_place(p_kind TEXT, p_name TEXT, p_country_code TEXT DEFAULT NULL)
+RETURNS INT AS $$
+DECLARE
+    v_key TEXT := person_name_key(p_name);
+    v_country_code TEXT := COALESCE(p_country_code, '');
+    v_id_place INT;
+BEGIN
+    IF v_key IS NULL OR v_key = '' THEN
+        RETURN NULL;
+    END IF;
+
+    SELECT r.id_place INTO v_id_place
+    FROM place_resolutions r
+    WHERE r.kind = p_kind AND r.name_key = v_key AND r.country_code = v_country_code;
+    IF FOUND THEN
+        RETURN v_id_place;
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM gazetteer_places) THEN
+        RETURN NULL;
+    END IF;
+
+    SELECT p.id_place INTO v_id_place
+    FROM gazetteer_names n
+    JOIN gazetteer_places p ON p.id_place = n.id_place
+    WHERE n.name_key = v_key
+      AND p.kind = CASE WHEN p_kind = 'country' THEN 'country' ELSE 'city' END
+      AND (v_country_code = '' OR p.country_code = v_country_code)
+    ORDER BY p.population DESC, p.id_place
+    LIMIT 1;
+
+    INSERT INTO place_resolutions (kind, name_key, country_code, id_place)
+    VALUES (p_kind, v_key, v_country_code, v_id_place)
+    ON CONFLICT DO NOTHING;
+    RETURN v_id_place;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ISO code of an archive country, used to search its cities
+CREATE OR REPLACE FUNCTION archive_country_code(p_id_country INT)
+RETURNS TEXT AS $$
+    SELECT p.country_code
+    FROM countries c
+    JOIN gazetteer_places p ON p.id_place = c.id_place
+    WHERE c.id_country = p_id_country
+$$ LANGUAGE sql STABLE;
+
+
+-- === Ingest: new or renamed places are resolved as they are written ===
+CREATE OR REPLACE FUNCTION countries_resolve_place() RETURNS TRIGGER AS $$
+BEGIN
+    NEW.id_place := resolve_place('country', NEW.country);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION cities_resolve_place() RETURNS TRIGGER AS $$
+BEGIN
+    NEW.id_place := resolve_place('city', NEW.city, archive_country_code(NEW.id_country));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION ports_resolve_place() RETURNS TRIGGER AS $$
+BEGIN
+    NEW.id_place := resolve_place('port', NEW.port);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_countries_resolve_place ON countries;
+DROP TRIGGER IF EXISTS trg_cities_resolve_place ON cities;
+DROP TRIGGER IF EXISTS trg_ports_resolve_place ON ports;
+CREATE TRIGGER trg_countries_resolve_place BEFORE INSERT OR UPDATE OF country ON countries
+  FOR EACH ROW EXECUTE FUNCTION countries_resolve_place();
+CREATE TRIGGER trg_cities_resolve_place BEFORE INSERT OR UPDATE OF city, id_country ON cities
+  FOR EACH ROW EXECUTE FUNCTION cities_resolve_place();
+CREATE TRIGGER trg_ports_resolve_place BEFORE INSERT OR UPDATE OF port ON ports
+  FOR EACH ROW EXECUTE FUNCTION ports_resolve_place();
+
+-- Links every country, city and port again (after an import or after
+-- editing place_resolutions by hand). Countries go first since cities are
+-- searched within their country.
+CREATE OR REPLACE PROCEDURE resolve_archive_places()
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE countries c SET id_place = r.id_place
+    FROM (SELECT id_country, resolve_place('country', country) AS id_place FROM countries) r
+    WHERE r.id_country = c.id_country AND c.id_place IS DISTINCT FROM r.id_place;
+
+    UPDATE cities c SET id_place = r.id_place
+    FROM (SELECT id_city, resolve_place('city', city, archive_country_code(id_country)) AS id_place FROM cities) r
+    WHERE r.id_city = c.id_city AND c.id_place IS DISTINCT FROM r.id_place;
+
+    UPDATE ports p SET id_place = r.id_place
+    FROM (SELECT id_port, resolve_place('port', port) AS id_place FROM ports) r
+    WHERE r.id_port = p.id_port AND p.id_place IS DISTINCT FROM r.id_place;
+END;
+$$;
+
+-- Moves gazetteer_import into the gazetteer (existing places are updated,
+-- places missing from the import are kept), then resolves the archive again
+CREATE OR REPLACE PROCEDURE apply_gazetteer_import()
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- Countries have no coordinates of their own: use their capital, or their largest city
+    INSERT INTO gazetteer_places AS g (id_place, kind, name, country_code, latitude, longitude, population)
+    SELECT i.id_place, i.kind, i.name, i.country_code,
+           COALESCE(i.latitude, c.latitude), COALESCE(i.longitude, c.longitude), i.population
+    FROM gazetteer_import i
+    LEFT JOIN (
+        SELECT DISTINCT ON (country_code) country_code, latitude, longitude
+        FROM gazetteer_import
+        WHERE kind = 'city'
+        ORDER BY country_code, is_capital DESC, population DESC
+    ) c ON i.kind = 'country' AND c.country_code = i.country_code
+    ON CONFLICT (id_place) DO UPDATE SET
+        kind = EXCLUDED.kind, name = EXCLUDED.name, country_code = EXCLUDED.country_code,
+        latitude = EXCLUDED.latitude, longitude = EXCLUDED.longitude, population = EXCLUDED.population;
+
+    DELETE FROM gazetteer_names n USING gazetteer_import i WHERE n.id_place = i.id_place;
+    INSERT INTO gazetteer_names (name_key, id_place)
+    SELECT k.name_key, k.id_place
+    FROM (
+        SELECT person_name_key(x.name) AS name_key, i.id_place
+        FROM gazetteer_import i
+        CROSS JOIN LATERAL unnest(ARRAY[i.name, i.ascii_name] || string_to_array(i.alternate_names, ',')) AS x(name)
+        UNION
+        SELECT person_name_key(a.alias), p.id_place
+        FROM gazetteer_aliases a
+        JOIN gazetteer_places p ON p.kind = 'country' AND p.country_code = a.country_code
+    ) k
+    WHERE k.name_key <> ''
+    ON CONFLICT DO NOTHING;
+
+    TRUNCATE gazetteer_import;
+    DELETE FROM place_resolutions WHERE NOT manual;
+    CALL resolve_archive_places();
+
+    -- Places the archive already pointed at may have moved too: cached pages
+    -- and /api/exploration responses must not keep the old coordinates
+    -- (psql/page_cache.sql, if installed)
+    IF to_regprocedure('bump_data_version()') IS NOT NULL THEN
+        PERFORM bump_data_version();
+    END IF;
+END;
+$$;
+
+
+-- === Routes (origin -> destination of every immigration) ===
+-- Ids of the archive's cities and countries, 0 = unknown; coordinates are
+-- joined when reading, so a new import applies to existing counts
+CREATE TABLE IF NOT EXISTS stats_immigration_flows (
+  origin_country      INT    NOT NULL,
+  origin_city         INT    NOT NULL,
+  destination_country INT    NOT NULL,
+  destination_city    INT    NOT NULL,
+  n                   BIGINT NOT NULL,
+  PRIMARY KEY (origin_country, origin_city, destination_country, destination_city)
+);
+
+CREATE INDEX IF NOT EXISTS idx_stats_immigration_flows_top ON stats_immigration_flows (n DESC);
+CREATE INDEX IF NOT EXISTS idx_stats_immigration_flows_destination ON stats_immigration_flows (destination_country, n DESC);
+
+CREATE OR REPLACE FUNCTION stats_apply_immigration_flows(p_rows immigrations[], p_sign INT)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO stats_immigration_flows AS s (origin_country, origin_city, destination_country, destination_city, n)
+    SELECT COALESCE(r.origin_country_id, 0), COALESCE(r.origin_city_id, 0),
+           COALESCE(r.destination_country_id, 0), COALESCE(r.destination_city_id, 0),
+           p_sign * count(*)
+    FROM unnest(p_rows) r
+    WHERE COALESCE(r.origin_country_id, r.origin_city_id) IS NOT NULL
+      AND COALESCE(r.destination_country_id, r.destination_city_id) IS NOT NULL
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (origin_country, origin_city, destination_country, destination_city)
+    DO UPDATE SET n = s.n + EXCLUDED.n;
+
+    IF p_sign < 0 THEN
+        DELETE FROM stats_immigration_flows WHERE n <= 0;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION immigration_flows_changed() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM stats_apply_immigration_flows(ARRAY(SELECT o::immigrations FROM old_rows o), -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM stats_apply_immigration_flows(ARRAY(SELECT n::immigrations FROM new_rows n), 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_immigration_flows_ins ON immigrations;
+DROP TRIGGER IF EXISTS trg_immigration_flows_upd ON immigrations;
+DROP TRIGGER IF EXISTS trg_immigration_flows_del ON immigrations;
+CREATE TRIGGER trg_immigration_flows_ins AFTER INSERT ON immigrations
+  REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION immigration_flows_changed();
+CREATE TRIGGER trg_immigration_flows_upd AFTER UPDATE ON immigrations
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION immigration_flows_changed();
+CREATE TRIGGER trg_immigration_flows_del AFTER DELETE ON immigrations
+  REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION immigration_flows_changed();
+
+-- Great-circle distance (haversine)
+CREATE OR REPLACE FUNCTION place_distance_km(
+    p_latitude DOUBLE PRECISION, p_longitude DOUBLE PRECISION,
+    p_other_latitude DOUBLE PRECISION, p_other_longitude DOUBLE PRECISION
+) RETURNS DOUBLE PRECISION AS $$
+    SELECT 2 * 6371.0088 * asin(sqrt(
+        power(sin(radians(p_other_latitude - p_latitude) / 2), 2)
+        + cos(radians(p_latitude)) * cos(radians(p_other_latitude))
+          * power(sin(radians(p_other_longitude - p_longitude) / 2), 2)))
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Name and coordinates of one end of a route: the city's when it is known
+-- (and located), otherwise the country's
+CREATE OR REPLACE FUNCTION flow_endpoint(
+    p_id_city INT, p_id_country INT,
+    OUT name TEXT, OUT latitude DOUBLE PRECISION, OUT longitude DOUBLE PRECISION
+) AS $$
+    SELECT COALESCE(ci.city, co.country), COALESCE(cp.latitude, kp.latitude),
+           CASE WHEN cp.latitude IS NOT NULL THEN cp.longitude ELSE kp.longitude END
+    FROM (SELECT 1) one
+    LEFT JOIN cities ci ON ci.id_city = p_id_city
+    LEFT JOIN gazetteer_places cp ON cp.id_place = ci.id_place
+    LEFT JOIN countries co ON co.id_country = p_id_country
+    LEFT JOIN gazetteer_places kp ON kp.id_place = co.id_place
+$$ LANGUAGE sql STABLE;
+
+-- The p_limit busiest routes, optionally to one destination country
+-- Example: SELECT * FROM top_immigration_flows(10, p_destination_country => 2);
+CREATE OR REPLACE FUNCTION top_immigration_flows(p_limit INT, p_destination_country INT DEFAULT NULL)
+RETURNS TABLE (
+    origin TEXT, origin_latitude DOUBLE PRECISION, origin_longitude DOUBLE PRECISION,
+    destination TEXT, destination_latitude DOUBLE PRECISION, destination_longitude DOUBLE PRECISION,
+    distance_km DOUBLE PRECISION, n BIGINT
+) AS $$
+    SELECT o.name, o.latitude, o.longitude, d.name, d.latitude, d.longitude,
+           place_distance_km(o.latitude, o.longitude, d.latitude, d.longitude), f.n
+    FROM (
+        SELECT * FROM stats_immigration_flows s
+        WHERE p_destination_country IS NULL OR s.destination_country = p_destination_country
+        ORDER BY s.n DESC, s.origin_country, s.origin_city, s.destination_country, s.destination_city
+        LIMIT p_limit
+    ) f
+    CROSS JOIN LATERAL flow_endpoint(f.origin_city, f.origin_country) o
+    CROSS JOIN LATERAL flow_endpoint(f.destination_city, f.destination_country) d
+    ORDER BY f.n DESC
+$$ LANGUAGE sql STABLE;
+
+-- Average distance travelled per immigration, over the routes whose both
+-- ends are located, and the share of immigrations that could be located
+CREATE OR REPLACE FUNCTION immigration_flow_distance(
+    p_destination_country INT DEFAULT NULL,
+    OUT mean_km DOUBLE PRECISION, OUT located_share DOUBLE PRECISION
+) AS $$
+    SELECT sum(f.n * x.km) FILTER (WHERE x.km IS NOT NULL) / NULLIF(sum(f.n) FILTER (WHERE x.km IS NOT NULL), 0),
+           sum(f.n) FILTER (WHERE x.km IS NOT NULL)::DOUBLE PRECISION / NULLIF(sum(f.n), 0)
+    FROM stats_immigration_flows f
+    CROSS JOIN LATERAL flow_endpoint(f.origin_city, f.origin_country) o
+    CROSS JOIN LATERAL flow_endpoint(f.destination_city, f.destination_country) d
+    CROSS JOIN LATERAL (SELECT place_distance_km(o.latitude, o.longitude, d.latitude, d.longitude) AS km) x
+    WHERE p_destination_country IS NULL OR f.destination_country = p_destination_country
+$$ LANGUAGE sql STABLE;
+
+
+-- Full recompute of the routes (initial backfill or repair)
+CREATE OR REPLACE PROCEDURE rebuild_immigration_flows()
+LANGUAGE plpgsql AS $$
+BEGIN
+    TRUNCATE stats_immigration_flows;
+    PERFORM stats_apply_immigration_flows(ARRAY(SELECT i FROM immigrations i), 1);
+END;
+$$;
+
+CALL rebuild_immigration_flows();
@@ -39,7 +39,11 @@ BEGIN
     IF p_country_name IS NULL OR p_country_name = '' THEN RETURN NULL; END IF;
     SELECT id_country INTO v_id FROM countries WHERE lower(country) = lower(trim(p_country_name));
     IF v_id IS NULL AND p_create_if_not_exists THEN
-        INSERT INTO countries (country) VALUES (trim(p_country_name)) RETURNING id_country INTO v_id;
+        INSERT INTO countries (country) VALUES (trim(p_country_name))
+        ON CONFLICT DO NOTHING RETURNING id_country INTO v_id;
+        IF v_id IS NULL THEN -- Created meanwhile by a concurrent ingest
+            SELECT id_country INTO v_id FROM countries WHERE lower(country) = lower(trim(p_country_name));
+        END IF;
     END IF;
     RETURN v_id;
 END;
@@ -51,10 +55,15 @@ RETURNS INT AS $$
 DECLARE v_id INT;
 BEGIN
     IF p_city_name IS NULL OR p_city_name = '' THEN RETURN NULL; END IF;
-    SELECT id_city INTO v_id FROM cities 
-    WHERE lower(city) = lower(trim(p_city_name)) AND (cities.id_country = p_country_id OR (cities.id_country IS NULL AND p_country_id IS NULL));
+    SELECT id_city INTO v_id FROM cities
+    WHERE lower(city) = lower(trim(p_city_name)) AND COALESCE(id_country, 0) = COALESCE(p_country_id, 0);
     IF v_id IS NULL AND p_create_if_not_exists THEN
-        INSERT INTO cities (city, id_country) VALUES (trim(p_city_name), p_country_id) RETURNING id_city INTO v_id;
+        INSERT INTO cities (city, id_country) VALUES (trim(p_city_name), p_country_id)
+        ON CONFLICT DO NOTHING RETURNING id_city INTO v_id;
+        IF v_id IS NULL THEN -- Created meanwhile by a concurrent ingest
+            SELECT id_city INTO v_id FROM cities
+            WHERE lower(city) = lower(trim(p_city_name)) AND COALESCE(id_country, 0) = COALESCE(p_country_id, 0);
+        END IF;
     END IF;
     RETURN v_id;
 END;
@@ -68,7 +77,11 @@ BEGIN
     IF p_type_name IS NULL OR p_type_name = '' THEN RETURN NULL; END IF;
     SELECT id_type INTO v_id FROM travel_types WHERE lower(type) = lower(trim(p_type_name));
     IF v_id IS NULL AND p_create_if_not_exists THEN
-        INSERT INTO travel_types (type) VALUES (trim(p_type_name)) RETURNING id_type INTO v_id;
+        INSERT INTO travel_types (type) VALUES (trim(p_type_name))
+        ON CONFLICT DO NOTHING RETURNING id_type INTO v_id;
+        IF v_id IS NULL THEN -- Created meanwhile by a concurrent ingest
+            SELECT id_type INTO v_id FROM travel_types WHERE lower(type) = lower(trim(p_type_name));
+        END IF;
     END IF;
     RETURN v_id;
 END;
@@ -93,7 +106,11 @@ BEGIN
     IF p_rel_name IS NULL OR p_rel_name = '' THEN RETURN NULL; END IF;
     SELECT id_relationship INTO v_id FROM relationships WHERE lower(relationship_type) = lower(trim(p_rel_name));
     IF v_id IS NULL AND p_create_if_not_exists THEN
-        INSERT INTO relationships (relationship_type) VALUES (trim(p_rel_name)) RETURNING id_relationship INTO v_id;
+        INSERT INTO relationships (relationship_type) VALUES (trim(p_rel_name))
+        ON CONFLICT DO NOTHING RETURNING id_relationship INTO v_id;
+        IF v_id IS NULL THEN -- Created meanwhile by a concurrent ingest
+            SELECT id_relationship INTO v_id FROM relationships WHERE lower(relationship_type) = lower(trim(p_rel_name));
+        END IF;
     END IF;
     RETURN v_id;
 END;
@@ -107,7 +124,11 @@ BEGIN
     IF p_culture_name IS NULL OR p_culture_name = '' THEN RETURN NULL; END IF;
     SELECT id_culture INTO v_id FROM cultures WHERE lower(name) = lower(trim(p_culture_name));
     IF v_id IS NULL AND p_create_if_not_exists THEN
-        INSERT INTO cultures (name) VALUES (trim(p_culture_name)) RETURNING id_culture INTO v_id;
+        INSERT INTO cultures (name) VALUES (trim(p_culture_name))
+        ON CONFLICT DO NOTHING RETURNING id_culture INTO v_id;
+        IF v_id IS NULL THEN -- Created meanwhile by a concurrent ingest
+            SELECT id_culture INTO v_id FROM cultures WHERE lower(name) = lower(trim(p_culture_name));
+        END IF;
     END IF;
     RETURN v_id;
 END;
@@ -121,7 +142,11 @@ BEGIN
     IF p_lang_name IS NULL OR p_lang_name = '' THEN RETURN NULL; END IF;
     SELECT id_language INTO v_id FROM languages WHERE lower(name) = lower(trim(p_lang_name));
     IF v_id IS NULL AND p_create_if_not_exists THEN
-        INSERT INTO languages (name) VALUES (trim(p_lang_name)) RETURNING id_language INTO v_id;
+        INSERT INTO languages (name) VALUES (trim(p_lang_name))
+        ON CONFLICT DO NOTHING RETURNING id_language INTO v_id;
+        IF v_id IS NULL THEN -- Created meanwhile by a concurrent ingest
+            SELECT id_language INTO v_id FROM languages WHERE lower(name) = lower(trim(p_lang_name));
+        END IF;
     END IF;
     RETURN v_id;
 END;
@@ -135,7 +160,11 @@ BEGIN
     IF p_event_name IS NULL OR p_event_name = '' THEN RETURN NULL; END IF;
     SELECT id_event INTO v_id FROM historic_events WHERE lower(historic_event) = lower(trim(p_event_name));
     IF v_id IS NULL AND p_create_if_not_exists THEN
-        INSERT INTO historic_events (historic_event) VALUES (trim(p_event_name)) RETURNING id_event INTO v_id;
+        INSERT INTO historic_events (historic_event) VALUES (trim(p_event_name))
+        ON CONFLICT DO NOTHING RETURNING id_event INTO v_id;
+        IF v_id IS NULL THEN -- Created meanwhile by a concurrent ingest
+            SELECT id_event INTO v_id FROM historic_events WHERE lower(historic_event) = lower(trim(p_event_name));
+        END IF;
     END IF;
     RETURN v_id;
 END;
@@ -149,7 +178,11 @@ BEGIN
     IF p_school_name IS NULL OR p_school_name = '' THEN RETURN NULL; END IF;
     SELECT id_school INTO v_id FROM schools WHERE lower(name) = lower(trim(p_school_name));
     IF v_id IS NULL AND p_create_if_not_exists THEN
-        INSERT INTO schools (name) VALUES (trim(p_school_name)) RETURNING id_school INTO v_id;
+        INSERT INTO schools (name) VALUES (trim(p_school_name))
+        ON CONFLICT DO NOTHING RETURNING id_school INTO v_id;
+        IF v_id IS NULL THEN -- Created meanwhile by a concurrent ingest
+            SELECT id_school INTO v_id FROM schools WHERE lower(name) = lower(trim(p_school_name));
+        END IF;
     END IF;
     RETURN v_id;
 END;
@@ -181,29 +214,101 @@ BEGIN
         RETURN NULL;
     END IF;
 
-    -- Attempt to find an existing person by full name (simplistic match)
-    SELECT id_people INTO v_person_id FROM people WHERE lower(name) = lower(v_name_trimmed) LIMIT 1;
-
-    IF v_person_id IS NULL THEN
-        -- Parse birthday
-        BEGIN v_parsed_birthday := p_birthday::DATE; EXCEPTION WHEN OTHERS THEN v_parsed_birthday := NULL; END;
-        
-        -- Get FK IDs
-        v_birth_country_id := get_country_id_by_name(p_birthplace_country_name, TRUE);
-        IF v_birth_country_id IS NOT NULL THEN
-            v_birth_city_id := get_city_id_by_name(p_birthplace_city_name, v_birth_country_id, TRUE);
-        ELSE
-            v_birth_city_id := get_city_id_by_name(p_birthplace_city_name, NULL, TRUE); -- City without country if country unknown
+    IF to_regprocedure('resolve_person(text,date,integer,integer)') IS NULL THEN
+        -- Attempt to find an existing person by full name (simplistic match)
+        SELECT id_people INTO v_person_id FROM people WHERE lower(name) = lower(v_name_trimmed) LIMIT 1;
+        IF v_person_id IS NOT NULL THEN
+            RETURN v_person_id;
         END IF;
-        
-        v_sex_id := get_sex_id_by_name(p_sex_name);
-        v_marital_id := get_marital_status_id_by_name(p_marital_status_name);
-        v_legal_id := get_legal_status_id_by_name(p_legal_status_name);
-
-        INSERT INTO people (name, birthday, birthplace_city, birthplace_country, sex, marital_status, legal_status)
-        VALUES (v_name_trimmed, v_parsed_birthday, v_birth_city_id, v_birth_country_id, v_sex_id, v_marital_id, v_legal_id)
-        RETURNING id_people INTO v_person_id;
     END IF;
+
+    -- Parse birthday
+    BEGIN v_parsed_birthday := p_birthday::DATE; EXCEPTION WHEN OTHERS THEN v_parsed_birthday := NULL; END;
+
+    -- Get FK IDs
+    v_birth_country_id := get_country_id_by_name(p_birthplace_country_name, TRUE);
+    IF v_birth_country_id IS NOT NULL THEN
+        v_birth_city_id := get_city_id_by_name(p_birthplace_city_name, v_birth_country_id, TRUE);
+    ELSE
+        v_birth_city_id := get_city_id_by_name(p_birthplace_city_name, NULL, TRUE); -- City without country if country unknown
+    END IF;
+
+    -- Same person, maybe spelled differently (psql/person_resolution.sql, if
+    -- installed); a namesake born elsewhere or in another year is someone else
+    IF to_regprocedure('resolve_person(text,date,integer,integer)') IS NOT NULL THEN
+        v_person_id := resolve_person(v_name_trimmed, v_parsed_birthday, v_birth_city_id, v_birth_country_id);
+        IF v_person_id IS NOT NULL THEN
+            RETURN v_person_id;
+        END IF;
+    END IF;
+
+    v_sex_id := get_sex_id_by_name(p_sex_name);
+    v_marital_id := get_marital_status_id_by_name(p_marital_status_name);
+    v_legal_id := get_legal_status_id_by_name(p_legal_status_name);
+
+    INSERT INTO people (name, birthday, birthplace_city, birthplace_country, sex, marital_status, legal_status)
+    VALUES (v_name_trimmed, v_parsed_birthday, v_birth_city_id, v_birth_country_id, v_sex_id, v_marital_id, v_legal_id)
+    RETURNING id_people INTO v_person_id;
     RETURN v_person_id;
 END;
 $$ LANGUAGE plpgsql;
+
+
+-- === Set-based helpers used by ingest_interview_from_ai_json_v2 ===
+
+-- Parses a YYYY-MM-DD string, returning NULL instead of failing on bad input.
+-- STABLE, not IMMUTABLE: the text -> date cast depends on DateStyle, so it
+-- must not be used in an index or a generated column
+CREATE OR REPLACE FUNCTION try_parse_date(p_value TEXT)
+RETURNS DATE AS $$
+BEGIN
+    RETURN p_value::DATE;
+EXCEPTION WHEN OTHERS THEN
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Inserts every name of p_names missing from a single-column lookup table
+-- (matched on lower(column), as the get_*_id_by_name helpers do) in one statement.
+-- The first spelling of each name wins and new ids follow the order of p_names.
+-- Example: PERFORM ensure_lookup_names('countries', 'country', ARRAY['Sweden', 'sweden ', 'Norway']);
+CREATE OR REPLACE FUNCTION ensure_lookup_names(p_table TEXT, p_column TEXT, p_names TEXT[])
+RETURNS VOID AS $$
+BEGIN
+    IF p_names IS NULL OR cardinality(p_names) = 0 THEN RETURN; END IF;
+    EXECUTE format(
+        'INSERT INTO %1$I (%2$I)
+         SELECT d.name FROM (
+             SELECT DISTINCT ON (lower(trim(x))) trim(x) AS name, ord
+             FROM unnest($1) WITH ORDINALITY AS u(x, ord)
+             WHERE trim(x) <> ''''
+             ORDER BY lower(trim(x)), ord
+         ) d
+         WHERE NOT EXISTS (SELECT 1 FROM %1$I t WHERE lower(t.%2$I) = lower(d.name))
+         ORDER BY d.ord
+         ON CONFLICT DO NOTHING',
+        p_table, p_column)
+    USING p_names;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Same for cities, which are unique per country (p_country_ids is parallel to p_city_names)
+CREATE OR REPLACE FUNCTION ensure_city_names(p_city_names TEXT[], p_country_ids INT[])
+RETURNS VOID AS $$
+BEGIN
+    IF p_city_names IS NULL OR cardinality(p_city_names) = 0 THEN RETURN; END IF;
+    INSERT INTO cities (city, id_country)
+    SELECT d.city, d.id_country FROM (
+        SELECT DISTINCT ON (lower(trim(c)), i) trim(c) AS city, i AS id_country, ord
+        FROM unnest(p_city_names, p_country_ids) WITH ORDINALITY AS u(c, i, ord)
+        WHERE trim(c) <> ''
+        ORDER BY lower(trim(c)), i, ord
+    ) d
+    WHERE NOT EXISTS (
+        SELECT 1 FROM cities t
+        WHERE lower(t.city) = lower(d.city) AND COALESCE(t.id_country, 0) = COALESCE(d.id_country, 0)
+    )
+    ORDER BY d.ord
+    ON CONFLICT DO NOTHING;
+END;
+$$ LANGUAGE plpgsql;
@@ -1,3 +1,35 @@
+-- Removes what ingest_interview_from_ai_json_v2 wrote for an interview before
+-- it is ingested again: its keywords and, unless the interviewee has other
+-- interviews, the interviewee's immigrations, jobs, education, cultures,
+-- historic events and relationships. The text_files row and the people rows
+-- are kept (notes, graphics and media links point at them).
+CREATE OR REPLACE FUNCTION clear_interview_extraction(p_id_text INT)
+RETURNS VOID AS $$
+DECLARE
+    v_id_people INT;
+BEGIN
+    -- Keywords go first, while the old immigrations still place the interview
+    -- in its keyword_text_buckets
+    DELETE FROM keywords WHERE id_text = p_id_text;
+
+    SELECT t.id_people INTO v_id_people
+    FROM text_files t
+    WHERE t.id_text = p_id_text
+      AND NOT EXISTS (SELECT 1 FROM text_files o WHERE o.id_people = t.id_people AND o.id_text <> t.id_text);
+    IF v_id_people IS NULL THEN
+        RETURN;
+    END IF;
+
+    DELETE FROM immigrations WHERE id_people = v_id_people;
+    DELETE FROM jobs WHERE id_people = v_id_people;
+    DELETE FROM person_education WHERE id_people = v_id_people;
+    DELETE FROM people_cultures WHERE id_people = v_id_people;
+    DELETE FROM people_in_historic_events WHERE id_people = v_id_people;
+    DELETE FROM people_relationships WHERE id_people = v_id_people;
+END;
+$$ LANGUAGE plpgsql;
+
+
 CREATE OR REPLACE PROCEDURE ingest_interview_from_ai_json_v2(
     -- I. Interview Meta-Information
     p_text_filename TEXT,
@@ -47,54 +79,20 @@ CREATE OR REPLACE PROCEDURE ingest_interview_from_ai_json_v2(
     p_general_keywords TEXT[]
 )
 LANGUAGE plpgsql AS $$
+-- Set-based: each JSONB array is written with one INSERT ... SELECT per table.
+-- Missing lookup names are created in bulk (ensure_lookup_names /
+-- ensure_city_names) and ids are resolved with lower(name) subqueries, so an
+-- interview costs a fixed handful of statements however many events or jobs
+-- it lists. People are the exception: they go through find_or_create_person,
+-- once per distinct name.
 DECLARE
     v_interviewee_id INT;
     v_text_file_id INT;
-    v_parsed_interview_date DATE;
-
-    -- Loop variables for arrays
-    imm_event RECORD;
-    v_imm_origin_country_id INT;
-    v_imm_origin_city_id INT;
-    v_imm_dest_country_id INT;
-    v_imm_dest_city_id INT;
-    v_imm_travel_type_id INT;
-    v_imm_entry_port_id INT;
-    v_imm_arrival_port_id INT;
-    v_parsed_imm_date DATE;
-
-    job_record RECORD;
-    v_job_edu_level_id INT;
-
-    edu_record RECORD;
-    v_edu_school_id INT;
-    v_edu_level_id INT;
-    
-    other_person_record RECORD;
-    v_other_person_id INT;
-    v_relationship_id INT;
-
-    culture_name_item TEXT;
-    v_culture_id INT;
-
-    language_record RECORD;
-    v_language_id INT;
-    v_person_main_culture_id INT; -- To link language if no specific culture context
-
-    historic_event_record RECORD;
-    v_historic_event_id INT;
-
-    keyword_item TEXT;
-    
-    -- Placeholder for more complex loops
-    health_record RECORD;
-    treatment_record RECORD;
-    community_record RECORD;
-    social_activity_item TEXT;
-    cultural_event_record RECORD;
-    cultural_practice_record RECORD;
-
-
+    v_person_main_culture_id INT; -- To link languages to one of the person's cultures
+    v_city_names TEXT[];
+    v_city_country_ids INT[];
+    v_relative_keys TEXT[]; -- lower(trim(full_name)) of the other people mentioned
+    v_relative_ids INT[];   -- and the person each one resolved to
 BEGIN
     -- === II. Create/Find Primary Interviewee ===
     v_interviewee_id := find_or_create_person(
@@ -113,171 +111,239 @@ BEGIN
     END IF;
 
     -- === I. Insert Text File Meta-Information ===
-    BEGIN v_parsed_interview_date := p_interview_date::DATE; EXCEPTION WHEN OTHERS THEN v_parsed_interview_date := NULL; END;
-    
-    INSERT INTO text_files (id_people, filename, interview_location, interview_date, story_title, story_summary)
-    VALUES (v_interviewee_id, p_text_filename, p_interview_location, v_parsed_interview_date, p_story_title, p_story_summary)
-    RETURNING id_text INTO v_text_file_id;
+    -- A filename already in the archive is a re-extraction (modified file,
+    -- --force, a retried job): its row is reused and what the earlier
+    -- extraction wrote is cleared first, so ingesting twice never duplicates
+    SELECT min(id_text) INTO v_text_file_id FROM text_files WHERE filename = p_text_filename;
+
+    IF v_text_file_id IS NULL THEN
+        INSERT INTO text_files (id_people, filename, interview_location, interview_date, story_title, story_summary)
+        VALUES (v_interviewee_id, p_text_filename, p_interview_location, try_parse_date(p_interview_date), p_story_title, p_story_summary)
+        RETURNING id_text INTO v_text_file_id;
+    ELSE
+        PERFORM clear_interview_extraction(v_text_file_id);
+        UPDATE text_files
+        SET id_people = v_interviewee_id,
+            interview_location = p_interview_location,
+            interview_date = try_parse_date(p_interview_date),
+            story_title = p_story_title,
+            story_summary = p_story_summary
+        WHERE id_text = v_text_file_id;
+    END IF;
 
     -- === III. Insert Immigration Event(s) for Interviewee ===
     IF p_immigration_events IS NOT NULL AND jsonb_array_length(p_immigration_events) > 0 THEN
-        FOR imm_event IN SELECT * FROM jsonb_to_recordset(p_immigration_events) AS x(
+        PERFORM ensure_lookup_names('countries', 'country', ARRAY(
+            SELECT e.origin_country_name FROM jsonb_to_recordset(p_immigration_events) AS e(origin_country_name TEXT)
+            UNION ALL
+            SELECT e.destination_country_name FROM jsonb_to_recordset(p_immigration_events) AS e(destination_country_name TEXT)
+        ));
+        PERFORM ensure_lookup_names('travel_types', 'type', ARRAY(
+            SELECT e.travel_type_name FROM jsonb_to_recordset(p_immigration_events) AS e(travel_type_name TEXT)
+        ));
+        PERFORM ensure_lookup_names('ports', 'port', ARRAY(
+            SELECT e.entry_port_name FROM jsonb_to_recordset(p_immigration_events) AS e(entry_port_name TEXT)
+            UNION ALL
+            SELECT e.arrival_port_name FROM jsonb_to_recordset(p_immigration_events) AS e(arrival_port_name TEXT)
+        ));
+
+        -- Cities are unique per country, so they are created once countries exist
+        SELECT array_agg(r.city_name),
+               array_agg((SELECT min(c.id_country) FROM countries c WHERE lower(c.country) = lower(trim(r.country_name))))
+        INTO v_city_names, v_city_country_ids
+        FROM (
+            SELECT e.origin_city_name AS city_name, e.origin_country_name AS country_name
+            FROM jsonb_to_recordset(p_immigration_events) AS e(origin_city_name TEXT, origin_country_name TEXT)
+            UNION ALL
+            SELECT e.destination_city_name, e.destination_country_name
+            FROM jsonb_to_recordset(p_immigration_events) AS e(destination_city_name TEXT, destination_country_name TEXT)
+        ) r;
+        PERFORM ensure_city_names(v_city_names, v_city_country_ids);
+
+        INSERT INTO immigrations (
+            immigration_date, reason_immigration, id_people,
+            origin_city_id, origin_country_id, destination_city_id, destination_country_id,
+            travel_type_id, entry_port_id, arrival_port_id, return_plans
+        )
+        SELECT
+            try_parse_date(e.immigration_date), e.reason_immigration, v_interviewee_id,
+            (SELECT min(ci.id_city) FROM cities ci
+             WHERE lower(ci.city) = lower(trim(e.origin_city_name)) AND COALESCE(ci.id_country, 0) = COALESCE(oc.id_country, 0)),
+            oc.id_country,
+            (SELECT min(ci.id_city) FROM cities ci
+             WHERE lower(ci.city) = lower(trim(e.destination_city_name)) AND COALESCE(ci.id_country, 0) = COALESCE(dc.id_country, 0)),
+            dc.id_country,
+            (SELECT min(tt.id_type) FROM travel_types tt WHERE lower(tt.type) = lower(trim(e.travel_type_name))),
+            (SELECT min(po.id_port) FROM ports po WHERE lower(po.port) = lower(trim(e.entry_port_name))),
+            (SELECT min(po.id_port) FROM ports po WHERE lower(po.port) = lower(trim(e.arrival_port_name))),
+            e.return_plans
+        FROM jsonb_to_recordset(p_immigration_events) AS e(
             immigration_date TEXT, reason_immigration TEXT,
             origin_city_name TEXT, origin_country_name TEXT,
             destination_city_name TEXT, destination_country_name TEXT,
             travel_type_name TEXT, entry_port_name TEXT, arrival_port_name TEXT,
             return_plans TEXT
-        ) LOOP
-            BEGIN v_parsed_imm_date := imm_event.immigration_date::DATE; EXCEPTION WHEN OTHERS THEN v_parsed_imm_date := NULL; END;
-            
-            v_imm_origin_country_id := get_country_id_by_name(imm_event.origin_country_name, TRUE);
-            v_imm_origin_city_id := get_city_id_by_name(imm_event.origin_city_name, v_imm_origin_country_id, TRUE);
-
-            v_imm_dest_country_id := get_country_id_by_name(imm_event.destination_country_name, TRUE);
-            v_imm_dest_city_id := get_city_id_by_name(imm_event.destination_city_name, v_imm_dest_country_id, TRUE);
-            
-            v_imm_travel_type_id := get_travel_type_id_by_name(imm_event.travel_type_name, TRUE);
-            -- TODO: Add get_port_id_by_name for entry_port_name and arrival_port_name
-            -- v_imm_entry_port_id := get_port_id_by_name(imm_event.entry_port_name, TRUE);
-            -- v_imm_arrival_port_id := get_port_id_by_name(imm_event.arrival_port_name, TRUE);
-
-            INSERT INTO immigrations (
-                immigration_date, reason_immigration, id_people,
-                origin_city_id, origin_country_id, destination_city_id, destination_country_id,
-                travel_type_id, entry_port_id, arrival_port_id, return_plans
-            ) VALUES (
-                v_parsed_imm_date, imm_event.reason_immigration, v_interviewee_id,
-                v_imm_origin_city_id, v_imm_origin_country_id, v_imm_dest_city_id, v_imm_dest_country_id,
-                v_imm_travel_type_id, v_imm_entry_port_id, v_imm_arrival_port_id, imm_event.return_plans
-            );
-        END LOOP;
+        )
+        CROSS JOIN LATERAL (
+            SELECT min(c.id_country) AS id_country FROM countries c
+            WHERE lower(c.country) = lower(trim(e.origin_country_name))
+        ) oc
+        CROSS JOIN LATERAL (
+            SELECT min(c.id_country) AS id_country FROM countries c
+            WHERE lower(c.country) = lower(trim(e.destination_country_name))
+        ) dc;
     END IF;
 
     -- === IV. Insert Job(s) for Interviewee ===
     IF p_jobs IS NOT NULL AND jsonb_array_length(p_jobs) > 0 THEN
-        FOR job_record IN SELECT * FROM jsonb_to_recordset(p_jobs) AS x(
+        INSERT INTO jobs (id_people, occupation, employer, job_position, education_level)
+        SELECT v_interviewee_id, j.occupation, j.employer, j.job_position,
+               (SELECT min(el.id_education) FROM education_levels el
+                WHERE lower(el.level) = lower(trim(j.education_level_for_job)))
+        FROM jsonb_to_recordset(p_jobs) AS j(
             occupation TEXT, employer TEXT, job_position TEXT, education_level_for_job TEXT
-        ) LOOP
-            v_job_edu_level_id := get_education_level_id_by_name(job_record.education_level_for_job);
-            INSERT INTO jobs (id_people, occupation, employer, job_position, education_level)
-            VALUES (v_interviewee_id, job_record.occupation, job_record.employer, job_record.job_position, v_job_edu_level_id);
-        END LOOP;
+        );
     END IF;
 
     -- === V. Insert Education History for Interviewee ===
+    -- Rows without a known education level or a school name are skipped
     IF p_education_history IS NOT NULL AND jsonb_array_length(p_education_history) > 0 THEN
-        FOR edu_record IN SELECT * FROM jsonb_to_recordset(p_education_history) AS x(
+        PERFORM ensure_lookup_names('schools', 'name', ARRAY(
+            SELECT ed.school_name FROM jsonb_to_recordset(p_education_history) AS ed(school_name TEXT)
+        ));
+
+        INSERT INTO person_education (id_people, id_school, id_education_level, graduation_year)
+        SELECT v_interviewee_id, s.id_school, l.id_education, ed.graduation_year
+        FROM jsonb_to_recordset(p_education_history) AS ed(
             school_name TEXT, education_level_achieved TEXT, graduation_year TEXT
-        ) LOOP
-            v_edu_school_id := get_school_id_by_name(edu_record.school_name, TRUE);
-            v_edu_level_id := get_education_level_id_by_name(edu_record.education_level_achieved);
-            -- Only insert if we have a valid education level ID. School can be optional if schema allows.
-            IF v_edu_level_id IS NOT NULL THEN 
-                 -- If school_id is required by DB, ensure v_edu_school_id is also NOT NULL
-                IF v_edu_school_id IS NOT NULL THEN
-                    INSERT INTO person_education (id_people, id_school, id_education_level, graduation_year)
-                    VALUES (v_interviewee_id, v_edu_school_id, v_edu_level_id, edu_record.graduation_year);
-                ELSE
-                    RAISE NOTICE 'Skipping education record for interviewee % due to missing school: %', v_interviewee_id, edu_record.school_name;
-                END IF;
-            END IF;
-        END LOOP;
+        )
+        CROSS JOIN LATERAL (
+            SELECT min(sc.id_school) AS id_school FROM schools sc
+            WHERE lower(sc.name) = lower(trim(ed.school_name))
+        ) s
+        CROSS JOIN LATERAL (
+            SELECT min(el.id_education) AS id_education FROM education_levels el
+            WHERE lower(el.level) = lower(trim(ed.education_level_achieved))
+        ) l
+        WHERE s.id_school IS NOT NULL AND l.id_education IS NOT NULL;
     END IF;
-    
+
     -- === VII. Insert Other People Mentioned and Relationships ===
     IF p_other_people_mentioned IS NOT NULL AND jsonb_array_length(p_other_people_mentioned) > 0 THEN
-        FOR other_person_record IN SELECT * FROM jsonb_to_recordset(p_other_people_mentioned) AS x(full_name TEXT, relationship_to_interviewee TEXT, details TEXT) LOOP
-            IF other_person_record.full_name IS NOT NULL AND other_person_record.full_name <> '' THEN
-                v_other_person_id := find_or_create_person(other_person_record.full_name); 
-                
-                IF v_other_person_id IS NOT NULL AND v_interviewee_id <> v_other_person_id THEN
-                    v_relationship_id := get_relationship_id_by_name(other_person_record.relationship_to_interviewee, TRUE);
-                    IF v_relationship_id IS NOT NULL THEN
-                        INSERT INTO people_relationships (id_people, id_relative, id_type)
-                        VALUES (v_interviewee_id, v_other_person_id, v_relationship_id)
-                        ON CONFLICT (id_people, id_relative) DO NOTHING;
-                    END IF;
-                END IF;
-            END IF;
-        END LOOP;
+        -- People are not a lookup table: each distinct name goes through
+        -- find_or_create_person (resolve_person when installed), in listed order
+        SELECT array_agg(r.name_key ORDER BY r.ord), array_agg(r.id_people ORDER BY r.ord)
+        INTO v_relative_keys, v_relative_ids
+        FROM (
+            SELECT d.name_key, d.ord, find_or_create_person(d.name) AS id_people
+            FROM (
+                SELECT DISTINCT ON (lower(trim(o.item->>'full_name')))
+                       lower(trim(o.item->>'full_name')) AS name_key, trim(o.item->>'full_name') AS name, o.ord
+                FROM jsonb_array_elements(p_other_people_mentioned) WITH ORDINALITY AS o(item, ord)
+                WHERE trim(o.item->>'full_name') <> ''
+                ORDER BY lower(trim(o.item->>'full_name')), o.ord
+            ) d
+            ORDER BY d.ord
+        ) r;
+
+        PERFORM ensure_lookup_names('relationships', 'relationship_type', ARRAY(
+            SELECT o.relationship_to_interviewee
+            FROM jsonb_to_recordset(p_other_people_mentioned) AS o(full_name TEXT, relationship_to_interviewee TEXT)
+            JOIN unnest(v_relative_keys, v_relative_ids) AS rel(name_key, id_people)
+              ON rel.name_key = lower(trim(o.full_name))
+            WHERE rel.id_people <> v_interviewee_id -- No relationship of the interviewee to itself
+        ));
+
+        INSERT INTO people_relationships (id_people, id_relative, id_type)
+        SELECT v_interviewee_id, rel.id_people, rt.id_relationship
+        FROM jsonb_to_recordset(p_other_people_mentioned) AS o(
+            full_name TEXT, relationship_to_interviewee TEXT, details TEXT
+        )
+        JOIN unnest(v_relative_keys, v_relative_ids) AS rel(name_key, id_people)
+          ON rel.name_key = lower(trim(o.full_name))
+        CROSS JOIN LATERAL (
+            SELECT min(r.id_relationship) AS id_relationship FROM relationships r
+            WHERE lower(r.relationship_type) = lower(trim(o.relationship_to_interviewee))
+        ) rt
+        WHERE rel.id_people IS NOT NULL
+          AND rel.id_people <> v_interviewee_id
+          AND rt.id_relationship IS NOT NULL
+        ON CONFLICT (id_people, id_relative) DO NOTHING;
     END IF;
 
     -- === IX. Cultural Aspects ===
-    IF p_cultural_associated_cultures IS NOT NULL THEN
-        FOREACH culture_name_item IN ARRAY p_cultural_associated_cultures LOOP
-            v_culture_id := get_culture_id_by_name(culture_name_item, TRUE);
-            IF v_culture_id IS NOT NULL THEN
-                INSERT INTO people_cultures (id_people, id_culture)
-                VALUES (v_interviewee_id, v_culture_id)
-                ON CONFLICT (id_people, id_culture) DO NOTHING;
-                IF v_person_main_culture_id IS NULL THEN v_person_main_culture_id := v_culture_id; END IF; -- Capture one for language linking
-            END IF;
-        END LOOP;
+    IF p_cultural_associated_cultures IS NOT NULL AND cardinality(p_cultural_associated_cultures) > 0 THEN
+        PERFORM ensure_lookup_names('cultures', 'name', p_cultural_associated_cultures);
+
+        INSERT INTO people_cultures (id_people, id_culture)
+        SELECT v_interviewee_id, cu.id_culture
+        FROM unnest(p_cultural_associated_cultures) AS a(name)
+        CROSS JOIN LATERAL (
+            SELECT min(c.id_culture) AS id_culture FROM cultures c WHERE lower(c.name) = lower(trim(a.name))
+        ) cu
+        WHERE cu.id_culture IS NOT NULL
+        ON CONFLICT (id_people, id_culture) DO NOTHING;
+
+        -- The first listed culture is the one languages get linked to
+        SELECT cu.id_culture INTO v_person_main_culture_id
+        FROM unnest(p_cultural_associated_cultures) WITH ORDINALITY AS a(name, ord)
+        CROSS JOIN LATERAL (
+            SELECT min(c.id_culture) AS id_culture FROM cultures c WHERE lower(c.name) = lower(trim(a.name))
+        ) cu
+        WHERE cu.id_culture IS NOT NULL
+        ORDER BY a.ord
+        LIMIT 1;
     END IF;
 
     IF p_cultural_languages_spoken IS NOT NULL AND jsonb_array_length(p_cultural_languages_spoken) > 0 THEN
-        FOR language_record IN SELECT * FROM jsonb_to_recordset(p_cultural_languages_spoken) AS x(language_name TEXT, proficiency_or_context TEXT) LOOP
-            v_language_id := get_language_id_by_name(language_record.language_name, TRUE);
-            IF v_language_id IS NOT NULL AND v_person_main_culture_id IS NOT NULL THEN
-                 INSERT INTO culture_languages (id_culture, id_language)
-                 VALUES (v_person_main_culture_id, v_language_id) -- Links language to one of the person's cultures
-                 ON CONFLICT (id_culture, id_language) DO NOTHING;
-            END IF;
-        END LOOP;
-    END IF;
-    
-    -- Cultural Events Mentioned
-    IF p_cultural_events_mentioned IS NOT NULL AND jsonb_array_length(p_cultural_events_mentioned) > 0 THEN
-        FOR cultural_event_record IN SELECT * FROM jsonb_to_recordset(p_cultural_events_mentioned) AS x(event_name TEXT, event_details TEXT) LOOP
-            -- TODO: Create get_cultural_event_id_by_name helper
-            -- v_cultural_event_id := get_cultural_event_id_by_name(cultural_event_record.event_name, TRUE);
-            -- IF v_cultural_event_id IS NOT NULL AND v_person_main_culture_id IS NOT NULL THEN
-            --     INSERT INTO culture_events_map (id_culture, id_event)
-            --     VALUES (v_person_main_culture_id, v_cultural_event_id)
-            --     ON CONFLICT (id_culture, id_event) DO NOTHING;
-            -- END IF;
-        END LOOP;
-    END IF;
-
-    -- Cultural Practices Mentioned
-    IF p_cultural_practices_mentioned IS NOT NULL AND jsonb_array_length(p_cultural_practices_mentioned) > 0 THEN
-        FOR cultural_practice_record IN SELECT * FROM jsonb_to_recordset(p_cultural_practices_mentioned) AS x(practice_name TEXT, practice_description TEXT) LOOP
-            -- TODO: Create get_cultural_practice_id_by_name helper
-            -- v_cultural_practice_id := get_cultural_practice_id_by_name(cultural_practice_record.practice_name, TRUE);
-            -- IF v_cultural_practice_id IS NOT NULL AND v_person_main_culture_id IS NOT NULL THEN
-            --     INSERT INTO culture_practices_map (id_culture, id_practice)
-            --     VALUES (v_person_main_culture_id, v_cultural_practice_id)
-            --     ON CONFLICT (id_culture, id_practice) DO NOTHING;
-            -- END IF;
-        END LOOP;
+        PERFORM ensure_lookup_names('languages', 'name', ARRAY(
+            SELECT l.language_name FROM jsonb_to_recordset(p_cultural_languages_spoken) AS l(language_name TEXT)
+        ));
+
+        IF v_person_main_culture_id IS NOT NULL THEN
+            INSERT INTO culture_languages (id_culture, id_language)
+            SELECT v_person_main_culture_id, la.id_language
+            FROM jsonb_to_recordset(p_cultural_languages_spoken) AS l(language_name TEXT, proficiency_or_context TEXT)
+            CROSS JOIN LATERAL (
+                SELECT min(lg.id_language) AS id_language FROM languages lg
+                WHERE lower(lg.name) = lower(trim(l.language_name))
+            ) la
+            WHERE la.id_language IS NOT NULL
+            ON CONFLICT (id_culture, id_language) DO NOTHING;
+        END IF;
     END IF;
 
+    -- TODO: Cultural events/practices (p_cultural_events_mentioned, p_cultural_practices_mentioned)
+    -- still need lookup helpers before they can be mapped to culture_events_map / culture_practices_map.
 
     -- === X. Historic Event Involvement ===
     IF p_historic_events_involved IS NOT NULL AND jsonb_array_length(p_historic_events_involved) > 0 THEN
-        FOR historic_event_record IN SELECT * FROM jsonb_to_recordset(p_historic_events_involved) AS x(historic_event_name TEXT, role_or_involvement_description TEXT) LOOP
-            v_historic_event_id := get_historic_event_id_by_name(historic_event_record.historic_event_name, TRUE);
-            IF v_historic_event_id IS NOT NULL THEN
-                INSERT INTO people_in_historic_events (id_people, id_event)
-                VALUES (v_interviewee_id, v_historic_event_id)
-                ON CONFLICT (id_people, id_event) DO NOTHING;
-            END IF;
-        END LOOP;
+        PERFORM ensure_lookup_names('historic_events', 'historic_event', ARRAY(
+            SELECT h.historic_event_name FROM jsonb_to_recordset(p_historic_events_involved) AS h(historic_event_name TEXT)
+        ));
+
+        INSERT INTO people_in_historic_events (id_people, id_event)
+        SELECT v_interviewee_id, ev.id_event
+        FROM jsonb_to_recordset(p_historic_events_involved) AS h(historic_event_name TEXT, role_or_involvement_description TEXT)
+        CROSS JOIN LATERAL (
+            SELECT min(he.id_event) AS id_event FROM historic_events he
+            WHERE lower(he.historic_event) = lower(trim(h.historic_event_name))
+        ) ev
+        WHERE ev.id_event IS NOT NULL
+        ON CONFLICT (id_people, id_event) DO NOTHING;
     END IF;
 
     -- === XI. General Keywords ===
     IF v_text_file_id IS NOT NULL AND p_general_keywords IS NOT NULL THEN
-        FOREACH keyword_item IN ARRAY p_general_keywords LOOP
-            IF keyword_item IS NOT NULL AND keyword_item <> '' THEN
-                -- Consider unique constraint on (keyword, id_text) in keywords table
-                INSERT INTO keywords (keyword, id_text)
-                VALUES (trim(keyword_item), v_text_file_id)
-                ON CONFLICT DO NOTHING; -- Requires a unique constraint on (keyword, id_text) to work
-            END IF;
-        END LOOP;
+        -- Consider unique constraint on (keyword, id_text) in keywords table
+        INSERT INTO keywords (keyword, id_text)
+        SELECT trim(k), v_text_file_id
+        FROM unnest(p_general_keywords) AS k
+        WHERE trim(k) <> ''
+        ON CONFLICT DO NOTHING; -- Requires a unique constraint on (keyword, id_text) to work
     END IF;
 
-    -- Sections requiring more detailed JSON from AI and dedicated loops (not fully implemented here):
+    -- Sections requiring more detailed JSON from AI (not implemented here):
     -- VI. Health Issues (p_health_issues JSONB)
     -- VIII. Community Involvements (p_community_involvements JSONB)
 
@@ -0,0 +1,208 @@
+-- Keyword term frequencies behind the dashboard word cloud.
+-- Run after exploration_stats.sql. Keywords are normalized (lower(trim()),
+-- like stats_keywords) into a dictionary that stems every term once, with the
+-- Snowball stemmer of the language the keywords are extracted in (English),
+-- so "farm", "farms" and "farming" are one word in the cloud; main.py
+-- translates the labels, not the stems. Counts per stem are kept for the
+-- whole archive, per destination country, per immigration decade and per
+-- country and decade by statement triggers on keywords; top_keyword_stems()
+-- reads them.
+-- The country and decade of an interview are taken from its interviewee's
+-- immigrations when its first keywords are written (both ingest paths write
+-- keywords last) and remembered in keyword_text_buckets, so removing the
+-- keywords later subtracts exactly what was added. An interview is counted in
+-- the decade of its first immigration only (overall and per country), so
+-- adding decades up never counts it twice. Call rebuild_keyword_stats() after
+-- editing immigrations or countries by hand.
+
+-- Language the keywords are extracted in -> text search dictionary used to stem them
+CREATE TABLE IF NOT EXISTS keyword_stem_languages (
+  lang       TEXT          PRIMARY KEY,
+  dictionary REGDICTIONARY NOT NULL
+);
+INSERT INTO keyword_stem_languages (lang, dictionary)
+VALUES ('en', 'english_stem')
+ON CONFLICT DO NOTHING;
+-- Installs that also stemmed the (English) keywords per UI language
+DELETE FROM keyword_stem_languages WHERE lang = 'es' AND dictionary = 'spanish_stem'::REGDICTIONARY;
+
+CREATE TABLE IF NOT EXISTS keyword_terms (
+  lang TEXT NOT NULL,
+  term TEXT NOT NULL, -- lower(trim(keyword))
+  stem TEXT NOT NULL, -- keyword_stem(term, <lang's dictionary>)
+  PRIMARY KEY (lang, term)
+);
+
+-- Buckets each interview's keywords are counted in: (0, 0) for the whole
+-- archive, (country, 0) for every destination of the interviewee, and
+-- (0, decade) and (country, decade) for the decade of the first immigration
+-- overall and to each country
+CREATE TABLE IF NOT EXISTS keyword_text_buckets (
+  id_text    INT NOT NULL,
+  id_country INT NOT NULL, -- destination country, 0 = any
+  decade     INT NOT NULL, -- 1880 = 1880-1889, 0 = any
+  PRIMARY KEY (id_text, id_country, decade)
+);
+
+CREATE TABLE IF NOT EXISTS stats_keyword_stems (
+  lang       TEXT   NOT NULL,
+  id_country INT    NOT NULL, -- 0 = any
+  decade     INT    NOT NULL, -- 0 = any
+  stem       TEXT   NOT NULL,
+  n          BIGINT NOT NULL,
+  PRIMARY KEY (lang, id_country, decade, stem)
+);
+
+CREATE INDEX IF NOT EXISTS idx_keyword_terms_stem ON keyword_terms (lang, stem);
+CREATE INDEX IF NOT EXISTS idx_stats_keyword_stems_top ON stats_keyword_stems (lang, id_country, decade, n DESC);
+
+
+-- Stems every word of p_term; stop words and unknown words are kept as they are
+CREATE OR REPLACE FUNCTION keyword_stem(p_term TEXT, p_dictionary REGDICTIONARY)
+RETURNS TEXT AS $$
+    SELECT string_agg(COALESCE((ts_lexize(p_dictionary, w.word))[1], w.word), ' ' ORDER BY w.pos)
+    FROM regexp_split_to_table(p_term, '\s+') WITH ORDINALITY AS w(word, pos)
+    WHERE w.word <> ''
+$$ LANGUAGE sql STABLE;
+
+-- Label shown for a stem: its most frequent term across the archive
+CREATE OR REPLACE FUNCTION keyword_stem_label(p_lang TEXT, p_stem TEXT)
+RETURNS TEXT AS $$
+    SELECT kt.term
+    FROM keyword_terms kt
+    LEFT JOIN stats_keywords sk ON sk.keyword = kt.term
+    WHERE kt.lang = p_lang AND kt.stem = p_stem
+    ORDER BY sk.n DESC NULLS LAST, kt.term
+    LIMIT 1
+$$ LANGUAGE sql STABLE;
+
+
+-- === Delta helper (p_sign = 1 for new rows, -1 for removed rows) ===
+CREATE OR REPLACE FUNCTION stats_apply_keyword_stems(p_rows keywords[], p_sign INT)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO keyword_terms (lang, term, stem)
+    SELECT l.lang, t.term, keyword_stem(t.term, l.dictionary)
+    FROM (SELECT DISTINCT lower(trim(k.keyword)) AS term FROM unnest(p_rows) k WHERE trim(k.keyword) <> '') t
+    CROSS JOIN keyword_stem_languages l
+    ON CONFLICT DO NOTHING;
+
+    IF p_sign > 0 THEN
+        INSERT INTO keyword_text_buckets (id_text, id_country, decade)
+        SELECT tf.id_text, b.id_country, b.decade
+        FROM text_files tf
+        CROSS JOIN LATERAL (
+            SELECT 0 AS id_country, 0 AS decade
+            UNION
+            SELECT v.id_country, v.decade
+            FROM (
+                SELECT i.destination_country_id,
+                       min(i.immigration_date) AS first_date,
+                       min(min(i.immigration_date)) OVER () AS first_overall
+                FROM immigrations i
+                WHERE i.id_people = tf.id_people
+                GROUP BY i.destination_country_id
+            ) f
+            CROSS JOIN LATERAL (
+                VALUES (f.destination_country_id, 0),
+                       (0, extract(year FROM f.first_overall)::INT / 10 * 10),
+                       (f.destination_country_id, extract(year FROM f.first_date)::INT / 10 * 10)
+            ) v(id_country, decade)
+            WHERE v.id_country IS NOT NULL AND v.decade IS NOT NULL
+        ) b
+        WHERE tf.id_text IN (SELECT k.id_text FROM unnest(p_rows) k)
+          AND NOT EXISTS (SELECT 1 FROM keyword_text_buckets kb WHERE kb.id_text = tf.id_text)
+        ON CONFLICT DO NOTHING;
+    END IF;
+
+    INSERT INTO stats_keyword_stems AS s (lang, id_country, decade, stem, n)
+    SELECT kt.lang, b.id_country, b.decade, kt.stem, p_sign * count(*)
+    FROM unnest(p_rows) k
+    JOIN keyword_text_buckets b ON b.id_text = k.id_text
+    JOIN keyword_terms kt ON kt.term = lower(trim(k.keyword))
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (lang, id_country, decade, stem) DO UPDATE SET n = s.n + EXCLUDED.n;
+
+    IF p_sign < 0 THEN
+        DELETE FROM stats_keyword_stems WHERE n <= 0;
+        -- Interviews left without keywords
+        DELETE FROM keyword_text_buckets kb
+        WHERE kb.id_text IN (SELECT k.id_text FROM unnest(p_rows) k)
+          AND NOT EXISTS (SELECT 1 FROM keywords k WHERE k.id_text = kb.id_text);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION keyword_stems_changed() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM stats_apply_keyword_stems(ARRAY(SELECT o::keywords FROM old_rows o), -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM stats_apply_keyword_stems(ARRAY(SELECT n::keywords FROM new_rows n), 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_keyword_stems_ins ON keywords;
+DROP TRIGGER IF EXISTS trg_keyword_stems_upd ON keywords;
+DROP TRIGGER IF EXISTS trg_keyword_stems_del ON keywords;
+CREATE TRIGGER trg_keyword_stems_ins AFTER INSERT ON keywords
+  REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION keyword_stems_changed();
+CREATE TRIGGER trg_keyword_stems_upd AFTER UPDATE ON keywords
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION keyword_stems_changed();
+CREATE TRIGGER trg_keyword_stems_del AFTER DELETE ON keywords
+  REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION keyword_stems_changed();
+
+
+-- The p_limit most frequent stems as (label, frequency). Without years it
+-- reads the (country or 0, decade 0) rows straight off the top-n index;
+-- p_from_year/p_to_year add up the decades they overlap (each interview is in
+-- one decade, that of its first immigration).
+-- Example: SELECT * FROM top_keyword_stems('en', 10, p_country => 2);
+CREATE OR REPLACE FUNCTION top_keyword_stems(
+    p_lang TEXT,
+    p_limit INT,
+    p_country INT DEFAULT NULL,
+    p_from_year INT DEFAULT NULL,
+    p_to_year INT DEFAULT NULL
+) RETURNS TABLE (label TEXT, frequency BIGINT) AS $$
+BEGIN
+    IF p_from_year IS NULL AND p_to_year IS NULL THEN
+        RETURN QUERY
+            SELECT keyword_stem_label(p_lang, s.stem), s.n
+            FROM stats_keyword_stems s
+            WHERE s.lang = p_lang AND s.id_country = COALESCE(p_country, 0) AND s.decade = 0
+            ORDER BY s.n DESC, s.stem
+            LIMIT p_limit;
+    ELSE
+        RETURN QUERY
+            SELECT keyword_stem_label(p_lang, t.stem), t.n
+            FROM (
+                SELECT s.stem, sum(s.n)::BIGINT AS n
+                FROM stats_keyword_stems s
+                WHERE s.lang = p_lang AND s.id_country = COALESCE(p_country, 0) AND s.decade <> 0
+                  AND s.decade >= COALESCE(p_from_year / 10 * 10, s.decade)
+                  AND s.decade <= COALESCE(p_to_year, s.decade)
+                GROUP BY s.stem
+                ORDER BY n DESC, s.stem
+                LIMIT p_limit
+            ) t
+            ORDER BY t.n DESC, t.stem;
+    END IF;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+
+-- Full recompute (initial backfill, after adding a language or editing
+-- immigrations and countries by hand)
+CREATE OR REPLACE PROCEDURE rebuild_keyword_stats()
+LANGUAGE plpgsql AS $$
+BEGIN
+    TRUNCATE keyword_terms, keyword_text_buckets, stats_keyword_stems;
+    PERFORM stats_apply_keyword_stems(ARRAY(SELECT k FROM keywords k), 1);
+END;
+$$;
+
+CALL rebuild_keyword_stats();
@@ -0,0 +1,64 @@
+-- Catalog of the files under multimedia/ shown by the upload tool.
+-- Run after init_house_of_emmigrants.sql. main.py keeps it in step with
+-- uploads, replacements and deletions; `flask reconcile-media-catalog`
+-- picks up files added, changed or removed outside the app.
+CREATE TABLE IF NOT EXISTS media_catalog (
+  id_media     SERIAL    PRIMARY KEY,
+  path         TEXT      NOT NULL UNIQUE, -- relative to multimedia/, e.g. 'images/scan_01.jpg'
+  kind         TEXT      NOT NULL CHECK (kind IN ('image', 'text')),
+  filename     TEXT      NOT NULL,
+  size_bytes   BIGINT    NOT NULL,
+  mtime_ns     BIGINT    NOT NULL,
+  content_hash TEXT      NOT NULL,        -- sha256, same as the /multimedia ETag
+  mime_type    TEXT,
+  id_text      INT       REFERENCES text_files(id_text) ON DELETE SET NULL,
+  id_image     INT       REFERENCES image_files(id_image) ON DELETE SET NULL,
+  updated_at   TIMESTAMP NOT NULL DEFAULT now()
+);
+
+-- Page order of the upload tool and the filename filter
+CREATE INDEX IF NOT EXISTS idx_media_catalog_kind_filename ON media_catalog (kind, filename, id_media);
+
+-- Substring filter (LIKE '%...%'); without pg_trgm it falls back to a scan of the catalog
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS idx_media_catalog_filename_trgm
+            ON media_catalog USING GIN (lower(filename) gin_trgm_ops);
+    END IF;
+END;
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_image_files_filename ON image_files (filename);
+
+
+-- Links the catalog rows of p_filenames to the interviews and images loaded from them
+CREATE OR REPLACE FUNCTION link_media_catalog(p_filenames TEXT[])
+RETURNS VOID AS $$
+BEGIN
+    UPDATE media_catalog m
+    SET id_text = (SELECT min(t.id_text) FROM text_files t WHERE t.filename = m.filename)
+    WHERE m.kind = 'text' AND m.filename = ANY(p_filenames);
+
+    UPDATE media_catalog m
+    SET id_image = (SELECT min(i.id_image) FROM image_files i WHERE i.filename IN (m.filename, m.path))
+    WHERE m.kind = 'image' AND m.filename = ANY(p_filenames);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Interviews are ingested after their upload (background job), so new rows link themselves
+CREATE OR REPLACE FUNCTION media_catalog_files_inserted() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM link_media_catalog(ARRAY(SELECT DISTINCT regexp_replace(n.filename, '^.*/', '') FROM new_rows n));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_media_catalog_text_files_ins ON text_files;
+CREATE TRIGGER trg_media_catalog_text_files_ins AFTER INSERT ON text_files
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION media_catalog_files_inserted();
+
+DROP TRIGGER IF EXISTS trg_media_catalog_image_files_ins ON image_files;
+CREATE TRIGGER trg_media_catalog_image_files_ins AFTER INSERT ON image_files
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION media_catalog_files_inserted();
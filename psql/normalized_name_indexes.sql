@@ -0,0 +1,122 @@
+-- Unique indexes on the normalized names used by the get_*_id_by_name helpers
+-- (they all filter on lower(<name>)).
+-- Run after init_house_of_emmigrants.sql (and exploration_stats.sql, if installed).
+-- Existing duplicates are merged first: names are trimmed, the lowest id of each
+-- group is kept and every foreign key pointing at the other ids is repointed.
+-- Only lookup tables are deduplicated: two people may share a name, so people
+-- get a plain index and their identity is left to person_resolution.sql.
+
+
+-- Repoints every single-column foreign key referencing p_table from p_drop_id to
+-- p_keep_id, then deletes p_drop_id. Rows of link tables that would collide with
+-- an existing link (composite primary keys) are removed instead of moved.
+CREATE OR REPLACE FUNCTION merge_lookup_row(p_table REGCLASS, p_keep_id INT, p_drop_id INT)
+RETURNS VOID AS $$
+DECLARE
+    v_fk RECORD;
+    v_id_column TEXT;
+    v_other_keys TEXT;
+BEGIN
+    SELECT a.attname INTO v_id_column
+    FROM pg_constraint c
+    JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+    WHERE c.conrelid = p_table AND c.contype = 'p';
+
+    FOR v_fk IN
+        SELECT c.conrelid::REGCLASS AS ref_table, a.attname AS ref_column, pk.conkey AS pk_columns, c.conkey[1] AS ref_attnum
+        FROM pg_constraint c
+        JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+        LEFT JOIN pg_constraint pk ON pk.conrelid = c.conrelid AND pk.contype = 'p'
+        WHERE c.contype = 'f' AND c.confrelid = p_table AND cardinality(c.conkey) = 1
+    LOOP
+        IF v_fk.ref_attnum = ANY(v_fk.pk_columns) THEN
+            -- Link table: drop the rows the kept id already has
+            SELECT string_agg(format('t2.%1$I = t.%1$I', a.attname), ' AND ') INTO v_other_keys
+            FROM pg_attribute a
+            WHERE a.attrelid = v_fk.ref_table AND a.attnum = ANY(v_fk.pk_columns) AND a.attnum <> v_fk.ref_attnum;
+
+            EXECUTE format(
+                'DELETE FROM %1$s t WHERE t.%2$I = $2
+                   AND EXISTS (SELECT 1 FROM %1$s t2 WHERE t2.%2$I = $1 AND %3$s)',
+                v_fk.ref_table, v_fk.ref_column, COALESCE(v_other_keys, 'TRUE'))
+            USING p_keep_id, p_drop_id;
+        END IF;
+
+        EXECUTE format('UPDATE %1$s SET %2$I = $1 WHERE %2$I = $2', v_fk.ref_table, v_fk.ref_column)
+        USING p_keep_id, p_drop_id;
+    END LOOP;
+
+    EXECUTE format('DELETE FROM %s WHERE %I = $1', p_table, v_id_column) USING p_drop_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trims p_name_column and merges every group of rows sharing p_key_expr
+-- (an expression over the table's columns) into its lowest id.
+-- Example: CALL dedupe_lookup_table('countries', 'country', 'lower(country)');
+CREATE OR REPLACE PROCEDURE dedupe_lookup_table(p_table REGCLASS, p_name_column TEXT, p_key_expr TEXT)
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_id_column TEXT;
+    v_group RECORD;
+    v_drop_id INT;
+    v_merged INT := 0;
+BEGIN
+    SELECT a.attname INTO v_id_column
+    FROM pg_constraint c
+    JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+    WHERE c.conrelid = p_table AND c.contype = 'p';
+
+    EXECUTE format('UPDATE %1$s SET %2$I = trim(%2$I) WHERE %2$I <> trim(%2$I)', p_table, p_name_column);
+
+    FOR v_group IN EXECUTE format(
+        'SELECT min(%1$I) AS keep_id, array_agg(%1$I ORDER BY %1$I) AS ids
+         FROM %2$s WHERE %3$I IS NOT NULL
+         GROUP BY %4$s HAVING count(*) > 1',
+        v_id_column, p_table, p_name_column, p_key_expr)
+    LOOP
+        FOREACH v_drop_id IN ARRAY v_group.ids[2:] LOOP
+            PERFORM merge_lookup_row(p_table, v_group.keep_id, v_drop_id);
+            v_merged := v_merged + 1;
+        END LOOP;
+    END LOOP;
+
+    IF v_merged > 0 THEN
+        RAISE NOTICE '%: merged % duplicate rows', p_table, v_merged;
+    END IF;
+END;
+$$;
+
+
+-- === Migration ===
+-- Countries go first since the city key includes id_country.
+-- Lock out concurrent ingests until the indexes exist.
+BEGIN;
+
+LOCK TABLE countries, cities, ports, travel_types, cultures, languages, schools,
+           historic_events, relationships IN SHARE ROW EXCLUSIVE MODE;
+
+CALL dedupe_lookup_table('countries', 'country', 'lower(country)');
+CALL dedupe_lookup_table('cities', 'city', 'lower(city), COALESCE(id_country, 0)');
+CALL dedupe_lookup_table('ports', 'port', 'lower(port)');
+CALL dedupe_lookup_table('travel_types', 'type', 'lower(type)');
+CALL dedupe_lookup_table('cultures', 'name', 'lower(name)');
+CALL dedupe_lookup_table('languages', 'name', 'lower(name)');
+CALL dedupe_lookup_table('schools', 'name', 'lower(name)');
+CALL dedupe_lookup_table('historic_events', 'historic_event', 'lower(historic_event)');
+CALL dedupe_lookup_table('relationships', 'relationship_type', 'lower(relationship_type)');
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_countries_name ON countries (lower(country));
+CREATE UNIQUE INDEX IF NOT EXISTS uq_cities_name_country ON cities (lower(city), COALESCE(id_country, 0));
+CREATE UNIQUE INDEX IF NOT EXISTS uq_ports_name ON ports (lower(port));
+CREATE UNIQUE INDEX IF NOT EXISTS uq_travel_types_name ON travel_types (lower(type));
+CREATE UNIQUE INDEX IF NOT EXISTS uq_cultures_name ON cultures (lower(name));
+CREATE UNIQUE INDEX IF NOT EXISTS uq_languages_name ON languages (lower(name));
+CREATE UNIQUE INDEX IF NOT EXISTS uq_schools_name ON schools (lower(name));
+CREATE UNIQUE INDEX IF NOT EXISTS uq_historic_events_name ON historic_events (lower(historic_event));
+CREATE UNIQUE INDEX IF NOT EXISTS uq_relationships_name ON relationships (lower(relationship_type));
+
+-- Installs from before people were left out of the dedupe
+DROP INDEX IF EXISTS uq_people_name;
+CREATE INDEX IF NOT EXISTS idx_people_name ON people (lower(name));
+
+COMMIT;
@@ -0,0 +1,101 @@
+-- Rendered page cache shared by the app processes (see cached_page in main.py).
+-- Run after init_house_of_emmigrants.sql. Pages built from archive data are
+-- keyed by data_version.version, which is bumped by every transaction that
+-- changes the tables those pages read (ingest, admin story edits, place
+-- coordinates set by the gazetteer import); the bump also drops the shared
+-- entries of older versions.
+CREATE TABLE IF NOT EXISTS data_version (
+  id        BOOLEAN   PRIMARY KEY DEFAULT TRUE CHECK (id), -- single row
+  version   BIGINT    NOT NULL DEFAULT 1,
+  bumped_at TIMESTAMP NOT NULL DEFAULT now()
+);
+INSERT INTO data_version DEFAULT VALUES ON CONFLICT DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS page_cache (
+  cache_key    TEXT      PRIMARY KEY, -- sha256 of route, language, device mode and versions
+  data_version BIGINT,                -- NULL for pages that don't read archive data
+  etag         TEXT      NOT NULL,
+  body         TEXT      NOT NULL,
+  created_at   TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_page_cache_data_version ON page_cache (data_version);
+
+CREATE OR REPLACE FUNCTION bump_data_version()
+RETURNS BIGINT AS $$
+DECLARE v_version BIGINT;
+BEGIN
+    UPDATE data_version SET version = version + 1, bumped_at = now()
+    RETURNING version INTO v_version;
+    DELETE FROM page_cache WHERE data_version < v_version;
+    RETURN v_version;
+END;
+$$ LANGUAGE plpgsql;
+
+-- One row per transaction that changed archive data, inserted by the first
+-- statement that changes rows and deleted again at commit
+CREATE TABLE IF NOT EXISTS data_version_pending (
+  txid BIGINT PRIMARY KEY
+);
+
+-- Statement triggers on the archive tables (transition tables, like the other
+-- summaries): a transaction queues a single bump, whatever rows it writes
+CREATE OR REPLACE FUNCTION data_changed() RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('house.data_version_queued', true) IS NOT DISTINCT FROM txid_current()::TEXT THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        PERFORM 1 FROM old_rows LIMIT 1;
+    ELSE
+        PERFORM 1 FROM new_rows LIMIT 1;
+    END IF;
+    IF FOUND THEN
+        INSERT INTO data_version_pending (txid) VALUES (txid_current());
+        PERFORM set_config('house.data_version_queued', txid_current()::TEXT, true);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Deferred to commit time so the new version becomes visible together with
+-- the data, and the data_version row is only locked while committing
+CREATE OR REPLACE FUNCTION data_version_commit() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM bump_data_version();
+    DELETE FROM data_version_pending WHERE txid = NEW.txid;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_data_version_commit ON data_version_pending;
+CREATE CONSTRAINT TRIGGER trg_data_version_commit AFTER INSERT ON data_version_pending
+  DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION data_version_commit();
+
+DO $$
+DECLARE
+    v_table TEXT;
+BEGIN
+    FOREACH v_table IN ARRAY ARRAY['text_files', 'people', 'immigrations', 'person_education',
+                                   'keywords', 'emigrant_stories', 'countries', 'cities', 'ports'] LOOP
+        CONTINUE WHEN to_regclass(v_table) IS NULL;
+        -- Per-row deferred trigger of earlier installs
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_data_version_%1$s ON %1$I', v_table);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_data_version_%1$s_ins ON %1$I', v_table);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_data_version_%1$s_upd ON %1$I', v_table);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_data_version_%1$s_del ON %1$I', v_table);
+        EXECUTE format(
+            'CREATE TRIGGER trg_data_version_%1$s_ins AFTER INSERT ON %1$I '
+            'REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION data_changed()',
+            v_table);
+        EXECUTE format(
+            'CREATE TRIGGER trg_data_version_%1$s_upd AFTER UPDATE ON %1$I '
+            'REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION data_changed()',
+            v_table);
+        EXECUTE format(
+            'CREATE TRIGGER trg_data_version_%1$s_del AFTER DELETE ON %1$I '
+            'REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION data_changed()',
+            v_table);
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,304 @@
+-- Fuzzy person resolution for find_or_create_person and an offline dedupe of
+-- the people table. Run after normalized_name_indexes.sql.
+-- Interviews spell the same person differently ("Carl Johan Andersson",
+-- "Karl-Johan Anderson"); an exact lower(name) match creates a new person for
+-- each spelling. Candidates are people with a similar name key (pg_trgm when
+-- available) whose birth year and birthplace don't contradict the new data;
+-- they are scored on name, birthday and birthplace and the best one above
+-- person_resolution_config.match_threshold is reused.
+
+
+-- Weights and thresholds of the match score (single row, edit in place).
+-- The three weights are expected to add up to 1.
+CREATE TABLE IF NOT EXISTS person_resolution_config (
+  id                BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id), -- single row
+  name_threshold    REAL    NOT NULL DEFAULT 0.45, -- minimum name similarity of a candidate
+  match_threshold   REAL    NOT NULL DEFAULT 0.75, -- minimum score to reuse a person
+  name_weight       REAL    NOT NULL DEFAULT 0.5,
+  birthday_weight   REAL    NOT NULL DEFAULT 0.3,
+  birthplace_weight REAL    NOT NULL DEFAULT 0.2
+);
+INSERT INTO person_resolution_config DEFAULT VALUES ON CONFLICT DO NOTHING;
+
+-- One row per person removed by merge_duplicate_people()
+CREATE TABLE IF NOT EXISTS person_merges (
+  merged_id   INT       PRIMARY KEY, -- deleted people.id_people
+  kept_id     INT       NOT NULL,    -- person its rows were moved to
+  merged_name TEXT      NOT NULL,
+  score       REAL      NOT NULL,
+  merged_at   TIMESTAMP NOT NULL DEFAULT now()
+);
+
+
+-- Name without accents, punctuation or case: 'Karl-Johan Andersén' -> 'karl johan andersen'
+CREATE OR REPLACE FUNCTION person_name_key(p_name TEXT)
+RETURNS TEXT AS $$
+    SELECT trim(regexp_replace(
+        lower(translate(p_name,
+                        'ÁÀÂÃÄÅÆÇÉÈÊËÍÌÎÏÑÓÒÔÕÖØÚÙÛÜÝáàâãäåæçéèêëíìîïñóòôõöøúùûüýÿ',
+                        'AAAAAAACEEEEIIIINOOOOOOUUUUYaaaaaaaceeeeiiiinoooooouuuuyy')),
+        '[^a-z0-9]+', ' ', 'g'))
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION person_birth_year(p_birthday DATE)
+RETURNS INT AS $$
+    SELECT extract(year FROM p_birthday)::INT
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Blocking index: people born in the same country around the same year,
+-- narrowed by the initial when pg_trgm is missing
+CREATE INDEX IF NOT EXISTS idx_people_birth_block
+  ON people (birthplace_country, left(person_name_key(name), 1), person_birth_year(birthday));
+
+-- person_name_similarity(key, other_key) compares two person_name_key() values:
+-- pg_trgm's similarity() when the extension is available, otherwise the same
+-- trigram measure (shared / total distinct trigrams of the padded words) in SQL
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS idx_people_name_key_trgm
+            ON people USING GIN (person_name_key(name) gin_trgm_ops);
+
+        CREATE OR REPLACE FUNCTION person_name_similarity(p_key TEXT, p_other_key TEXT)
+        RETURNS REAL AS $fn$
+            SELECT similarity(p_key, p_other_key)
+        $fn$ LANGUAGE sql IMMUTABLE;
+    ELSE
+        CREATE OR REPLACE FUNCTION person_name_trigrams(p_key TEXT)
+        RETURNS TEXT[] AS $fn$
+        DECLARE
+            v_word TEXT;
+            v_padded TEXT;
+            v_trigrams TEXT[] := '{}';
+        BEGIN
+            FOREACH v_word IN ARRAY string_to_array(p_key, ' ') LOOP
+                v_padded := '  ' || v_word || ' ';
+                FOR i IN 1 .. length(v_padded) - 2 LOOP
+                    IF NOT substr(v_padded, i, 3) = ANY(v_trigrams) THEN
+                        v_trigrams := v_trigrams || substr(v_padded, i, 3);
+                    END IF;
+                END LOOP;
+            END LOOP;
+            RETURN v_trigrams;
+        END;
+        $fn$ LANGUAGE plpgsql IMMUTABLE;
+
+        CREATE OR REPLACE FUNCTION person_name_similarity(p_key TEXT, p_other_key TEXT)
+        RETURNS REAL AS $fn$
+        DECLARE
+            v_trigrams TEXT[] := person_name_trigrams(p_key);
+            v_other TEXT[] := person_name_trigrams(p_other_key);
+            v_trigram TEXT;
+            v_shared INT := 0;
+        BEGIN
+            FOREACH v_trigram IN ARRAY v_trigrams LOOP
+                IF v_trigram = ANY(v_other) THEN
+                    v_shared := v_shared + 1;
+                END IF;
+            END LOOP;
+            RETURN COALESCE(v_shared::REAL / NULLIF(cardinality(v_trigrams) + cardinality(v_other) - v_shared, 0), 0);
+        END;
+        $fn$ LANGUAGE plpgsql IMMUTABLE;
+    END IF;
+END;
+$$;
+
+-- Score in [0, 1] of two people with the given name similarity, or NULL when
+-- their data contradicts itself (different birth country, birth years more
+-- than one apart). Unknown birthday or birthplace counts as half a match, so
+-- an identical name with nothing else known still reaches 0.75.
+CREATE OR REPLACE FUNCTION person_match_score(
+    p_name_similarity REAL,
+    p_birthday DATE, p_other_birthday DATE,
+    p_city INT, p_other_city INT,
+    p_country INT, p_other_country INT
+) RETURNS REAL AS $$
+    SELECT CASE
+        WHEN p_country <> p_other_country
+          OR abs(person_birth_year(p_birthday) - person_birth_year(p_other_birthday)) > 1 THEN NULL
+        ELSE (c.name_weight * p_name_similarity
+              + c.birthday_weight * CASE
+                    WHEN p_birthday IS NULL OR p_other_birthday IS NULL THEN 0.5
+                    WHEN p_birthday = p_other_birthday THEN 1
+                    WHEN person_birth_year(p_birthday) = person_birth_year(p_other_birthday) THEN 0.7
+                    ELSE 0.4
+                END
+              + c.birthplace_weight * CASE
+                    WHEN p_city = p_other_city THEN 1
+                    WHEN p_country IS NULL OR p_other_country IS NULL THEN 0.5
+                    WHEN p_city IS NULL OR p_other_city IS NULL THEN 0.7
+                    ELSE 0.6
+                END)::REAL
+    END
+    FROM person_resolution_config c
+$$ LANGUAGE sql STABLE;
+
+-- Existing people that may be the given one, with their score (NULL = conflict).
+-- With pg_trgm the trigram index finds similar names and the birth data only
+-- has to be compatible; without it only the person's block (same birth
+-- country and initial, birth year +-1) is compared, so both must be known.
+CREATE OR REPLACE FUNCTION person_match_candidates(
+    p_name TEXT, p_birthday DATE, p_city INT, p_country INT
+) RETURNS TABLE (id_people INT, score REAL) AS $$
+DECLARE
+    v_key TEXT := person_name_key(p_name);
+    v_year INT := person_birth_year(p_birthday);
+    v_config person_resolution_config;
+BEGIN
+    SELECT * INTO v_config FROM person_resolution_config;
+
+    IF to_regclass('idx_people_name_key_trgm') IS NOT NULL THEN
+        PERFORM set_config('pg_trgm.similarity_threshold', v_config.name_threshold::TEXT, TRUE);
+        RETURN QUERY EXECUTE
+            'SELECT p.id_people,
+                    person_match_score(similarity(person_name_key(p.name), $1), $2, p.birthday,
+                                       $3, p.birthplace_city, $4, p.birthplace_country)
+             FROM people p
+             WHERE person_name_key(p.name) % $1
+               AND ($4 IS NULL OR p.birthplace_country IS NULL OR p.birthplace_country = $4)
+               AND ($5 IS NULL OR p.birthday IS NULL
+                    OR person_birth_year(p.birthday) BETWEEN $5 - 1 AND $5 + 1)'
+        USING v_key, p_birthday, p_city, p_country, v_year;
+    ELSIF p_country IS NOT NULL AND v_year IS NOT NULL THEN
+        RETURN QUERY
+            SELECT p.id_people,
+                   person_match_score(person_name_similarity(person_name_key(p.name), v_key), p_birthday, p.birthday,
+                                      p_city, p.birthplace_city, p_country, p.birthplace_country)
+            FROM people p
+            WHERE p.birthplace_country = p_country
+              AND left(person_name_key(p.name), 1) = left(v_key, 1)
+              AND person_birth_year(p.birthday) BETWEEN v_year - 1 AND v_year + 1
+              AND person_name_similarity(person_name_key(p.name), v_key) >= v_config.name_threshold;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Id of the person p_name refers to: the exact (case-insensitive) name first
+-- unless its birth data contradicts, then the best scoring candidate, NULL when
+-- none reaches match_threshold
+CREATE OR REPLACE FUNCTION resolve_person(
+    p_name TEXT, p_birthday DATE DEFAULT NULL, p_city INT DEFAULT NULL, p_country INT DEFAULT NULL
+) RETURNS INT AS $$
+    SELECT COALESCE(
+        (SELECT min(p.id_people) FROM people p
+         WHERE lower(p.name) = lower(trim(p_name))
+           AND person_match_score(1, p_birthday, p.birthday, p_city, p.birthplace_city,
+                                  p_country, p.birthplace_country) IS NOT NULL),
+        (SELECT c.id_people
+         FROM person_match_candidates(p_name, p_birthday, p_city, p_country) c
+         WHERE c.score >= (SELECT match_threshold FROM person_resolution_config)
+         ORDER BY c.score DESC, c.id_people
+         LIMIT 1))
+$$ LANGUAGE sql;
+
+
+-- === Offline dedupe ===
+
+-- Pairs of people that look like the same person: for every person, the best
+-- scoring older person (lower id) above match_threshold. Same candidate rules
+-- as person_match_candidates. Read-only, used for dry runs.
+CREATE OR REPLACE FUNCTION find_duplicate_people()
+RETURNS TABLE (kept_id INT, merged_id INT, score REAL) AS $$
+DECLARE
+    v_config person_resolution_config;
+BEGIN
+    SELECT * INTO v_config FROM person_resolution_config;
+
+    IF to_regclass('idx_people_name_key_trgm') IS NOT NULL THEN
+        PERFORM set_config('pg_trgm.similarity_threshold', v_config.name_threshold::TEXT, TRUE);
+        RETURN QUERY EXECUTE
+            'SELECT DISTINCT ON (b.id_people) a.id_people, b.id_people, s.score
+             FROM people b
+             JOIN people a ON person_name_key(a.name) % person_name_key(b.name) AND a.id_people < b.id_people
+             CROSS JOIN LATERAL (
+                 SELECT person_match_score(similarity(person_name_key(a.name), person_name_key(b.name)),
+                                           b.birthday, a.birthday, b.birthplace_city, a.birthplace_city,
+                                           b.birthplace_country, a.birthplace_country) AS score
+             ) s
+             WHERE s.score >= $1
+             ORDER BY b.id_people, s.score DESC, a.id_people'
+        USING v_config.match_threshold;
+    ELSE
+        RETURN QUERY
+            WITH k AS MATERIALIZED (
+                SELECT p.id_people, person_name_key(p.name) AS name_key, p.birthday,
+                       person_birth_year(p.birthday) AS birth_year, p.birthplace_city, p.birthplace_country
+                FROM people p
+                WHERE p.birthplace_country IS NOT NULL AND p.birthday IS NOT NULL
+            )
+            SELECT DISTINCT ON (b.id_people) a.id_people, b.id_people, s.score
+            FROM k b
+            JOIN k a ON a.birthplace_country = b.birthplace_country
+                    AND left(a.name_key, 1) = left(b.name_key, 1)
+                    AND a.birth_year BETWEEN b.birth_year - 1 AND b.birth_year + 1
+                    AND a.id_people < b.id_people
+            CROSS JOIN LATERAL (
+                SELECT person_match_score(person_name_similarity(a.name_key, b.name_key),
+                                          b.birthday, a.birthday, b.birthplace_city, a.birthplace_city,
+                                          b.birthplace_country, a.birthplace_country) AS score
+            ) s
+            WHERE s.score >= v_config.match_threshold
+            ORDER BY b.id_people, s.score DESC, a.id_people;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Merges every pair of find_duplicate_people() into the older person: missing
+-- attributes are copied over, foreign keys repointed (merge_lookup_row) and
+-- the merge logged in person_merges. A pair whose older person was merged
+-- earlier in the run is rescored against the person it ended up in.
+-- Example: CALL merge_duplicate_people();
+CREATE OR REPLACE PROCEDURE merge_duplicate_people()
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_pair RECORD;
+    v_keep_id INT;
+    v_score REAL;
+    v_merged INT := 0;
+    v_threshold REAL;
+BEGIN
+    -- Ingests would otherwise link new rows to people being deleted
+    LOCK TABLE people IN SHARE ROW EXCLUSIVE MODE;
+    SELECT match_threshold INTO v_threshold FROM person_resolution_config;
+
+    FOR v_pair IN SELECT * FROM find_duplicate_people() ORDER BY merged_id LOOP
+        v_keep_id := v_pair.kept_id;
+        WHILE EXISTS (SELECT 1 FROM person_merges m WHERE m.merged_id = v_keep_id) LOOP
+            SELECT m.kept_id INTO v_keep_id FROM person_merges m WHERE m.merged_id = v_keep_id;
+        END LOOP;
+
+        v_score := v_pair.score;
+        IF v_keep_id <> v_pair.kept_id THEN
+            SELECT person_match_score(person_name_similarity(person_name_key(k.name), person_name_key(d.name)),
+                                      d.birthday, k.birthday, d.birthplace_city, k.birthplace_city,
+                                      d.birthplace_country, k.birthplace_country)
+            INTO v_score
+            FROM people k, people d
+            WHERE k.id_people = v_keep_id AND d.id_people = v_pair.merged_id;
+            CONTINUE WHEN v_score IS NULL OR v_score < v_threshold;
+        END IF;
+
+        UPDATE people k SET
+            birthday = COALESCE(k.birthday, d.birthday),
+            birthplace_city = COALESCE(k.birthplace_city, d.birthplace_city),
+            birthplace_country = COALESCE(k.birthplace_country, d.birthplace_country),
+            sex = COALESCE(k.sex, d.sex),
+            marital_status = COALESCE(k.marital_status, d.marital_status),
+            legal_status = COALESCE(k.legal_status, d.legal_status)
+        FROM people d
+        WHERE k.id_people = v_keep_id AND d.id_people = v_pair.merged_id;
+
+        INSERT INTO person_merges (merged_id, kept_id, merged_name, score)
+        SELECT id_people, v_keep_id, name, v_score FROM people WHERE id_people = v_pair.merged_id;
+
+        PERFORM merge_lookup_row('people', v_keep_id, v_pair.merged_id);
+        v_merged := v_merged + 1;
+    END LOOP;
+
+    -- A person can't be their own relative once both sides were merged
+    DELETE FROM people_relationships WHERE id_people = id_relative;
+
+    RAISE NOTICE 'people: merged % duplicates', v_merged;
+END;
+$$;
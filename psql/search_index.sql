@@ -0,0 +1,192 @@
+-- Full-text search behind the /search route.
+-- Run after init_house_of_emmigrants.sql. One row per searchable document:
+-- interviews (text_files + their keywords + the raw interview text) and, when
+-- the table exists, the stories managed from the admin panel (emigrant_stories).
+-- Triggers keep the rows in step with ingest and admin edits; the raw text is
+-- set by the extraction script (set_interview_search_text) or
+-- `flask index-interview-texts`.
+--
+-- Interviews are mostly English with Swedish names, places and phrases, and
+-- the site is also used in Spanish, so every document is indexed with the
+-- english, spanish and swedish configurations and queries are matched against
+-- all three.
+
+-- Weights: title A, keywords B, summary C, body D
+CREATE OR REPLACE FUNCTION search_document_vector(p_title TEXT, p_keywords TEXT, p_summary TEXT, p_body TEXT)
+RETURNS TSVECTOR AS $$
+    SELECT setweight(to_tsvector('english', coalesce(p_title, '')) || to_tsvector('spanish', coalesce(p_title, ''))
+                     || to_tsvector('swedish', coalesce(p_title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(p_keywords, '')) || to_tsvector('spanish', coalesce(p_keywords, ''))
+                     || to_tsvector('swedish', coalesce(p_keywords, '')), 'B')
+        || setweight(to_tsvector('english', coalesce(p_summary, '')) || to_tsvector('spanish', coalesce(p_summary, ''))
+                     || to_tsvector('swedish', coalesce(p_summary, '')), 'C')
+        || setweight(to_tsvector('english', coalesce(p_body, '')) || to_tsvector('spanish', coalesce(p_body, ''))
+                     || to_tsvector('swedish', coalesce(p_body, '')), 'D');
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Same query parsed with each configuration, matching a document if any matches
+CREATE OR REPLACE FUNCTION search_query(p_query TEXT)
+RETURNS TSQUERY AS $$
+    SELECT websearch_to_tsquery('english', p_query)
+        || websearch_to_tsquery('spanish', p_query)
+        || websearch_to_tsquery('swedish', p_query);
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE TABLE IF NOT EXISTS search_documents (
+  id_document SERIAL    PRIMARY KEY,
+  source      TEXT      NOT NULL, -- 'interview' (text_files) or 'story' (emigrant_stories)
+  source_id   INT       NOT NULL,
+  title       TEXT,
+  summary     TEXT,
+  keywords    TEXT,
+  body        TEXT,
+  document    TSVECTOR  GENERATED ALWAYS AS (search_document_vector(title, keywords, summary, body)) STORED,
+  updated_at  TIMESTAMP NOT NULL DEFAULT now(),
+  UNIQUE (source, source_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_search_documents_document ON search_documents USING GIN (document);
+CREATE INDEX IF NOT EXISTS idx_keywords_text ON keywords (id_text);
+
+
+-- === Refresh helpers ===
+-- Upserts the interview documents of p_ids (text_files.id_text), keeping their body
+CREATE OR REPLACE FUNCTION refresh_interview_search(p_ids INT[])
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO search_documents AS d (source, source_id, title, summary, keywords)
+    SELECT 'interview', t.id_text, t.story_title, t.story_summary,
+           (SELECT string_agg(k.keyword, ', ' ORDER BY k.id_keyword) FROM keywords k WHERE k.id_text = t.id_text)
+    FROM text_files t
+    WHERE t.id_text = ANY(p_ids)
+    ON CONFLICT (source, source_id) DO UPDATE
+    SET title = EXCLUDED.title, summary = EXCLUDED.summary, keywords = EXCLUDED.keywords, updated_at = now()
+    WHERE (d.title, d.summary, d.keywords) IS DISTINCT FROM (EXCLUDED.title, EXCLUDED.summary, EXCLUDED.keywords);
+
+    DELETE FROM search_documents d
+    WHERE d.source = 'interview' AND d.source_id = ANY(p_ids)
+      AND NOT EXISTS (SELECT 1 FROM text_files t WHERE t.id_text = d.source_id);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Sets the raw interview text of every interview loaded from p_filename
+CREATE OR REPLACE FUNCTION set_interview_search_text(p_filename TEXT, p_body TEXT)
+RETURNS INT AS $$
+DECLARE v_updated INT;
+BEGIN
+    PERFORM refresh_interview_search(ARRAY(SELECT id_text FROM text_files WHERE filename = p_filename));
+    UPDATE search_documents d SET body = p_body, updated_at = now()
+    FROM text_files t
+    WHERE t.filename = p_filename AND d.source = 'interview' AND d.source_id = t.id_text
+      AND d.body IS DISTINCT FROM p_body;
+    GET DIAGNOSTICS v_updated = ROW_COUNT;
+    RETURN v_updated;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Stories have no separate body; the remaining fields are indexed as one
+CREATE OR REPLACE FUNCTION refresh_story_search(p_ids INT[])
+RETURNS VOID AS $$
+BEGIN
+    IF to_regclass('emigrant_stories') IS NULL THEN RETURN; END IF;
+
+    EXECUTE $sql$
+        INSERT INTO search_documents AS d (source, source_id, title, summary, body)
+        SELECT 'story', s.id, s.title, s.summary,
+               concat_ws(' ', s.main_first, s.main_last, s.destination_city, s.destination_country,
+                         s.motive, s.travel_duration, s.return_plans)
+        FROM emigrant_stories s
+        WHERE s.id = ANY($1)
+        ON CONFLICT (source, source_id) DO UPDATE
+        SET title = EXCLUDED.title, summary = EXCLUDED.summary, body = EXCLUDED.body, updated_at = now()
+    $sql$ USING p_ids;
+
+    EXECUTE $sql$
+        DELETE FROM search_documents d
+        WHERE d.source = 'story' AND d.source_id = ANY($1)
+          AND NOT EXISTS (SELECT 1 FROM emigrant_stories s WHERE s.id = d.source_id)
+    $sql$ USING p_ids;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- === Triggers (statement level, so a bulk load refreshes each document once) ===
+CREATE OR REPLACE FUNCTION search_text_files_changed() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM refresh_interview_search(ARRAY(SELECT o.id_text FROM old_rows o));
+    ELSE
+        PERFORM refresh_interview_search(ARRAY(SELECT n.id_text FROM new_rows n));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION search_keywords_changed() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM refresh_interview_search(ARRAY(SELECT DISTINCT o.id_text FROM old_rows o));
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM refresh_interview_search(ARRAY(SELECT DISTINCT n.id_text FROM new_rows n));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION search_emigrant_stories_changed() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM refresh_story_search(ARRAY(SELECT o.id FROM old_rows o));
+    ELSE
+        PERFORM refresh_story_search(ARRAY(SELECT n.id FROM new_rows n));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    v_table TEXT;
+BEGIN
+    FOREACH v_table IN ARRAY ARRAY['text_files', 'keywords', 'emigrant_stories'] LOOP
+        CONTINUE WHEN to_regclass(v_table) IS NULL;
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_search_%1$s_ins ON %1$I', v_table);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_search_%1$s_upd ON %1$I', v_table);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_search_%1$s_del ON %1$I', v_table);
+        EXECUTE format(
+            'CREATE TRIGGER trg_search_%1$s_ins AFTER INSERT ON %1$I '
+            'REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION search_%1$s_changed()',
+            v_table);
+        EXECUTE format(
+            'CREATE TRIGGER trg_search_%1$s_upd AFTER UPDATE ON %1$I '
+            'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION search_%1$s_changed()',
+            v_table);
+        EXECUTE format(
+            'CREATE TRIGGER trg_search_%1$s_del AFTER DELETE ON %1$I '
+            'REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION search_%1$s_changed()',
+            v_table);
+    END LOOP;
+END;
+$$;
+
+
+-- Backfill (first install or repair). Raw interview texts are kept.
+CREATE OR REPLACE PROCEDURE rebuild_search_index()
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM refresh_interview_search(ARRAY(SELECT id_text FROM text_files));
+    DELETE FROM search_documents d
+    WHERE d.source = 'interview' AND NOT EXISTS (SELECT 1 FROM text_files t WHERE t.id_text = d.source_id);
+
+    IF to_regclass('emigrant_stories') IS NOT NULL THEN
+        PERFORM refresh_story_search(ARRAY(SELECT id FROM emigrant_stories));
+        EXECUTE 'DELETE FROM search_documents d WHERE d.source = ''story''
+                 AND NOT EXISTS (SELECT 1 FROM emigrant_stories s WHERE s.id = d.source_id)';
+    ELSE
+        DELETE FROM search_documents WHERE source = 'story';
+    END IF;
+END;
+$$;
+
+CALL rebuild_search_index();
@@ -0,0 +1,11 @@
+-- Shared translation store used by translate_text() in main.py.
+-- Every worker process reads and writes it, so a string is sent to the
+-- translator once per target language for the lifetime of the archive.
+CREATE TABLE IF NOT EXISTS translation_cache (
+  text_hash       TEXT      NOT NULL, -- sha256 of the source text
+  target_lang     TEXT      NOT NULL,
+  source_text     TEXT      NOT NULL,
+  translated_text TEXT      NOT NULL,
+  created_at      TIMESTAMP NOT NULL DEFAULT now(),
+  PRIMARY KEY (text_hash, target_lang)
+);